@@ -0,0 +1,20 @@
+"""add per-connection usage cursor for delta polling"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017070000"
+down_revision = "20251212043612"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("connections", sa.Column("usage_cursor_at", sa.DateTime(timezone=True)))
+    op.add_column("connections", sa.Column("usage_cursor", sa.String(length=1024)))
+
+
+def downgrade() -> None:
+    op.drop_column("connections", "usage_cursor")
+    op.drop_column("connections", "usage_cursor_at")
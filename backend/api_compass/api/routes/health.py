@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import time
 from contextlib import closing
+from typing import Any
 
 import redis
 from fastapi import APIRouter, status
@@ -10,6 +12,8 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from api_compass.core.config import settings
 from api_compass.db.session import SessionLocal
+from api_compass.services import circuit_breaker, rate_limits
+from api_compass.services.ingest import INGEST_STREAM
 
 router = APIRouter(tags=["health"])
 
@@ -23,7 +27,7 @@ def _check_database() -> dict[str, str]:
         return {"status": "error", "detail": str(exc)}
 
 
-def _check_worker() -> dict[str, str]:
+def _check_worker() -> dict[str, Any]:
     try:
         client = redis.Redis.from_url(
             str(settings.worker_broker_url),
@@ -32,7 +36,16 @@ def _check_worker() -> dict[str, str]:
         )
         client.ping()
         queues = client.zcard("connections:sync-jobs")
-        return {"status": "ok", "queue_depth": str(queues)}
+        due = client.zcount("connections:sync-jobs", "-inf", time.time())
+        ingest_backlog = client.xlen(INGEST_STREAM)
+        return {
+            "status": "ok",
+            "queue_depth": str(queues),
+            "sync_jobs_due": str(due),
+            "ingest_queue_depth": str(ingest_backlog),
+            "provider_tokens": rate_limits.fill_levels(),
+            "provider_circuits": circuit_breaker.states(),
+        }
     except redis.RedisError as exc:
         return {"status": "error", "detail": str(exc)}
 
@@ -1,80 +1,272 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+import logging
+from typing import AsyncIterator
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+import redis
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from pydantic import ValidationError
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from api_compass.api.deps import get_system_session
+from api_compass.core.config import settings
 from api_compass.models.enums import ConnectionStatus
 from api_compass.models.tables import Connection
-from api_compass.schemas.ingest import LocalUsageIngest
+from api_compass.schemas.ingest import LocalUsageIngestHeader, LocalUsageSample
+from api_compass.services import dedupe as dedupe_service
 from api_compass.services import entitlements as entitlement_service
 from api_compass.services import local_agents, usage as usage_service
+from api_compass.services import ingest as ingest_service
+from api_compass.services.ingest import build_payload_samples, build_usage_samples
+from api_compass.utils.compression import (
+    BodyDecodingError,
+    DecodedSizeExceededError,
+    UnsupportedEncodingError,
+    iter_decoded,
+    read_decoded,
+    supported_encodings,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
 
-@router.post("/", status_code=status.HTTP_202_ACCEPTED)
-async def ingest_usage(
-    request: Request,
-    x_agent_signature: str | None = Header(default=None, alias="X-Agent-Signature"),
-    session: Session = Depends(get_system_session),
-) -> dict[str, int]:
-    raw_body = await request.body()
-    payload = LocalUsageIngest.model_validate_json(raw_body)
+def _invalid_payload(exc: ValidationError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=exc.errors(include_url=False, include_context=False),
+    )
+
 
-    connection = session.get(Connection, payload.connection_id)
-    if connection is None:
+def _load_local_credential(
+    session: Session, header: LocalUsageIngestHeader
+) -> tuple[local_agents.AgentCredential, str]:
+    credential = local_agents.get_agent_credential(session, header.connection_id)
+    if credential is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found.")
-    if not connection.local_connector_enabled:
+    if not credential.local_connector_enabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Connection is not configured for Local Connector mode.",
         )
-    if connection.status != ConnectionStatus.ACTIVE:
+    if credential.status != ConnectionStatus.ACTIVE:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Connection is not active.")
-    if connection.provider != payload.provider or connection.environment != payload.environment:
+    if credential.provider != header.provider or credential.environment != header.environment:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payload scope mismatch.")
-
-    agent_token = local_agents.extract_agent_token(connection.encrypted_auth_blob)
-    if agent_token is None:
+    if credential.agent_token is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Agent token is missing.")
-    if not local_agents.verify_signature(agent_token, x_agent_signature, raw_body):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Local Connector signature.")
+    return credential, credential.agent_token
 
-    snapshot = entitlement_service.get_entitlements(session, connection.org_id)
-    now = datetime.now(timezone.utc)
-    if not entitlement_service.allow_sync(snapshot, connection.last_synced_at, now):
+
+def _ensure_sync_allowed(session: Session, credential: local_agents.AgentCredential, now: datetime) -> None:
+    snapshot = entitlement_service.get_entitlements(session, credential.org_id)
+    last_synced_at = local_agents.get_last_synced_at(session, credential.connection_id)
+    if not entitlement_service.allow_sync(snapshot, last_synced_at, now):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Sync interval has not elapsed for this connection.",
         )
 
-    samples: list[usage_service.UsageSample] = []
-    for sample in payload.samples:
-        metadata = dict(sample.metadata or {})
-        metadata["agent_version"] = payload.agent_version
-        usage_sample = usage_service.UsageSample(
-            org_id=connection.org_id,
-            connection_id=connection.id,
-            provider=payload.provider,
-            environment=payload.environment,
-            metric=sample.metric,
-            unit=sample.unit,
-            quantity=sample.quantity,
-            unit_cost=sample.unit_cost,
-            currency=sample.currency,
-            ts=sample.ts,
-            source=payload.source,
-            metadata=metadata,
-        )
-        samples.append(usage_sample)
 
-    created = usage_service.save_usage_samples(session, samples)
-    last_ts = max((sample.ts for sample in samples), default=now)
-    connection.last_synced_at = last_ts
-    connection.local_agent_last_seen_at = now
-    session.add(connection)
+def _mark_synced(
+    session: Session, credential: local_agents.AgentCredential, last_ts: datetime, now: datetime
+) -> None:
+    session.execute(
+        update(Connection)
+        .where(Connection.id == credential.connection_id)
+        .values(last_synced_at=last_ts, local_agent_last_seen_at=now)
+    )
     session.commit()
-    return {"ingested": created}
+    local_agents.record_sync(credential.connection_id, last_ts)
+
+
+def _dedupe_report(skipped: int, checked: int) -> dict[str, int | float]:
+    if not settings.ingest_dedupe_enabled:
+        return {}
+    hit_rate = round(skipped / checked, 4) if checked else 0.0
+    return {"duplicates_skipped": skipped, "dedupe_hit_rate": hit_rate}
+
+
+def _decoding_error(exc: BodyDecodingError) -> HTTPException:
+    if isinstance(exc, UnsupportedEncodingError):
+        return HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(exc),
+            headers={"Accept-Encoding": ", ".join(supported_encodings())},
+        )
+    if isinstance(exc, DecodedSizeExceededError):
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines, keeping terminators so callers can hash every byte."""
+
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        while (index := buffer.find(b"\n")) >= 0:
+            line = bytes(buffer[: index + 1])
+            del buffer[: index + 1]
+            yield line
+        if len(buffer) > max_line_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"NDJSON lines must be at most {max_line_bytes} bytes.",
+            )
+    if buffer:
+        yield bytes(buffer)
+
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_usage(
+    request: Request,
+    response: Response,
+    x_agent_signature: str | None = Header(default=None, alias="X-Agent-Signature"),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+    session: Session = Depends(get_system_session),
+) -> dict[str, int | float]:
+    try:
+        raw_body = await read_decoded(
+            request.stream(),
+            request.headers.get("content-encoding"),
+            max_bytes=settings.ingest_max_body_bytes,
+        )
+    except BodyDecodingError as exc:
+        raise _decoding_error(exc) from exc
+
+    digest = ingest_service.body_digest(raw_body)
+    receipt = ingest_service.find_receipt(x_agent_signature, idempotency_key, digest)
+    if receipt is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return receipt
+
+    media_type = ingest_service.media_type_of(request.headers.get("content-type"))
+    try:
+        payload = ingest_service.parse_payload(raw_body, media_type)
+    except ValidationError as exc:
+        raise _invalid_payload(exc) from exc
+    except ingest_service.UnsupportedMediaTypeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(exc),
+            headers={"Accept-Post": ", ".join(ingest_service.supported_media_types())},
+        ) from exc
+    except ingest_service.MalformedPayloadError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    credential, agent_token = _load_local_credential(session, payload)
+    if not local_agents.verify_signature(agent_token, x_agent_signature, raw_body):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Local Connector signature.")
+
+    now = datetime.now(timezone.utc)
+    _ensure_sync_allowed(session, credential, now)
+
+    if settings.ingest_async_enabled:
+        try:
+            ingest_service.enqueue_payload(credential.connection_id, raw_body, now, media_type)
+            # last_synced_at only moves when the queue drains, so the interval starts at enqueue.
+            local_agents.record_sync(credential.connection_id, now)
+            result = {"queued": payload.sample_count}
+            ingest_service.store_receipt(x_agent_signature, idempotency_key, digest, result)
+            return result
+        except redis.RedisError as exc:
+            logger.warning(
+                "Ingest queue unavailable for %s, writing inline: %s", credential.connection_id, exc
+            )
+
+    samples = build_payload_samples(credential.org_id, credential.connection_id, payload)
+    dedupe = dedupe_service.filter_known(session, samples)
+    created = usage_service.save_usage_samples(session, dedupe.fresh)
+    last_ts = samples.max_ts() or now
+    _mark_synced(session, credential, last_ts, now)
+    dedupe_service.remember(samples)
+    result = {"ingested": created, **_dedupe_report(dedupe.skipped, dedupe.checked)}
+    ingest_service.store_receipt(x_agent_signature, idempotency_key, digest, result)
+    return result
+
+
+@router.post("/stream", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_usage_stream(
+    request: Request,
+    x_agent_signature: str | None = Header(default=None, alias="X-Agent-Signature"),
+    session: Session = Depends(get_system_session),
+) -> dict[str, int | float]:
+    """Ingest newline-delimited samples that follow a header line, writing them in micro-batches.
+
+    The signature covers the raw body exactly as for ``POST /ingest/``. Each micro-batch is
+    written inside one open transaction that is only committed once the trailing bytes verify; a
+    bad signature or sample rolls everything back, and the dedupe filter is updated after commit.
+    """
+
+    decoded = iter_decoded(
+        request.stream(),
+        request.headers.get("content-encoding"),
+        max_bytes=settings.ingest_max_body_bytes,
+    )
+    lines = _iter_lines(decoded, settings.ingest_stream_max_line_bytes)
+    try:
+        header_line = await anext(lines, None)
+    except BodyDecodingError as exc:
+        raise _decoding_error(exc) from exc
+    if header_line is None or not header_line.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stream header line is missing.")
+    try:
+        header = LocalUsageIngestHeader.model_validate_json(header_line)
+    except ValidationError as exc:
+        raise _invalid_payload(exc) from exc
+
+    credential, agent_token = _load_local_credential(session, header)
+    signer = local_agents.payload_signer(agent_token)
+    signer.update(header_line)
+
+    now = datetime.now(timezone.utc)
+    _ensure_sync_allowed(session, credential, now)
+    created = 0
+    received = 0
+    skipped = 0
+    last_ts: datetime | None = None
+    batch: list[LocalUsageSample] = []
+
+    def flush() -> None:
+        nonlocal created, skipped, last_ts
+        samples = build_usage_samples(credential.org_id, credential.connection_id, header, batch)
+        batch_last_ts = samples.max_ts()
+        last_ts = batch_last_ts if last_ts is None else max(last_ts, batch_last_ts)
+        dedupe = dedupe_service.filter_known(session, samples)
+        skipped += dedupe.skipped
+        created += usage_service.save_usage_samples(session, dedupe.fresh)
+        dedupe_service.remember_on_commit(session, samples)
+        batch.clear()
+
+    try:
+        async for line in lines:
+            signer.update(line)
+            stripped = line.strip()
+            if not stripped:
+                continue
+            batch.append(LocalUsageSample.model_validate_json(stripped))
+            received += 1
+            if len(batch) >= settings.ingest_stream_batch_size:
+                flush()
+    except ValidationError as exc:
+        session.rollback()
+        raise _invalid_payload(exc) from exc
+    except BodyDecodingError as exc:
+        session.rollback()
+        raise _decoding_error(exc) from exc
+    if batch:
+        flush()
+
+    if not local_agents.verify_signer(signer, x_agent_signature):
+        session.rollback()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Local Connector signature.")
+    if received == 0:
+        session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stream contained no samples.")
+
+    _mark_synced(session, credential, last_ts or now, now)
+    return {"ingested": created, "received": received, **_dedupe_report(skipped, received)}
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from api_compass.api.deps import OrgScope, get_db_session, get_org_scope
 from api_compass.models.enums import EnvironmentType, ProviderType
-from api_compass.schemas import UsageProjection, UsageTip
+from api_compass.schemas import UsageMonthToDate, UsageProjection, UsageTip
 from api_compass.services import entitlements as entitlement_service
 from api_compass.services import tips as tips_service
 from api_compass.services import usage as usage_service
@@ -57,6 +57,25 @@ def read_usage_projections(
     ]
 
 
+@router.get("/mtd", response_model=list[UsageMonthToDate])
+def read_month_to_date_spend(
+    environment: EnvironmentType = EnvironmentType.PROD,
+    provider: ProviderType | None = None,
+    session: Session = Depends(get_db_session),
+    org_scope: OrgScope = Depends(get_org_scope),
+) -> list[UsageMonthToDate]:
+    totals = usage_service.get_month_to_date_spend(
+        session=session,
+        org_id=org_scope.org_id,
+        environment=environment,
+        provider=provider,
+    )
+    return [
+        UsageMonthToDate(provider=prov, environment=environment, month_to_date_spend=spend)
+        for prov, spend in totals.items()
+    ]
+
+
 @router.get("/tips", response_model=list[UsageTip])
 def read_usage_tips(
     environment: EnvironmentType = EnvironmentType.PROD,
@@ -19,6 +19,7 @@ celery_app = Celery(
         "api_compass.workers.alerts",
         "api_compass.workers.entitlements",
         "api_compass.workers.cleanup",
+        "api_compass.workers.ingest",
     ],
 )
 
@@ -48,6 +49,21 @@ celery_app.conf.beat_schedule = {
         "schedule": crontab(minute=0),
         "options": {"queue": "polling"},
     },
+    "polling-dispatch-due": {
+        "task": "polling.dispatch_due",
+        "schedule": settings.worker_sync_dispatch_interval_seconds,
+        "options": {"queue": "polling"},
+    },
+    "ingest-drain-queue": {
+        "task": "ingest.drain_queue",
+        "schedule": settings.ingest_queue_drain_interval_seconds,
+        "options": {"queue": "ingest"},
+    },
+    "usage-reconcile-mtd-spend": {
+        "task": "usage.reconcile_mtd_spend",
+        "schedule": crontab(minute="*/15"),
+        "options": {"queue": "cleanup"},
+    },
     "alerts-evaluate": {
         "task": "alerts.evaluate",
         "schedule": crontab(minute="*/15"),
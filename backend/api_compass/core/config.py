@@ -13,6 +13,11 @@ class MailProvider(str, Enum):
     SES = "ses"
 
 
+class PollMode(str, Enum):
+    SYNTHETIC = "synthetic"
+    ASYNC = "async"
+
+
 PLACEHOLDER_VALUES = {"", "replace-me", "changeme"}
 
 
@@ -56,6 +61,139 @@ class Settings(BaseSettings):
         ge=0.0,
         le=0.5,
     )
+    worker_poll_shard_size: int = Field(
+        default=25,
+        alias="WORKER_POLL_SHARD_SIZE",
+        ge=1,
+        le=1000,
+        description="Connections handled by each fan-out polling task.",
+    )
+    worker_poll_commit_batch_size: int = Field(
+        default=50,
+        alias="WORKER_POLL_COMMIT_BATCH_SIZE",
+        ge=1,
+        le=1000,
+        description="Polled connections committed per transaction; 1 commits every connection on its own.",
+    )
+    worker_poll_commit_interval_ms: int = Field(
+        default=500,
+        alias="WORKER_POLL_COMMIT_INTERVAL_MS",
+        ge=0,
+        le=60000,
+        description="Commit a partial group once its first connection has waited this long.",
+    )
+    worker_sync_dispatch_interval_seconds: float = Field(
+        default=5.0,
+        alias="WORKER_SYNC_DISPATCH_INTERVAL_SECONDS",
+        ge=1.0,
+        le=300.0,
+        description="How often beat checks connections:sync-jobs for connections whose next sync is due.",
+    )
+    worker_sync_dispatch_batch_size: int = Field(
+        default=500,
+        alias="WORKER_SYNC_DISPATCH_BATCH_SIZE",
+        ge=1,
+        le=10000,
+        description="Due sync jobs claimed from Redis per dispatcher round trip.",
+    )
+    worker_sync_dispatch_max_batches: int = Field(
+        default=20,
+        alias="WORKER_SYNC_DISPATCH_MAX_BATCHES",
+        ge=1,
+        le=1000,
+        description="Upper bound on claim batches per dispatcher run so one tick cannot monopolise a worker.",
+    )
+    worker_poll_mode: PollMode = Field(
+        default=PollMode.SYNTHETIC,
+        alias="WORKER_POLL_MODE",
+        description="'synthetic' generates sample usage; 'async' fetches provider usage APIs concurrently.",
+    )
+    provider_api_base_url: str | None = Field(
+        default=None,
+        alias="PROVIDER_API_BASE_URL",
+        description="Overrides every provider API host, e.g. to point the poller at a fake server.",
+    )
+    provider_poll_concurrency: int = Field(
+        default=20,
+        alias="PROVIDER_POLL_CONCURRENCY",
+        ge=1,
+        le=500,
+        description="In-flight usage requests per provider for the asyncio poller.",
+    )
+    provider_rate_limits: dict[str, float] = Field(
+        default_factory=lambda: {"openai": 10.0, "twilio": 25.0, "sendgrid": 10.0},
+        alias="PROVIDER_RATE_LIMITS",
+        description="Requests per second allowed per provider across all polling workers (JSON object).",
+    )
+    provider_rate_limit_burst: int = Field(
+        default=10,
+        alias="PROVIDER_RATE_LIMIT_BURST",
+        ge=1,
+        le=1000,
+    )
+    provider_key_rate_limit_per_second: float = Field(
+        default=0.0,
+        alias="PROVIDER_KEY_RATE_LIMIT_PER_SECOND",
+        ge=0,
+        description="Optional per-credential request rate; 0 disables the per-key bucket.",
+    )
+    provider_rate_limit_max_wait_seconds: float = Field(
+        default=30.0,
+        alias="PROVIDER_RATE_LIMIT_MAX_WAIT_SECONDS",
+        ge=0,
+        le=600,
+    )
+    provider_circuit_failure_threshold: int = Field(
+        default=5,
+        alias="PROVIDER_CIRCUIT_FAILURE_THRESHOLD",
+        ge=0,
+        le=1000,
+        description="Consecutive 5xx/transport failures that open a provider's circuit; 0 disables the breaker.",
+    )
+    provider_circuit_open_seconds: int = Field(
+        default=120,
+        alias="PROVIDER_CIRCUIT_OPEN_SECONDS",
+        ge=5,
+        le=3600,
+        description="How long an open circuit defers polls before probing the provider again.",
+    )
+    provider_poll_overlap_seconds: int = Field(
+        default=7200,
+        alias="PROVIDER_POLL_OVERLAP_SECONDS",
+        ge=0,
+        le=7 * 86400,
+        description="How far before each connection's usage cursor a poll re-reads, to catch late-published buckets.",
+    )
+    provider_poll_max_pages: int = Field(
+        default=10,
+        alias="PROVIDER_POLL_MAX_PAGES",
+        ge=1,
+        le=1000,
+        description="Usage pages fetched per connection per poll; the rest resume from the stored page token.",
+    )
+    provider_conditional_requests_enabled: bool = Field(
+        default=True,
+        alias="PROVIDER_CONDITIONAL_REQUESTS_ENABLED",
+        description="Send stored ETag/Last-Modified validators and skip unchanged (304) usage responses.",
+    )
+    provider_validator_ttl_seconds: int = Field(
+        default=2 * 86400,
+        alias="PROVIDER_VALIDATOR_TTL_SECONDS",
+        ge=3600,
+        le=30 * 86400,
+    )
+    provider_http_max_connections: int = Field(
+        default=100,
+        alias="PROVIDER_HTTP_MAX_CONNECTIONS",
+        ge=1,
+        le=1000,
+    )
+    provider_http_timeout_seconds: float = Field(
+        default=15.0,
+        alias="PROVIDER_HTTP_TIMEOUT_SECONDS",
+        gt=0,
+        le=120,
+    )
     worker_retry_max_attempts: int = Field(
         default=5,
         alias="WORKER_RETRY_MAX_ATTEMPTS",
@@ -68,6 +206,13 @@ class Settings(BaseSettings):
         ge=5,
         le=600,
     )
+    worker_sync_retry_max_seconds: int = Field(
+        default=3600,
+        alias="WORKER_SYNC_RETRY_MAX_SECONDS",
+        ge=60,
+        le=86400,
+        description="Cap on the doubling retry delay of a connection whose syncs keep failing.",
+    )
     worker_idempotency_ttl_seconds: int = Field(
         default=5400,
         alias="WORKER_IDEMPOTENCY_TTL_SECONDS",
@@ -116,6 +261,20 @@ class Settings(BaseSettings):
         ge=5,
         le=360,
     )
+    entitlements_cache_ttl_seconds: int = Field(
+        default=300,
+        alias="ENTITLEMENTS_CACHE_TTL_SECONDS",
+        ge=10,
+        le=3600,
+        description="Lifetime of cached FeatureSnapshot entries in Redis.",
+    )
+    entitlements_local_cache_ttl_seconds: int = Field(
+        default=30,
+        alias="ENTITLEMENTS_LOCAL_CACHE_TTL_SECONDS",
+        ge=0,
+        le=600,
+        description="Lifetime of the per-process FeatureSnapshot cache; 0 disables it.",
+    )
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     raw_event_retention_days: int = Field(
         default=180,
@@ -137,6 +296,106 @@ class Settings(BaseSettings):
         le=1800,
     )
 
+    ingest_copy_threshold: int = Field(
+        default=5000,
+        alias="INGEST_COPY_THRESHOLD",
+        ge=100,
+        description="Sample count at which usage writes switch to COPY-based staging.",
+    )
+
+    ingest_async_enabled: bool = Field(
+        default=False,
+        alias="INGEST_ASYNC_ENABLED",
+        description="Queue verified ingest payloads on a Redis stream instead of writing inline.",
+    )
+    ingest_queue_batch_size: int = Field(
+        default=200,
+        alias="INGEST_QUEUE_BATCH_SIZE",
+        ge=1,
+        le=5000,
+    )
+    ingest_queue_max_length: int = Field(
+        default=100_000,
+        alias="INGEST_QUEUE_MAX_LENGTH",
+        ge=1000,
+    )
+    ingest_queue_max_deliveries: int = Field(
+        default=5,
+        alias="INGEST_QUEUE_MAX_DELIVERIES",
+        ge=1,
+        le=100,
+        description="Deliveries of a failing queue entry before it moves to the dead-letter stream.",
+    )
+    ingest_queue_drain_interval_seconds: float = Field(
+        default=5.0,
+        alias="INGEST_QUEUE_DRAIN_INTERVAL_SECONDS",
+        ge=0.5,
+        le=300.0,
+        description="Beat interval of the task that writes queued ingest payloads to Postgres.",
+    )
+    ingest_dedupe_enabled: bool = Field(
+        default=False,
+        alias="INGEST_DEDUPE_ENABLED",
+        description="Skip already-ingested samples using a Redis Bloom filter before hitting Postgres.",
+    )
+    ingest_dedupe_filter_bits: int = Field(
+        default=65536,
+        alias="INGEST_DEDUPE_FILTER_BITS",
+        ge=1024,
+        le=2**24,
+        description="Bits in the first Bloom filter slice per connection and day; later slices double.",
+    )
+    ingest_dedupe_trust_hit_rate: float = Field(
+        default=1.0,
+        alias="INGEST_DEDUPE_TRUST_HIT_RATE",
+        ge=0.5,
+        le=1.0,
+        description="Filter hit rate at which a batch counts as a replay and hits skip the Postgres lookup.",
+    )
+    ingest_dedupe_ttl_seconds: int = Field(
+        default=2 * 24 * 3600,
+        alias="INGEST_DEDUPE_TTL_SECONDS",
+        ge=3600,
+        le=14 * 24 * 3600,
+    )
+    ingest_credential_cache_size: int = Field(
+        default=10_000,
+        alias="INGEST_CREDENTIAL_CACHE_SIZE",
+        ge=0,
+        description="Connections whose decrypted agent credentials are kept per API process.",
+    )
+    ingest_credential_cache_ttl_seconds: int = Field(
+        default=60,
+        alias="INGEST_CREDENTIAL_CACHE_TTL_SECONDS",
+        ge=1,
+        le=3600,
+    )
+    ingest_max_body_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        alias="INGEST_MAX_BODY_BYTES",
+        ge=1024,
+        description="Upper bound on decompressed /ingest/ request bodies.",
+    )
+    ingest_stream_batch_size: int = Field(
+        default=500,
+        alias="INGEST_STREAM_BATCH_SIZE",
+        ge=1,
+        le=10000,
+        description="Samples written per micro-batch on the streaming ingest endpoint.",
+    )
+    ingest_stream_max_line_bytes: int = Field(
+        default=64 * 1024,
+        alias="INGEST_STREAM_MAX_LINE_BYTES",
+        ge=1024,
+    )
+    ingest_idempotency_ttl_seconds: int = Field(
+        default=24 * 3600,
+        alias="INGEST_IDEMPOTENCY_TTL_SECONDS",
+        ge=0,
+        le=7 * 24 * 3600,
+        description="How long /ingest/ responses are replayed for retried requests; 0 disables receipts.",
+    )
+
     secret_key: SecretStr = Field(alias="SECRET_KEY")
     encryption_key: SecretStr = Field(
         alias="ENCRYPTION_KEY",
@@ -17,6 +17,8 @@ logger = logging.getLogger(__name__)
 def setup_logging() -> None:
     level = getattr(logging, settings.log_level.upper(), logging.INFO)
     logging.basicConfig(level=level, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    # The asyncio poller issues hundreds of requests per shard; httpx logs each one at INFO.
+    logging.getLogger("httpx").setLevel(max(level, logging.WARNING))
 
 
 def setup_sentry() -> None:
@@ -126,6 +126,8 @@ class Connection(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     local_connector_enabled: Mapped[bool] = mapped_column(sa.Boolean, nullable=False, server_default=sa.false())
     local_agent_last_seen_at: Mapped[datetime | None] = mapped_column(sa.DateTime(timezone=True))
     last_synced_at: Mapped[datetime | None] = mapped_column(sa.DateTime(timezone=True))
+    usage_cursor_at: Mapped[datetime | None] = mapped_column(sa.DateTime(timezone=True))
+    usage_cursor: Mapped[str | None] = mapped_column(sa.String(length=1024))
 
     org: Mapped[Org] = relationship("Org", back_populates="connections")
     raw_events: Mapped[list["RawUsageEvent"]] = relationship(
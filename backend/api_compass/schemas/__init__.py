@@ -1,7 +1,7 @@
 from .budgets import BudgetCreate, BudgetRead
 from .connections import ConnectionCreate, ConnectionRead
 from .entitlements import FeatureFlags
-from .usage import UsageProjection, UsageTip
+from .usage import UsageMonthToDate, UsageProjection, UsageTip
 
 __all__ = [
     "BudgetCreate",
@@ -9,6 +9,7 @@ __all__ = [
     "ConnectionCreate",
     "ConnectionRead",
     "FeatureFlags",
+    "UsageMonthToDate",
     "UsageProjection",
     "UsageTip",
 ]
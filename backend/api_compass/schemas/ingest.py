@@ -2,10 +2,10 @@ from __future__ import annotations
 
 from datetime import datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from api_compass.models.enums import EnvironmentType, ProviderType
 
@@ -20,10 +20,72 @@ class LocalUsageSample(BaseModel):
     metadata: dict[str, Any] | None = None
 
 
-class LocalUsageIngest(BaseModel):
+class LocalUsageIngestHeader(BaseModel):
     connection_id: UUID
     provider: ProviderType
     environment: EnvironmentType
     source: str = Field(default="local-agent", min_length=3, max_length=50)
     agent_version: str = Field(default="local-connector/1.0", min_length=3, max_length=64)
+
+
+class LocalUsageIngest(LocalUsageIngestHeader):
     samples: list[LocalUsageSample] = Field(min_length=1)
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.samples)
+
+
+COLUMNAR_FORMAT_VERSION = 1
+_MAX_EPOCH_SECONDS = 253_402_300_799  # 9999-12-31T23:59:59Z
+
+
+class LocalUsageColumns(BaseModel):
+    """Parallel sample arrays; ``metric``, ``unit`` and ``currency`` index into ``strings``."""
+
+    metric: list[int]
+    unit: list[int]
+    currency: list[int] | None = None
+    quantity: list[int | Decimal]
+    unit_cost: list[int | Decimal | None] | None = None
+    ts: list[int]
+    metadata: list[dict[str, Any] | None] | None = None
+
+
+class LocalUsageColumnarIngest(LocalUsageIngestHeader):
+    """Columnar ingest payload: ``ts`` is epoch seconds and currency defaults to ``usd``."""
+
+    version: Literal[1] = COLUMNAR_FORMAT_VERSION
+    strings: list[str] = Field(min_length=1)
+    columns: LocalUsageColumns
+
+    @model_validator(mode="after")
+    def _check_columns(self) -> LocalUsageColumnarIngest:
+        columns = self.columns
+        rows = len(columns.metric)
+        if rows == 0:
+            raise ValueError("columns must contain at least one sample")
+        for name in ("unit", "currency", "quantity", "unit_cost", "ts", "metadata"):
+            values = getattr(columns, name)
+            if values is not None and len(values) != rows:
+                raise ValueError(f"columns.{name} has {len(values)} values, expected {rows}")
+        if min(columns.ts) < 0 or max(columns.ts) > _MAX_EPOCH_SECONDS:
+            raise ValueError("columns.ts values must be epoch seconds between 1970 and 9999")
+
+        limits = {"metric": (1, 255), "unit": (1, 64), "currency": (3, 3)}
+        for name, (min_length, max_length) in limits.items():
+            indices = getattr(columns, name)
+            if indices is None:
+                continue
+            for index in set(indices):
+                if not 0 <= index < len(self.strings):
+                    raise ValueError(f"columns.{name} references unknown string index {index}")
+                if not min_length <= len(self.strings[index]) <= max_length:
+                    raise ValueError(
+                        f"columns.{name} values must be {min_length}-{max_length} characters long"
+                    )
+        return self
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.columns.metric)
@@ -29,6 +29,13 @@ class UsageProjection(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class UsageMonthToDate(BaseModel):
+    provider: ProviderType
+    environment: EnvironmentType
+    currency: str = Field(default="usd")
+    month_to_date_spend: Decimal
+
+
 class UsageTip(BaseModel):
     title: str
     body: str
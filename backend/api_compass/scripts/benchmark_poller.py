@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from api_compass.core.config import get_settings
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services import providers
+from api_compass.utils.crypto import encrypt_auth_payload
+
+
+def _fake_connections(provider: ProviderType, count: int) -> list[Connection]:
+    connections = []
+    for index in range(count):
+        api_key = f"AC{index:032d}:token-{index}" if provider == ProviderType.TWILIO else f"sk-bench-{index}"
+        connections.append(
+            Connection(
+                id=uuid4(),
+                org_id=uuid4(),
+                provider=provider,
+                environment=EnvironmentType.PROD,
+                status=ConnectionStatus.ACTIVE,
+                encrypted_auth_blob=encrypt_auth_payload({"api_key": api_key}),
+                metadata_json={},
+            )
+        )
+    return connections
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure asyncio poller throughput against a provider API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8090", help="Usually the fake provider server")
+    parser.add_argument("--provider", choices=[provider.value for provider in ProviderType], default="openai")
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3, help="Later rounds reuse pooled keep-alive connections")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.provider_api_base_url = args.base_url
+    connections = _fake_connections(ProviderType(args.provider), args.connections)
+
+    for round_number in range(1, args.rounds + 1):
+        start = time.perf_counter()
+        results = providers.fetch_usage(connections, datetime.now(timezone.utc))
+        elapsed = time.perf_counter() - start
+        failures = sum(isinstance(result, BaseException) for result in results)
+        print(
+            f"round={round_number} connections={len(connections)} failures={failures} "
+            f"elapsed={elapsed:.2f}s throughput={len(connections) / elapsed:.1f}/s "
+            f"concurrency={settings.provider_poll_concurrency}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import argparse
+
+from api_compass.db.session import SessionLocal
+from api_compass.services import entitlements as entitlement_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Create org_entitlements rows for every org that does not have one yet"
+    )
+    parser.parse_args()
+
+    with SessionLocal() as session:
+        created = entitlement_service.bootstrap_entitlements(session)
+    print(f"created {created} entitlement rows")
+
+
+if __name__ == "__main__":
+    main()
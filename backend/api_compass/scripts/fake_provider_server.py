@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+app = FastAPI(title="Fake provider usage APIs")
+app.state.latency_ms = 0.0
+app.state.error_rate = 0.0
+
+
+def _seed(request: Request, bucket: object) -> random.Random:
+    # Deterministic per credential and bucket so overlapping polls see identical history.
+    credential = request.headers.get("authorization", "")
+    return random.Random(zlib.crc32(f"{credential}:{bucket}".encode("utf-8")))
+
+
+async def _simulate(request: Request) -> None:
+    latency = request.app.state.latency_ms
+    if latency:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * latency / 1000)
+
+
+def _maybe_fail() -> bool:
+    return random.random() < app.state.error_rate
+
+
+def _throttled() -> JSONResponse:
+    return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+
+
+def _respond(request: Request, payload: object) -> Response:
+    # Usage history is deterministic, so a body hash is a valid strong ETag.
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    etag = f'"{zlib.crc32(body):08x}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+def _days(start: str | None, end: str | None) -> list[date]:
+    today = datetime.now(timezone.utc).date()
+    first = date.fromisoformat(start) if start else today
+    last = min(date.fromisoformat(end) if end else today, today)
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+@app.get("/v1/organization/usage/completions")
+async def openai_usage(request: Request):
+    await _simulate(request)
+    if _maybe_fail():
+        return _throttled()
+    limit = int(request.query_params.get("limit", 24))
+    offset = int(request.query_params.get("page", 0))
+    now = int(datetime.now(timezone.utc).timestamp())
+    first = int(request.query_params.get("start_time", now)) // 3600 * 3600 + offset * 3600
+    starts = list(range(first, now, 3600))
+    data = []
+    for start in starts[:limit]:
+        rng = _seed(request, start)
+        data.append(
+            {
+                "object": "bucket",
+                "start_time": start,
+                "end_time": start + 3600,
+                "results": [
+                    {
+                        "input_tokens": rng.randint(6_000, 30_000),
+                        "output_tokens": rng.randint(3_000, 25_000),
+                        "num_model_requests": rng.randint(4, 60),
+                    }
+                ],
+            }
+        )
+    has_more = len(starts) > limit
+    return _respond(
+        request,
+        {"object": "page", "data": data, "has_more": has_more, "next_page": str(offset + limit) if has_more else None},
+    )
+
+
+@app.get("/2010-04-01/Accounts/{account_sid}/Usage/Records/Daily.json")
+async def twilio_usage(account_sid: str, request: Request):
+    await _simulate(request)
+    if _maybe_fail():
+        return _throttled()
+    records = []
+    for day in _days(request.query_params.get("StartDate"), request.query_params.get("EndDate")):
+        rng = _seed(request, day)
+        records.append(
+            {"category": "sms", "start_date": day.isoformat(), "usage": str(rng.randint(150, 2_500)), "count": "0"}
+        )
+        records.append(
+            {"category": "calls", "start_date": day.isoformat(), "usage": str(rng.randint(25, 480)), "count": "0"}
+        )
+    return _respond(request, {"usage_records": records, "next_page_uri": None})
+
+
+@app.get("/v3/stats")
+async def sendgrid_usage(request: Request):
+    await _simulate(request)
+    if _maybe_fail():
+        return _throttled()
+    stats = []
+    for day in _days(request.query_params.get("start_date"), request.query_params.get("end_date")):
+        requests = _seed(request, day).randint(1_000, 8_000)
+        metrics = {"requests": requests, "delivered": int(requests * 0.97), "bounces": requests // 100}
+        stats.append({"date": day.isoformat(), "stats": [{"metrics": metrics}]})
+    return _respond(request, stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI/Twilio/SendGrid usage APIs for poller benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Mean simulated response latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+from enum import Enum
+from typing import Final
+
+import redis
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ProviderType
+from api_compass.services.jobs import redis_client
+
+logger = logging.getLogger(__name__)
+
+_CIRCUIT_PREFIX: Final[str] = "circuit:provider:"
+# Consecutive-failure counters outlive any sensible outage but are not kept forever.
+_FAILURES_TTL_SECONDS: Final[int] = 86400
+
+
+class Admission(str, Enum):
+    CLOSED = "closed"
+    PROBE = "probe"
+    OPEN = "open"
+
+
+def _keys(provider: ProviderType) -> tuple[str, str, str]:
+    base = f"{_CIRCUIT_PREFIX}{provider.value}"
+    return f"{base}:failures", f"{base}:open", f"{base}:probe"
+
+
+def _enabled() -> bool:
+    return settings.provider_circuit_failure_threshold > 0
+
+
+def admit(provider: ProviderType) -> Admission:
+    """Decide whether polls for ``provider`` may go out.
+
+    The circuit stays open for ``PROVIDER_CIRCUIT_OPEN_SECONDS`` after tripping. Once that lapses
+    it is half-open: one caller at a time is admitted as a probe until a poll succeeds. Redis
+    errors fail open (closed circuit) so a cache outage never stops polling.
+    """
+
+    if not _enabled():
+        return Admission.CLOSED
+    failures_key, open_key, probe_key = _keys(provider)
+    client = redis_client()
+    try:
+        failures, opened = client.mget([failures_key, open_key])
+        if opened is not None:
+            return Admission.OPEN
+        if int(failures or 0) < settings.provider_circuit_failure_threshold:
+            return Admission.CLOSED
+        probe_ttl = max(int(settings.provider_http_timeout_seconds * 2), 1)
+        if client.set(probe_key, "1", nx=True, ex=probe_ttl):
+            return Admission.PROBE
+        return Admission.OPEN
+    except redis.RedisError as exc:
+        logger.warning("Circuit breaker unavailable for %s: %s", provider.value, exc)
+        return Admission.CLOSED
+
+
+def record_failure(provider: ProviderType) -> bool:
+    """Count an outage-style failure and return whether the circuit is now open."""
+
+    if not _enabled():
+        return False
+    failures_key, open_key, probe_key = _keys(provider)
+    try:
+        pipe = redis_client().pipeline(transaction=False)
+        pipe.incr(failures_key)
+        pipe.expire(failures_key, _FAILURES_TTL_SECONDS)
+        failures = pipe.execute()[0]
+        if failures < settings.provider_circuit_failure_threshold:
+            return False
+        pipe = redis_client().pipeline(transaction=False)
+        pipe.set(open_key, str(failures), ex=settings.provider_circuit_open_seconds)
+        pipe.delete(probe_key)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to record %s failure in circuit breaker: %s", provider.value, exc)
+        return False
+    return True
+
+
+def record_success(provider: ProviderType) -> None:
+    if not _enabled():
+        return
+    try:
+        redis_client().delete(*_keys(provider))
+    except redis.RedisError as exc:
+        logger.warning("Unable to reset %s circuit breaker: %s", provider.value, exc)
+
+
+def states() -> dict[str, str]:
+    """Return ``closed``, ``half_open`` or ``open`` per provider, for healthz."""
+
+    if not _enabled():
+        return {}
+    providers = list(ProviderType)
+    keys = [key for provider in providers for key in _keys(provider)[:2]]
+    values = redis_client().mget(keys)
+    threshold = settings.provider_circuit_failure_threshold
+    report: dict[str, str] = {}
+    for index, provider in enumerate(providers):
+        failures, opened = values[index * 2], values[index * 2 + 1]
+        if opened is not None:
+            report[provider.value] = "open"
+        elif int(failures or 0) >= threshold:
+            report[provider.value] = "half_open"
+        else:
+            report[provider.value] = "closed"
+    return report
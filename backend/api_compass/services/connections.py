@@ -106,7 +106,7 @@ def create_connection(session: Session, org_id: UUID, payload: ConnectionCreate)
         metadata={"provider": connection.provider.value, "environment": connection.environment.value},
     )
     if not payload.local_connector_enabled:
-        jobs.schedule_sync(connection.id)
+        jobs.request_first_sync(connection.id, connection.provider)
     return _build_response(connection, agent_token=agent_token)
 
 
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Final
+from uuid import UUID
+
+import redis
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from api_compass.core.config import settings
+from api_compass.models.tables import RawUsageEvent
+from api_compass.services.jobs import redis_client
+from api_compass.services.usage import BULK_INSERT_CHUNK_SIZE, UsageSampleBatch
+
+logger = logging.getLogger(__name__)
+
+_FILTER_PREFIX: Final[str] = "ingest:seen:"
+_HASH_COUNT: Final[int] = 4
+# Twelve bits per sample with four hashes keeps each slice's false-positive rate below 1%.
+_BITS_PER_SAMPLE: Final[int] = 12
+# Slice 15 of a 64 KiB-bit filter is already 256 MiB; nothing legitimate needs more.
+_MAX_SLICES: Final[int] = 16
+_PENDING_KEY: Final[str] = "dedupe.pending"
+
+
+@dataclass(slots=True)
+class DedupeResult:
+    fresh: UsageSampleBatch
+    skipped: int = 0
+    checked: int = 0
+
+
+def _filter_key(batch: UsageSampleBatch, index: int) -> str:
+    scope = batch.connection_ids[index] or batch.org_ids[index]
+    return f"{_FILTER_PREFIX}{scope}:{batch.days[index].isoformat()}"
+
+
+def _count_key(filter_key: str) -> str:
+    return f"{filter_key}:n"
+
+
+def _hashes(event_id: UUID) -> list[int]:
+    digest = blake2b(event_id.bytes, digest_size=4 * _HASH_COUNT).digest()
+    return [int.from_bytes(digest[index * 4 : index * 4 + 4], "big") for index in range(_HASH_COUNT)]
+
+
+def _slice_bounds(slice_index: int) -> tuple[int, int]:
+    """Return the first bit and the size of slice ``slice_index`` within the filter's bitmap."""
+
+    base = settings.ingest_dedupe_filter_bits
+    return base * ((1 << slice_index) - 1), base << slice_index
+
+
+def _active_slice(count: int) -> int:
+    """Slice that new samples go into once ``count`` samples have been recorded for the key.
+
+    Each slice doubles the previous one and takes samples until it reaches its capacity, so the
+    filter grows with the connection's daily volume instead of saturating on large backfills.
+    """
+
+    filled = 0
+    for slice_index in range(_MAX_SLICES):
+        filled += _slice_bounds(slice_index)[1] // _BITS_PER_SAMPLE
+        if count < filled:
+            return slice_index
+    return _MAX_SLICES - 1
+
+
+def _offsets(hashes: list[int], slice_index: int) -> list[int]:
+    start, size = _slice_bounds(slice_index)
+    return [start + value % size for value in hashes]
+
+
+def _recorded_counts(client: redis.Redis, keys: list[str]) -> dict[str, int]:
+    counts = client.mget([_count_key(key) for key in keys])
+    return {key: int(count or 0) for key, count in zip(keys, counts)}
+
+
+def _existing_ids(session: Session, batch: UsageSampleBatch, candidates: list[int]) -> set[UUID]:
+    confirmed: set[UUID] = set()
+    for start in range(0, len(candidates), BULK_INSERT_CHUNK_SIZE):
+        chunk = candidates[start : start + BULK_INSERT_CHUNK_SIZE]
+        timestamps = [batch.ts(index) for index in chunk]
+        confirmed.update(
+            session.execute(
+                select(RawUsageEvent.id)
+                .where(RawUsageEvent.id.in_([batch.event_ids[index] for index in chunk]))
+                .where(RawUsageEvent.ts.between(min(timestamps), max(timestamps)))
+            ).scalars()
+        )
+    return confirmed
+
+
+def filter_known(session: Session, batch: UsageSampleBatch) -> DedupeResult:
+    """Drop samples that are already stored, consulting the Bloom filter before Postgres.
+
+    Filter hits are only probable duplicates, so they are confirmed with one indexed lookup per
+    chunk. A batch whose hit rate reaches ``INGEST_DEDUPE_TRUST_HIT_RATE`` is a replay and its hits
+    are skipped without a lookup, at the cost of dropping a new sample that collides in the filter.
+    Any Redis failure lets every sample through to the normal ``ON CONFLICT`` path.
+    """
+
+    result = DedupeResult(fresh=batch, checked=len(batch))
+    if not settings.ingest_dedupe_enabled or not len(batch):
+        return result
+
+    keys = [_filter_key(batch, index) for index in range(len(batch))]
+    client = redis_client()
+    try:
+        counts = _recorded_counts(client, list(set(keys)))
+        pipe = client.pipeline(transaction=False)
+        probes: list[int] = []
+        for event_id, key in zip(batch.event_ids, keys):
+            hashes = _hashes(event_id)
+            slices = _active_slice(counts[key]) + 1
+            for slice_index in range(slices):
+                for offset in _offsets(hashes, slice_index):
+                    pipe.getbit(key, offset)
+            probes.append(slices)
+        bits = pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Dedupe filter unavailable, skipping pre-filter: %s", exc)
+        return result
+
+    candidates: list[int] = []
+    position = 0
+    for index, slices in enumerate(probes):
+        # A sample is a probable duplicate if any one slice has all of its bits set.
+        if any(
+            all(bits[position + slice_index * _HASH_COUNT : position + (slice_index + 1) * _HASH_COUNT])
+            for slice_index in range(slices)
+        ):
+            candidates.append(index)
+        position += slices * _HASH_COUNT
+    if not candidates:
+        return result
+
+    if len(candidates) >= settings.ingest_dedupe_trust_hit_rate * len(batch):
+        skip = set(candidates)
+        keep = [index for index in range(len(batch)) if index not in skip]
+    else:
+        confirmed = _existing_ids(session, batch, candidates)
+        if not confirmed:
+            return result
+        keep = [index for index, event_id in enumerate(batch.event_ids) if event_id not in confirmed]
+    result.fresh = batch.take(keep)
+    result.skipped = len(batch) - len(keep)
+    return result
+
+
+def _filter_entries(batch: UsageSampleBatch) -> dict[str, list[UUID]]:
+    entries: dict[str, list[UUID]] = {}
+    for index, event_id in enumerate(batch.event_ids):
+        entries.setdefault(_filter_key(batch, index), []).append(event_id)
+    return entries
+
+
+def _record(entries: dict[str, list[UUID]]) -> None:
+    ttl = settings.ingest_dedupe_ttl_seconds
+    client = redis_client()
+    try:
+        counts = _recorded_counts(client, list(entries))
+        pipe = client.pipeline(transaction=False)
+        for key, event_ids in entries.items():
+            for added, event_id in enumerate(event_ids):
+                slice_index = _active_slice(counts[key] + added)
+                for offset in _offsets(_hashes(event_id), slice_index):
+                    pipe.setbit(key, offset, 1)
+            pipe.incrby(_count_key(key), len(event_ids))
+            pipe.expire(_count_key(key), ttl)
+            pipe.expire(key, ttl)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to update dedupe filter: %s", exc)
+
+
+def remember(batch: UsageSampleBatch) -> None:
+    """Record committed samples in the filter so agent retries can be skipped next time.
+
+    Samples go into the active slice of their connection-day filter. The per-key count includes
+    retried samples, which only makes the filter grow a little early.
+    """
+
+    if not settings.ingest_dedupe_enabled or not len(batch):
+        return
+    _record(_filter_entries(batch))
+
+
+def remember_on_commit(session: Session, batch: UsageSampleBatch) -> None:
+    """Queue ``batch`` for ``remember`` once ``session`` commits; a rollback discards it.
+
+    Only filter keys and event ids are held until then, not the samples themselves.
+    """
+
+    if not settings.ingest_dedupe_enabled or not len(batch):
+        return
+    pending: dict[str, list[UUID]] = session.info.setdefault(_PENDING_KEY, {})
+    for key, event_ids in _filter_entries(batch).items():
+        pending.setdefault(key, []).extend(event_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_pending(session: Session) -> None:
+    # after_commit also fires when a SAVEPOINT is released; only the outermost commit counts.
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _record(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import json
+import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Final, Iterable
 from uuid import UUID
 
-from sqlalchemy import func, select
+import redis
+from sqlalchemy import any_, bindparam, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID, insert
 from sqlalchemy.orm import Session
 
-from api_compass.core.plans import get_plan_definition, plan_from_lookup_key
+from api_compass.core.config import settings
+from api_compass.core.plans import PLAN_DEFINITIONS, get_plan_definition, plan_from_lookup_key
 from api_compass.models.enums import ConnectionStatus, PlanType
 from api_compass.models.tables import Connection, Org, OrgEntitlement
+from api_compass.services.jobs import redis_client
+from api_compass.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 TRIAL_STATUSES = {"trialing", "incomplete"}
+_CACHE_PREFIX: Final[str] = "entitlements:"
+_LOCAL_CACHE_SIZE: Final[int] = 10_000
 
 
 class EntitlementError(Exception):
@@ -90,9 +101,188 @@ def _to_snapshot(entitlement: OrgEntitlement) -> FeatureSnapshot:
     )
 
 
+_SNAPSHOTS: TTLCache[UUID, FeatureSnapshot] = TTLCache(
+    max_size=lambda: _LOCAL_CACHE_SIZE if settings.entitlements_local_cache_ttl_seconds else 0,
+    ttl_seconds=lambda: settings.entitlements_local_cache_ttl_seconds,
+)
+
+
+def _default_snapshot(plan: PlanType) -> FeatureSnapshot:
+    definition = get_plan_definition(plan)
+    return FeatureSnapshot(
+        plan=definition.plan,
+        max_providers=definition.max_providers,
+        sync_interval_minutes=definition.sync_interval_minutes,
+        digest_frequency=definition.digest_frequency,
+        alerts_enabled=definition.alerts_enabled,
+        tips_enabled=definition.tips_enabled,
+        trial_ends_at=None,
+        stripe_status="inactive",
+    )
+
+
+def _cache_key(org_id: UUID) -> str:
+    return f"{_CACHE_PREFIX}{org_id}"
+
+
+def _dump_snapshot(snapshot: FeatureSnapshot) -> str:
+    return json.dumps(
+        {
+            "plan": snapshot.plan.value,
+            "max_providers": snapshot.max_providers,
+            "sync_interval_minutes": snapshot.sync_interval_minutes,
+            "digest_frequency": snapshot.digest_frequency,
+            "alerts_enabled": snapshot.alerts_enabled,
+            "tips_enabled": snapshot.tips_enabled,
+            "trial_ends_at": snapshot.trial_ends_at.isoformat() if snapshot.trial_ends_at else None,
+            "stripe_status": snapshot.stripe_status,
+        }
+    )
+
+
+def _load_snapshot(raw: str) -> FeatureSnapshot:
+    data = json.loads(raw)
+    trial_ends_at = data.get("trial_ends_at")
+    return FeatureSnapshot(
+        plan=PlanType(data["plan"]),
+        max_providers=int(data["max_providers"]),
+        sync_interval_minutes=int(data["sync_interval_minutes"]),
+        digest_frequency=data["digest_frequency"],
+        alerts_enabled=bool(data["alerts_enabled"]),
+        tips_enabled=bool(data["tips_enabled"]),
+        trial_ends_at=datetime.fromisoformat(trial_ends_at) if trial_ends_at else None,
+        stripe_status=data["stripe_status"],
+    )
+
+
+def _read_cached(org_id: UUID) -> FeatureSnapshot | None:
+    try:
+        raw = redis_client().get(_cache_key(org_id))
+    except redis.RedisError as exc:
+        logger.warning("Entitlement cache unavailable for org %s: %s", org_id, exc)
+        return None
+    if raw is None:
+        return None
+    try:
+        return _load_snapshot(raw)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _write_cached(org_id: UUID, snapshot: FeatureSnapshot) -> None:
+    try:
+        redis_client().setex(_cache_key(org_id), settings.entitlements_cache_ttl_seconds, _dump_snapshot(snapshot))
+    except redis.RedisError as exc:
+        logger.warning("Unable to cache entitlements for org %s: %s", org_id, exc)
+
+
+def _query_snapshot(session: Session, org_id: UUID) -> FeatureSnapshot:
+    entitlement = session.execute(
+        select(OrgEntitlement).where(OrgEntitlement.org_id == org_id)
+    ).scalar_one_or_none()
+    if entitlement is not None:
+        return _to_snapshot(entitlement)
+
+    # Orgs that predate the bootstrap fall back to their plan defaults without writing a row.
+    plan = session.execute(select(Org.plan).where(Org.id == org_id)).scalar_one_or_none()
+    return _default_snapshot(plan or PlanType.FREE)
+
+
 def get_entitlements(session: Session, org_id: UUID) -> FeatureSnapshot:
-    entitlement = _ensure_entitlement(session, org_id)
-    return _to_snapshot(entitlement)
+    """Return the org's feature snapshot from the process cache, Redis, or a single read query.
+
+    This path never writes; ``apply_plan`` owns the rows and invalidates both cache tiers.
+    """
+
+    snapshot = _SNAPSHOTS.get(org_id)
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = _read_cached(org_id)
+    if snapshot is None:
+        snapshot = _query_snapshot(session, org_id)
+        _write_cached(org_id, snapshot)
+    _SNAPSHOTS.put(org_id, snapshot)
+    return snapshot
+
+
+def get_entitlements_bulk(session: Session, org_ids: Iterable[UUID]) -> dict[UUID, FeatureSnapshot]:
+    """Return snapshots for many orgs with at most two ``= ANY(:ids)`` reads for cache misses.
+
+    Meant for batch jobs such as polling shards; results warm the process cache but skip the
+    per-org Redis round trips of ``get_entitlements``.
+    """
+
+    snapshots: dict[UUID, FeatureSnapshot] = {}
+    missing: list[UUID] = []
+    for org_id in set(org_ids):
+        snapshot = _SNAPSHOTS.get(org_id)
+        if snapshot is None:
+            missing.append(org_id)
+        else:
+            snapshots[org_id] = snapshot
+    if not missing:
+        return snapshots
+
+    ids = bindparam("org_ids", missing, type_=ARRAY(PGUUID(as_uuid=True)))
+    rows = session.execute(select(OrgEntitlement).where(OrgEntitlement.org_id == any_(ids))).scalars()
+    for entitlement in rows:
+        snapshots[entitlement.org_id] = _to_snapshot(entitlement)
+
+    without_rows = [org_id for org_id in missing if org_id not in snapshots]
+    if without_rows:
+        ids = bindparam("org_ids", without_rows, type_=ARRAY(PGUUID(as_uuid=True)))
+        plans = dict(session.execute(select(Org.id, Org.plan).where(Org.id == any_(ids))).all())
+        for org_id in without_rows:
+            snapshots[org_id] = _default_snapshot(plans.get(org_id) or PlanType.FREE)
+
+    for org_id in missing:
+        _SNAPSHOTS.put(org_id, snapshots[org_id])
+    return snapshots
+
+
+def invalidate_entitlements(org_id: UUID) -> None:
+    _SNAPSHOTS.pop(org_id)
+    try:
+        redis_client().delete(_cache_key(org_id))
+    except redis.RedisError as exc:
+        logger.warning("Unable to invalidate cached entitlements for org %s: %s", org_id, exc)
+
+
+def bootstrap_entitlements(session: Session) -> int:
+    """Create missing entitlement rows for every org in bulk, one statement per plan."""
+
+    created = 0
+    for plan, definition in PLAN_DEFINITIONS.items():
+        source = select(
+            Org.id,
+            literal(plan, OrgEntitlement.plan.type),
+            literal(definition.max_providers),
+            literal(definition.sync_interval_minutes),
+            literal(definition.digest_frequency),
+            literal(definition.alerts_enabled),
+            literal(definition.tips_enabled),
+        ).where(Org.plan == plan)
+        stmt = (
+            insert(OrgEntitlement)
+            .from_select(
+                [
+                    "org_id",
+                    "plan",
+                    "max_providers",
+                    "sync_interval_minutes",
+                    "digest_frequency",
+                    "alerts_enabled",
+                    "tips_enabled",
+                ],
+                source,
+            )
+            .on_conflict_do_nothing(index_elements=["org_id"])
+        )
+        result = session.execute(stmt)
+        created += result.rowcount or 0
+    session.commit()
+    return created
 
 
 def build_feature_flags(snapshot: FeatureSnapshot) -> dict[str, Any]:
@@ -167,6 +357,7 @@ def apply_plan(
 
     session.commit()
     session.refresh(entitlement)
+    invalidate_entitlements(org_id)
     return _to_snapshot(entitlement)
 
 
@@ -0,0 +1,441 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Final, Iterable
+from uuid import UUID
+
+import redis
+from sqlalchemy.orm import Session
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ConnectionStatus
+from api_compass.models.tables import Connection
+from api_compass.schemas.ingest import (
+    LocalUsageColumnarIngest,
+    LocalUsageIngest,
+    LocalUsageIngestHeader,
+    LocalUsageSample,
+)
+from api_compass.services import usage as usage_service
+from api_compass.services.jobs import redis_client
+from api_compass.services.usage import UsageSampleBatch
+
+logger = logging.getLogger(__name__)
+
+INGEST_STREAM: Final[str] = "ingest:usage"
+INGEST_GROUP: Final[str] = "ingest-workers"
+INGEST_DEAD_LETTER_STREAM: Final[str] = "ingest:usage:dead"
+_RECEIPT_PREFIX: Final[str] = "ingest:receipt:"
+# Entries left unacknowledged this long by a crashed consumer are reclaimed by the next drain.
+_CLAIM_IDLE_MS: Final[int] = 60_000
+
+JSON_MEDIA_TYPE: Final[str] = "application/json"
+COLUMNAR_JSON_MEDIA_TYPE: Final[str] = "application/vnd.apicompass.columnar+json"
+MSGPACK_MEDIA_TYPES: Final[frozenset[str]] = frozenset(
+    {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+)
+
+IngestPayload = LocalUsageIngest | LocalUsageColumnarIngest
+
+
+class UnsupportedMediaTypeError(ValueError):
+    def __init__(self, media_type: str) -> None:
+        super().__init__(f"Unsupported Content-Type '{media_type}'.")
+        self.media_type = media_type
+
+
+class MalformedPayloadError(ValueError):
+    """Raised when a binary payload cannot be unpacked."""
+
+
+def supported_media_types() -> list[str]:
+    media_types = [JSON_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append("application/msgpack")
+    return media_types
+
+
+def media_type_of(content_type: str | None) -> str:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return media_type or JSON_MEDIA_TYPE
+
+
+def parse_payload(body: bytes | str, media_type: str) -> IngestPayload:
+    """Validate an ingest body in the row (JSON) or columnar (JSON/MessagePack) format.
+
+    Any media type other than the columnar ones is parsed as the original row format so agents
+    that never set ``Content-Type`` keep working.
+    """
+
+    if media_type == COLUMNAR_JSON_MEDIA_TYPE:
+        return LocalUsageColumnarIngest.model_validate_json(body)
+    if media_type in MSGPACK_MEDIA_TYPES:
+        if msgpack is None:
+            raise UnsupportedMediaTypeError(media_type)
+        try:
+            data = msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise MalformedPayloadError(f"Invalid MessagePack body: {exc}") from exc
+        return LocalUsageColumnarIngest.model_validate(data)
+    return LocalUsageIngest.model_validate_json(body)
+
+
+def build_usage_samples(
+    org_id: UUID,
+    connection_id: UUID,
+    header: LocalUsageIngestHeader,
+    samples: Iterable[LocalUsageSample],
+    batch: UsageSampleBatch | None = None,
+) -> UsageSampleBatch:
+    batch = batch if batch is not None else UsageSampleBatch()
+    for sample in samples:
+        metadata = dict(sample.metadata or {})
+        metadata["agent_version"] = header.agent_version
+        batch.append(
+            org_id=org_id,
+            connection_id=connection_id,
+            provider=header.provider,
+            environment=header.environment,
+            metric=sample.metric,
+            unit=sample.unit,
+            quantity=sample.quantity,
+            unit_cost=sample.unit_cost,
+            currency=sample.currency,
+            ts=sample.ts,
+            source=header.source,
+            metadata=metadata,
+        )
+    return batch
+
+
+def build_columnar_samples(
+    org_id: UUID,
+    connection_id: UUID,
+    payload: LocalUsageColumnarIngest,
+    batch: UsageSampleBatch | None = None,
+) -> UsageSampleBatch:
+    batch = batch if batch is not None else UsageSampleBatch()
+    columns = payload.columns
+    strings = payload.strings
+    rows = payload.sample_count
+    currencies = columns.currency or [None] * rows
+    unit_costs = columns.unit_cost or [None] * rows
+    metadata_column = columns.metadata or [None] * rows
+    timestamps: dict[int, datetime] = {}
+
+    for metric, unit, currency, quantity, unit_cost, seconds, metadata in zip(
+        columns.metric, columns.unit, currencies, columns.quantity, unit_costs, columns.ts, metadata_column
+    ):
+        ts = timestamps.get(seconds)
+        if ts is None:
+            ts = timestamps[seconds] = datetime.fromtimestamp(seconds, tz=timezone.utc)
+        metadata = dict(metadata or {})
+        metadata["agent_version"] = payload.agent_version
+        batch.append(
+            org_id=org_id,
+            connection_id=connection_id,
+            provider=payload.provider,
+            environment=payload.environment,
+            metric=strings[metric],
+            unit=strings[unit],
+            quantity=quantity,
+            unit_cost=unit_cost,
+            currency="usd" if currency is None else strings[currency],
+            ts=ts,
+            source=payload.source,
+            metadata=metadata,
+        )
+    return batch
+
+
+def build_payload_samples(
+    org_id: UUID,
+    connection_id: UUID,
+    payload: IngestPayload,
+    batch: UsageSampleBatch | None = None,
+) -> UsageSampleBatch:
+    if isinstance(payload, LocalUsageColumnarIngest):
+        return build_columnar_samples(org_id, connection_id, payload, batch)
+    return build_usage_samples(org_id, connection_id, payload, payload.samples, batch)
+
+
+def body_digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def _receipt_key(signature: str, idempotency_key: str | None, digest: str) -> str:
+    # The HMAC signature is per-connection, so it scopes agent-chosen keys without parsing the body.
+    scope = hashlib.sha256(f"{signature}\n{idempotency_key or digest}".encode()).hexdigest()
+    return f"{_RECEIPT_PREFIX}{scope}"
+
+
+def find_receipt(
+    signature: str | None, idempotency_key: str | None, digest: str
+) -> dict[str, int | float] | None:
+    """Return the stored response for a previously accepted request with this exact body and signature.
+
+    Receipts are only written after the signature verified, so matching both the signature and the
+    body digest authenticates the replay without loading the agent credential.
+    """
+
+    if not settings.ingest_idempotency_ttl_seconds or not signature:
+        return None
+    try:
+        raw = redis_client().get(_receipt_key(signature, idempotency_key, digest))
+    except redis.RedisError as exc:
+        logger.warning("Ingest receipt lookup failed: %s", exc)
+        return None
+    if raw is None:
+        return None
+    receipt = json.loads(raw)
+    if not hmac.compare_digest(receipt.get("digest", ""), digest):
+        return None
+    return receipt["response"]
+
+
+def store_receipt(
+    signature: str, idempotency_key: str | None, digest: str, response: dict[str, int | float]
+) -> None:
+    ttl = settings.ingest_idempotency_ttl_seconds
+    if not ttl:
+        return
+    try:
+        redis_client().set(
+            _receipt_key(signature, idempotency_key, digest),
+            json.dumps({"digest": digest, "response": response}),
+            ex=ttl,
+        )
+    except redis.RedisError as exc:
+        logger.warning("Failed to store ingest receipt: %s", exc)
+
+
+def enqueue_payload(
+    connection_id: UUID, body: bytes, received_at: datetime, media_type: str = JSON_MEDIA_TYPE
+) -> str:
+    """Append a verified ingest body to the durable Redis stream drained by ``ingest.drain_queue``."""
+
+    # Stream values are decoded as text, so binary MessagePack bodies travel base64-encoded.
+    if media_type in MSGPACK_MEDIA_TYPES:
+        encoded = base64.b64encode(body).decode("ascii")
+    else:
+        encoded = body.decode("utf-8")
+    return redis_client().xadd(
+        INGEST_STREAM,
+        {
+            "connection_id": str(connection_id),
+            "received_at": received_at.isoformat(),
+            "media_type": media_type,
+            "body": encoded,
+        },
+        maxlen=settings.ingest_queue_max_length,
+        approximate=True,
+    )
+
+
+def _ensure_group(client: redis.Redis) -> None:
+    try:
+        client.xgroup_create(INGEST_STREAM, INGEST_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _read_entries(client: redis.Redis, consumer: str, count: int) -> list[tuple[str, dict[str, str]]]:
+    _, claimed, *_ = client.xautoclaim(
+        INGEST_STREAM, INGEST_GROUP, consumer, min_idle_time=_CLAIM_IDLE_MS, start_id="0-0", count=count
+    )
+    if claimed:
+        return claimed
+    response = client.xreadgroup(INGEST_GROUP, consumer, {INGEST_STREAM: ">"}, count=count)
+    if not response:
+        return []
+    _, entries = response[0]
+    return entries
+
+
+@dataclass(slots=True)
+class _QueuedPayload:
+    entry_id: str
+    connection: Connection
+    samples: UsageSampleBatch
+    received_at: datetime
+
+
+def _decode_entry(session: Session, entry_id: str, fields: dict[str, str]) -> _QueuedPayload | None:
+    """Parse a queue entry, returning None for entries that can never be written."""
+
+    try:
+        media_type = fields.get("media_type", JSON_MEDIA_TYPE)
+        body: bytes | str = fields["body"]
+        if media_type in MSGPACK_MEDIA_TYPES:
+            body = base64.b64decode(body)
+        payload = parse_payload(body, media_type)
+        received_at = datetime.fromisoformat(fields["received_at"])
+    except (KeyError, ValueError):
+        logger.warning("Dropping malformed ingest queue entry %s", entry_id)
+        return None
+
+    connection = session.get(Connection, payload.connection_id)
+    if connection is None or connection.status != ConnectionStatus.ACTIVE:
+        logger.info("Dropping queued ingest for inactive connection %s", payload.connection_id)
+        return None
+    samples = build_payload_samples(connection.org_id, connection.id, payload)
+    return _QueuedPayload(entry_id, connection, samples, received_at)
+
+
+def _write_payloads(session: Session, payloads: list[_QueuedPayload]) -> int:
+    batch = UsageSampleBatch()
+    touched: dict[UUID, tuple[Connection, datetime, datetime]] = {}
+    for payload in payloads:
+        batch.extend(payload.samples)
+        last_ts = payload.samples.max_ts()
+        received_at = payload.received_at
+        previous = touched.get(payload.connection.id)
+        if previous is not None:
+            last_ts = max(last_ts, previous[1])
+            received_at = max(received_at, previous[2])
+        touched[payload.connection.id] = (payload.connection, last_ts, received_at)
+
+    created = usage_service.save_usage_samples(session, batch)
+    for connection, last_ts, received_at in touched.values():
+        if connection.last_synced_at is None or connection.last_synced_at < last_ts:
+            connection.last_synced_at = last_ts
+        connection.local_agent_last_seen_at = received_at
+        session.add(connection)
+    return created
+
+
+def _process_entries(
+    session: Session, entries: list[tuple[str, dict[str, str]]]
+) -> tuple[int, list[str], dict[str, Exception]]:
+    """Write a batch of entries, isolating failures to the entries that caused them.
+
+    The whole batch is written in one SAVEPOINT first. If that fails, each entry is retried in
+    its own SAVEPOINT so one poison entry cannot hold back the rest. Returns the samples created,
+    the entry ids that are done (written or dropped), and the error of each entry that failed.
+    """
+
+    handled: list[str] = []
+    failed: dict[str, Exception] = {}
+    payloads: list[_QueuedPayload] = []
+    for entry_id, fields in entries:
+        try:
+            payload = _decode_entry(session, entry_id, fields)
+        except Exception as exc:
+            failed[entry_id] = exc
+            continue
+        if payload is None:
+            handled.append(entry_id)
+        else:
+            payloads.append(payload)
+    if not payloads:
+        return 0, handled, failed
+
+    try:
+        with session.begin_nested():
+            created = _write_payloads(session, payloads)
+        handled.extend(payload.entry_id for payload in payloads)
+        return created, handled, failed
+    except Exception as exc:
+        logger.warning("Ingest batch of %s entries failed, retrying one by one: %s", len(payloads), exc)
+
+    created = 0
+    for payload in payloads:
+        try:
+            with session.begin_nested():
+                created += _write_payloads(session, [payload])
+        except Exception as exc:
+            failed[payload.entry_id] = exc
+            continue
+        handled.append(payload.entry_id)
+    return created, handled, failed
+
+
+def _dead_letter(
+    client: redis.Redis, entries: list[tuple[str, dict[str, str]]], failed: dict[str, Exception]
+) -> list[str]:
+    """Move failed entries that have used up their deliveries to ``ingest:usage:dead``.
+
+    Returns the ids that were moved; the rest stay pending and are reclaimed after
+    ``_CLAIM_IDLE_MS``.
+    """
+
+    moved: list[str] = []
+    by_id = dict(entries)
+    for entry_id, exc in failed.items():
+        pending = client.xpending_range(INGEST_STREAM, INGEST_GROUP, min=entry_id, max=entry_id, count=1)
+        deliveries = pending[0]["times_delivered"] if pending else 0
+        if deliveries < settings.ingest_queue_max_deliveries:
+            logger.warning(
+                "Ingest queue entry %s failed on delivery %s, will retry: %s", entry_id, deliveries, exc
+            )
+            continue
+        client.xadd(
+            INGEST_DEAD_LETTER_STREAM,
+            {**by_id[entry_id], "entry_id": entry_id, "error": repr(exc)[:1000]},
+            maxlen=settings.ingest_queue_max_length,
+            approximate=True,
+        )
+        logger.error(
+            "Moved ingest queue entry %s to %s after %s deliveries",
+            entry_id,
+            INGEST_DEAD_LETTER_STREAM,
+            deliveries,
+            exc_info=exc,
+        )
+        moved.append(entry_id)
+    return moved
+
+
+def drain_queue(session: Session, *, max_batches: int = 50) -> dict[str, int]:
+    """Drain queued ingest payloads in micro-batches, committing once per batch before acking.
+
+    Entries that fail are left pending for redelivery; after ``INGEST_QUEUE_MAX_DELIVERIES``
+    attempts they are moved to the ``ingest:usage:dead`` stream so the queue keeps moving.
+    """
+
+    client = redis_client()
+    _ensure_group(client)
+    consumer = _consumer_name()
+    entries_processed = 0
+    samples_created = 0
+    dead_lettered = 0
+
+    for _ in range(max_batches):
+        entries = _read_entries(client, consumer, settings.ingest_queue_batch_size)
+        if not entries:
+            break
+        try:
+            created, handled, failed = _process_entries(session, entries)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if failed:
+            moved = _dead_letter(client, entries, failed)
+            handled.extend(moved)
+            dead_lettered += len(moved)
+        if handled:
+            client.xack(INGEST_STREAM, INGEST_GROUP, *handled)
+            client.xdel(INGEST_STREAM, *handled)
+        entries_processed += len(handled)
+        samples_created += created
+
+    return {"entries": entries_processed, "ingested": samples_created, "dead_lettered": dead_lettered}
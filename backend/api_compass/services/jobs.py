@@ -7,40 +7,157 @@ from typing import Final
 from uuid import UUID
 
 import redis
+from redis.commands.core import Script
 
+from api_compass.celery_app import celery_app
 from api_compass.core.config import settings
+from api_compass.models.enums import ProviderType
 
 logger = logging.getLogger(__name__)
 
 _JOBS_SET: Final[str] = "connections:sync-jobs"
 _CANCEL_PREFIX: Final[str] = "connections:cancel:"
+_FAILURES_PREFIX: Final[str] = "connections:sync-failures:"
+# Failure streaks are forgotten after a day without another failure.
+_FAILURES_TTL_SECONDS: Final[int] = 86400
 _CLIENT = redis.Redis.from_url(str(settings.worker_broker_url), decode_responses=True)
 
+# Pops due members (ZRANGEBYSCORE + ZREM in one step, so racing dispatchers never share a job)
+# and returns member/score pairs, skipping connections whose cancellation key is set.
+_CLAIM_SCRIPT: Final[str] = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+local claimed = {}
+for index = 1, #due, 2 do
+    local member = due[index]
+    redis.call('ZREM', KEYS[1], member)
+    if redis.call('EXISTS', ARGV[3] .. member) == 0 then
+        claimed[#claimed + 1] = member
+        claimed[#claimed + 1] = due[index + 1]
+    end
+end
+return claimed
+"""
+
+_claim: Script | None = None
+
 
 def _now_iso() -> str:
     return datetime.now(tz=timezone.utc).isoformat()
 
 
-def _connection_job_payload(connection_id: UUID) -> str:
-    payload = {
-        "connection_id": str(connection_id),
-        "queued_at": _now_iso(),
-    }
-    return json.dumps(payload)
+def _job_connection_id(member: str) -> UUID | None:
+    # Members are connection ids; older releases stored JSON payloads with a connection_id field.
+    try:
+        if member.startswith("{"):
+            return UUID(json.loads(member)["connection_id"])
+        return UUID(member)
+    except (KeyError, TypeError, ValueError):
+        return None
+
 
+def schedule_sync(connection_id: UUID, due_at: datetime | None = None) -> None:
+    """Schedule the connection's next sync in the ``connections:sync-jobs`` ZSET, scored by due time."""
 
-def schedule_sync(connection_id: UUID) -> None:
     try:
-        timestamp = datetime.now(timezone.utc).timestamp()
-        _CLIENT.zadd(_JOBS_SET, {_connection_job_payload(connection_id): timestamp})
+        timestamp = (due_at or datetime.now(timezone.utc)).timestamp()
+        _CLIENT.zadd(_JOBS_SET, {str(connection_id): timestamp})
     except redis.RedisError as exc:
         logger.warning("Unable to register sync job for connection %s: %s", connection_id, exc)
 
 
+def reschedule_syncs(due: dict[UUID, datetime]) -> None:
+    if not due:
+        return
+    try:
+        _CLIENT.zadd(_JOBS_SET, {str(connection_id): due_at.timestamp() for connection_id, due_at in due.items()})
+    except redis.RedisError as exc:
+        logger.warning("Unable to reschedule %s sync jobs: %s", len(due), exc)
+
+
+def record_sync_failures(connection_ids: list[UUID]) -> dict[UUID, int]:
+    """Count another failed sync for each connection and return its consecutive-failure streak.
+
+    If Redis is unavailable every streak is reported as 1, so retries fall back to the base delay.
+    """
+
+    if not connection_ids:
+        return {}
+    try:
+        pipe = _CLIENT.pipeline(transaction=False)
+        for connection_id in connection_ids:
+            key = f"{_FAILURES_PREFIX}{connection_id}"
+            pipe.incr(key)
+            pipe.expire(key, _FAILURES_TTL_SECONDS)
+        replies = pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to count %s failed syncs: %s", len(connection_ids), exc)
+        return {connection_id: 1 for connection_id in connection_ids}
+    return {connection_id: int(count) for connection_id, count in zip(connection_ids, replies[::2])}
+
+
+def reset_sync_failures(connection_ids: list[UUID]) -> None:
+    if not connection_ids:
+        return
+    try:
+        _CLIENT.delete(*(f"{_FAILURES_PREFIX}{connection_id}" for connection_id in connection_ids))
+    except redis.RedisError as exc:
+        logger.warning("Unable to reset %s sync failure streaks: %s", len(connection_ids), exc)
+
+
+def _claim_script() -> Script:
+    global _claim
+    if _claim is None:
+        _claim = _CLIENT.register_script(_CLAIM_SCRIPT)
+    return _claim
+
+
+def claim_due_syncs(limit: int, now: datetime | None = None) -> list[tuple[UUID, float]]:
+    """Atomically pop up to ``limit`` due jobs, dropping connections with a pending cancellation.
+
+    Entries that no longer parse as a connection id are discarded, which trims anything left in
+    the set by older payload formats that cannot be synced.
+    """
+
+    cutoff = (now or datetime.now(timezone.utc)).timestamp()
+    try:
+        reply = _claim_script()(keys=[_JOBS_SET], args=[cutoff, limit, _CANCEL_PREFIX])
+    except redis.RedisError as exc:
+        logger.warning("Unable to claim due sync jobs: %s", exc)
+        return []
+
+    claimed: list[tuple[UUID, float]] = []
+    for member, score in zip(reply[::2], reply[1::2]):
+        connection_id = _job_connection_id(member)
+        if connection_id is None:
+            logger.info("Discarded unreadable sync job entry %r", member)
+            continue
+        claimed.append((connection_id, float(score)))
+    return claimed
+
+
+def request_first_sync(connection_id: UUID, provider: ProviderType) -> None:
+    """Sync a new connection right away instead of waiting for the next dispatcher tick."""
+
+    now = datetime.now(timezone.utc)
+    try:
+        celery_app.send_task(
+            "polling.sync_connections",
+            args=[provider.value, [str(connection_id)]],
+            queue="polling",
+        )
+    except Exception as exc:  # pragma: no cover - broker outage, the dispatcher picks it up instead
+        logger.warning("Unable to enqueue first sync for connection %s: %s", connection_id, exc)
+        schedule_sync(connection_id, now)
+
+
 def cancel_scheduled_jobs(connection_id: UUID, ttl_seconds: int = 60) -> None:
+    # The cancellation key stops claims already in flight; ZREM drops the schedule itself.
     key = f"{_CANCEL_PREFIX}{connection_id}"
     try:
-        _CLIENT.setex(key, ttl_seconds, _now_iso())
+        pipe = _CLIENT.pipeline(transaction=False)
+        pipe.setex(key, ttl_seconds, _now_iso())
+        pipe.zrem(_JOBS_SET, str(connection_id))
+        pipe.execute()
     except redis.RedisError as exc:
         logger.warning("Unable to cancel jobs for connection %s: %s", connection_id, exc)
 
@@ -2,13 +2,44 @@ from __future__ import annotations
 
 import base64
 import hmac
+import logging
 import secrets
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from uuid import UUID
 
+import redis
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services.jobs import redis_client
+from api_compass.utils.cache import TTLCache
 from api_compass.utils.crypto import encrypt_auth_payload, try_decrypt_auth_payload
 
+logger = logging.getLogger(__name__)
+
 _MODE_KEY = "local_agent"
 _TOKEN_PREFIX = "lc_"
+_VERSION_PREFIX = "agents:credential-version:"
+# Versions only have to outlive cached entries; a lapsed key still reads as a change.
+_VERSION_TTL_SECONDS = 86400
+_PENDING_KEY = "local_agents.invalidated"
+_LAST_SYNC_PREFIX = "agents:last-sync:"
+# Must outlive the longest sync interval; a lapsed key is reseeded from Postgres.
+_LAST_SYNC_TTL_SECONDS = 2 * 86400
+_NEVER_SYNCED = "never"
+# Connection columns that feed AgentCredential; changing any of them invalidates cached copies.
+_CREDENTIAL_COLUMNS = (
+    "encrypted_auth_blob",
+    "status",
+    "local_connector_enabled",
+    "provider",
+    "environment",
+    "org_id",
+)
 
 
 def _now_iso() -> str:
@@ -48,18 +79,197 @@ def token_preview(agent_token: str) -> str:
     return f"local-agent:*{visible}"
 
 
-def sign_payload(agent_token: str, body: bytes) -> str:
-    digest = hmac.new(agent_token.encode("utf-8"), body, digestmod="sha256").digest()
+def payload_signer(agent_token: str) -> hmac.HMAC:
+    """Return an HMAC that can be fed a payload incrementally, matching ``sign_payload``."""
+    return hmac.new(agent_token.encode("utf-8"), digestmod="sha256")
+
+
+def _encode_digest(digest: bytes) -> str:
     encoded = base64.urlsafe_b64encode(digest).decode("utf-8")
     return encoded.rstrip("=")
 
 
+def sign_payload(agent_token: str, body: bytes) -> str:
+    signer = payload_signer(agent_token)
+    signer.update(body)
+    return _encode_digest(signer.digest())
+
+
 def verify_signature(agent_token: str, provided_signature: str | None, body: bytes) -> bool:
+    signer = payload_signer(agent_token)
+    signer.update(body)
+    return verify_signer(signer, provided_signature)
+
+
+def verify_signer(signer: hmac.HMAC, provided_signature: str | None) -> bool:
     if not provided_signature:
         return False
-    expected = sign_payload(agent_token, body)
+    expected = _encode_digest(signer.digest())
     normalized = provided_signature.strip()
     if not normalized:
         return False
     normalized = normalized.rstrip("=")
     return hmac.compare_digest(expected, normalized)
+
+
+@dataclass(slots=True, frozen=True)
+class AgentCredential:
+    connection_id: UUID
+    org_id: UUID
+    provider: ProviderType
+    environment: EnvironmentType
+    status: ConnectionStatus
+    local_connector_enabled: bool
+    agent_token: str | None
+
+
+# Entries carry the connection's credential version at load time, checked against Redis on every hit.
+_CREDENTIALS: TTLCache[UUID, tuple[str | None, AgentCredential]] = TTLCache(
+    max_size=lambda: settings.ingest_credential_cache_size,
+    ttl_seconds=lambda: settings.ingest_credential_cache_ttl_seconds,
+)
+
+
+def _version_key(connection_id: UUID) -> str:
+    return f"{_VERSION_PREFIX}{connection_id}"
+
+
+def _credential_from_connection(connection: Connection) -> AgentCredential:
+    agent_token = None
+    if connection.local_connector_enabled and connection.encrypted_auth_blob:
+        agent_token = extract_agent_token(connection.encrypted_auth_blob)
+    return AgentCredential(
+        connection_id=connection.id,
+        org_id=connection.org_id,
+        provider=connection.provider,
+        environment=connection.environment,
+        status=connection.status,
+        local_connector_enabled=bool(connection.local_connector_enabled),
+        agent_token=agent_token,
+    )
+
+
+def _credential_version(connection_id: UUID) -> tuple[bool, str | None]:
+    try:
+        return True, redis_client().get(_version_key(connection_id))
+    except redis.RedisError as exc:
+        logger.warning("Credential versions unavailable, relying on cache TTL: %s", exc)
+        return False, None
+
+
+def get_agent_credential(session: Session, connection_id: UUID) -> AgentCredential | None:
+    """Return the connection's ingest credential, decrypting the auth blob only on a cache miss.
+
+    Every hit compares the entry's version with the connection's version key in Redis, which any
+    process bumps when the credential changes. If Redis is unreachable entries are trusted for
+    ``INGEST_CREDENTIAL_CACHE_TTL_SECONDS``.
+    """
+
+    checked, version = _credential_version(connection_id)
+    cached = _CREDENTIALS.get(connection_id)
+    if cached is not None and (not checked or cached[0] == version):
+        return cached[1]
+
+    connection = session.get(Connection, connection_id)
+    if connection is None:
+        return None
+    credential = _credential_from_connection(connection)
+    # The version was read before the row, so a change committed in between forces another load.
+    if checked:
+        _CREDENTIALS.put(credential.connection_id, (version, credential))
+    return credential
+
+
+def _last_sync_key(connection_id: UUID) -> str:
+    return f"{_LAST_SYNC_PREFIX}{connection_id}"
+
+
+def _load_last_synced_at(session: Session, connection_id: UUID) -> datetime | None:
+    return session.execute(
+        select(Connection.last_synced_at).where(Connection.id == connection_id)
+    ).scalar_one_or_none()
+
+
+def get_last_synced_at(session: Session, connection_id: UUID) -> datetime | None:
+    """Return when the connection last synced, shared through Redis so requests skip Postgres.
+
+    A missing key is seeded from ``connections.last_synced_at``; if Redis is unreachable the column
+    is read on every call.
+    """
+
+    key = _last_sync_key(connection_id)
+    try:
+        cached = redis_client().get(key)
+    except redis.RedisError as exc:
+        logger.warning("Last sync times unavailable, reading %s from Postgres: %s", connection_id, exc)
+        return _load_last_synced_at(session, connection_id)
+    if cached is not None:
+        return None if cached == _NEVER_SYNCED else datetime.fromisoformat(cached)
+
+    last_synced_at = _load_last_synced_at(session, connection_id)
+    value = _NEVER_SYNCED if last_synced_at is None else last_synced_at.isoformat()
+    try:
+        # NX keeps a sync another process recorded while the row was being read.
+        redis_client().set(key, value, nx=True, ex=_LAST_SYNC_TTL_SECONDS)
+    except redis.RedisError as exc:
+        logger.warning("Unable to cache last sync time for %s: %s", connection_id, exc)
+    return last_synced_at
+
+
+def record_sync(connection_id: UUID, synced_at: datetime) -> None:
+    """Publish an accepted sync so every API process enforces the interval from it."""
+
+    try:
+        redis_client().set(_last_sync_key(connection_id), synced_at.isoformat(), ex=_LAST_SYNC_TTL_SECONDS)
+    except redis.RedisError as exc:
+        logger.warning("Unable to record sync for %s: %s", connection_id, exc)
+
+
+def invalidate_agent_credentials(connection_ids: list[UUID]) -> None:
+    """Drop cached credentials here and bump their versions so every other process reloads."""
+
+    for connection_id in connection_ids:
+        _CREDENTIALS.pop(connection_id)
+    if not connection_ids:
+        return
+    try:
+        pipe = redis_client().pipeline(transaction=False)
+        for connection_id in connection_ids:
+            pipe.incr(_version_key(connection_id))
+            pipe.expire(_version_key(connection_id), _VERSION_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to publish %s credential invalidations: %s", len(connection_ids), exc)
+
+
+def invalidate_agent_credential(connection_id: UUID) -> None:
+    invalidate_agent_credentials([connection_id])
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_credentials(session: Session, flush_context) -> None:
+    changed = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.dirty, *session.deleted):
+        if not isinstance(obj, Connection):
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(
+            state.attrs[column].history.has_changes() for column in _CREDENTIAL_COLUMNS
+        ):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed_credentials(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed:
+        invalidate_agent_credentials(list(changed))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_credentials(session: Session) -> None:
+    # A rolled-back SAVEPOINT may leave ids behind; invalidating them later only costs a reload.
+    if not session.in_nested_transaction():
+        session.info.pop(_PENDING_KEY, None)
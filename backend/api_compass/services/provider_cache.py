@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Final, Mapping
+from uuid import UUID
+
+import redis
+
+from api_compass.core.config import settings
+from api_compass.services.jobs import redis_client
+
+logger = logging.getLogger(__name__)
+
+_VALIDATOR_PREFIX: Final[str] = "provider:validators:"
+
+
+@dataclass(frozen=True, slots=True)
+class Validator:
+    """HTTP cache validators from the last 200 response for one endpoint of one connection.
+
+    ``query`` is the query string that response answered, minus the params that slide with the
+    usage cursor. Validators are sent back whenever the rest matches: the window moves on almost
+    every poll, and the provider still answers 200 if the moved window changed the representation.
+    """
+
+    query: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _key(connection_id: UUID) -> str:
+    return f"{_VALIDATOR_PREFIX}{connection_id}"
+
+
+def query_string(params: Mapping[str, str]) -> str:
+    return "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+
+
+def load(connection_id: UUID) -> dict[str, Validator]:
+    """Return the stored validators for ``connection_id`` keyed by endpoint path; {} on Redis errors."""
+
+    if not settings.provider_conditional_requests_enabled:
+        return {}
+    try:
+        stored = redis_client().hgetall(_key(connection_id))
+    except redis.RedisError as exc:
+        logger.warning("Provider validator cache unavailable for %s: %s", connection_id, exc)
+        return {}
+    validators: dict[str, Validator] = {}
+    for path, raw in stored.items():
+        try:
+            validators[path] = Validator(**json.loads(raw))
+        except (TypeError, ValueError):
+            continue
+    return validators
+
+
+def save(connection_id: UUID, path: str, validator: Validator) -> None:
+    if not settings.provider_conditional_requests_enabled:
+        return
+    key = _key(connection_id)
+    value = json.dumps({"query": validator.query, "etag": validator.etag, "last_modified": validator.last_modified})
+    try:
+        pipe = redis_client().pipeline(transaction=False)
+        pipe.hset(key, path, value)
+        pipe.expire(key, settings.provider_validator_ttl_seconds)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to store provider validators for %s: %s", connection_id, exc)
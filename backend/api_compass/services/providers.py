@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Sequence
+from uuid import UUID
+
+import httpx
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services import provider_cache, rate_limits
+from api_compass.services.usage import UsageSample
+from api_compass.utils.crypto import try_decrypt_auth_payload
+
+
+class ProviderAPIError(Exception):
+    """Base exception for provider polling failures."""
+
+    def __init__(self, provider: ProviderType, connection_id: UUID, status_code: int, message: str | None = None):
+        self.provider = provider
+        self.connection_id = connection_id
+        self.status_code = status_code
+        self.message = message or "Provider API error"
+        super().__init__(f"{provider.value} poll failed for {connection_id}: {self.message} ({status_code})")
+
+
+class RetryableProviderError(ProviderAPIError):
+    """Raised when providers respond with 429 or transient 5xx errors."""
+
+
+class RateLimitExhaustedError(RetryableProviderError):
+    """Raised before any request is sent when the shared local rate-limit bucket is empty."""
+
+
+DEFAULT_BASE_URLS: dict[ProviderType, str] = {
+    ProviderType.OPENAI: "https://api.openai.com",
+    ProviderType.TWILIO: "https://api.twilio.com",
+    ProviderType.SENDGRID: "https://api.sendgrid.com",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class UsageRequest:
+    path: str
+    params: dict[str, str] = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+    auth: tuple[str, str] | None = None
+    # Params that follow the usage cursor; cache validators are matched on the rest of the query.
+    window_params: tuple[str, ...] = ()
+
+    def validator_query(self) -> str:
+        return provider_cache.query_string(
+            {name: value for name, value in self.params.items() if name not in self.window_params}
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class UsagePage:
+    """Samples from one response, plus where the connection's usage cursor can move to.
+
+    ``settled_until`` is the end of the newest bucket that is complete (and therefore emitted);
+    ``next_page`` is the provider's continuation token when more pages remain. ``validators`` are
+    the HTTP cache validators of the response, keyed by endpoint path; the caller stores them only
+    once the samples are committed, so a lost write is never answered with a 304 later.
+    """
+
+    samples: list[UsageSample] = field(default_factory=list)
+    settled_until: datetime | None = None
+    next_page: str | None = None
+    validators: dict[str, provider_cache.Validator] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class ProviderAdapter:
+    build_request: Callable[[Connection, str, datetime, datetime, str | None], UsageRequest]
+    parse: Callable[[Connection, Any, datetime], UsagePage]
+
+
+def _sample(
+    connection: Connection,
+    metric: str,
+    unit: str,
+    quantity: Decimal,
+    unit_cost: Decimal,
+    ts: datetime,
+    metadata: dict[str, Any],
+) -> UsageSample:
+    return UsageSample(
+        org_id=connection.org_id,
+        connection_id=connection.id,
+        provider=connection.provider,
+        environment=connection.environment,
+        metric=metric,
+        unit=unit,
+        quantity=quantity,
+        unit_cost=unit_cost,
+        currency="usd",
+        ts=ts,
+        source=f"poll-{connection.provider.value}",
+        metadata=metadata,
+    )
+
+
+def _day_start(ts: datetime) -> datetime:
+    return datetime.combine(ts.astimezone(timezone.utc).date(), time.min, tzinfo=timezone.utc)
+
+
+def _from_epoch(value: Any) -> datetime:
+    return datetime.fromtimestamp(int(value), tz=timezone.utc)
+
+
+def _from_day(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def usage_window_start(connection: Connection, ts: datetime) -> datetime:
+    """Where the next fetch for ``connection`` starts: its cursor minus the overlap window.
+
+    Buckets already stored inside the overlap come back with the same event ids; unchanged ones
+    are skipped and corrected ones are revised in place, along with their daily totals.
+    Connections without a cursor start from the beginning of the previous UTC day.
+    """
+
+    cursor_at = connection.usage_cursor_at or _day_start(ts) - timedelta(days=1)
+    return cursor_at - timedelta(seconds=settings.provider_poll_overlap_seconds)
+
+
+def _openai_request(
+    connection: Connection, api_key: str, since: datetime, ts: datetime, page: str | None
+) -> UsageRequest:
+    params = {"start_time": str(int(since.timestamp())), "bucket_width": "1h", "limit": "168"}
+    if page:
+        params["page"] = page
+    return UsageRequest(
+        path="/v1/organization/usage/completions",
+        params=params,
+        headers={"Authorization": f"Bearer {api_key}"},
+        window_params=("start_time",),
+    )
+
+
+def _openai_parse(connection: Connection, payload: Any, ts: datetime) -> UsagePage:
+    samples: list[UsageSample] = []
+    settled_until: datetime | None = None
+    for bucket in payload.get("data", []):
+        bucket_end = _from_epoch(bucket["end_time"])
+        if bucket_end > ts:
+            continue  # the current hour is still filling up; it is emitted once it closes
+        tokens = 0
+        requests = 0
+        for result in bucket.get("results", []):
+            tokens += int(result.get("input_tokens", 0)) + int(result.get("output_tokens", 0))
+            requests += int(result.get("num_model_requests", 0))
+        settled_until = max(settled_until or bucket_end, bucket_end)
+        if tokens:
+            samples.append(
+                _sample(
+                    connection,
+                    "openai:tokens",
+                    "token",
+                    Decimal(tokens),
+                    Decimal("0.000002"),
+                    _from_epoch(bucket["start_time"]),
+                    {"requests": requests},
+                )
+            )
+    next_page = payload.get("next_page") if payload.get("has_more") else None
+    return UsagePage(samples, settled_until, next_page)
+
+
+def _twilio_request(
+    connection: Connection, api_key: str, since: datetime, ts: datetime, page: str | None
+) -> UsageRequest:
+    # Twilio authenticates with "AccountSid:AuthToken", which is how the key is captured.
+    account_sid, _, auth_token = api_key.partition(":")
+    if page:
+        # Continuation tokens are Twilio's next_page_uri, which already carries the filters.
+        return UsageRequest(path=page, auth=(account_sid, auth_token))
+    return UsageRequest(
+        path=f"/2010-04-01/Accounts/{account_sid}/Usage/Records/Daily.json",
+        params={
+            "StartDate": since.date().isoformat(),
+            "EndDate": ts.date().isoformat(),
+            "PageSize": "1000",
+        },
+        auth=(account_sid, auth_token),
+        window_params=("StartDate", "EndDate"),
+    )
+
+
+_TWILIO_CATEGORIES: dict[str, tuple[str, str, Decimal, str]] = {
+    "sms": ("twilio:sms_segments", "segment", Decimal("0.0075"), "messages"),
+    "calls": ("twilio:voice_minutes", "minute", Decimal("0.015"), "calls"),
+}
+
+
+def _twilio_parse(connection: Connection, payload: Any, ts: datetime) -> UsagePage:
+    today = _day_start(ts)
+    samples: list[UsageSample] = []
+    settled_until: datetime | None = None
+    for record in payload.get("usage_records", []):
+        day = _from_day(record["start_date"])
+        if day >= today:
+            continue
+        settled_until = max(settled_until or day, day + timedelta(days=1))
+        category = _TWILIO_CATEGORIES.get(record.get("category"))
+        if category is None:
+            continue
+        metric, unit, unit_cost, count_key = category
+        quantity = Decimal(str(record.get("usage") or 0))
+        if not quantity:
+            continue
+        metadata = {"product": record["category"], count_key: int(record.get("count") or 0)}
+        samples.append(_sample(connection, metric, unit, quantity, unit_cost, day, metadata))
+    return UsagePage(samples, settled_until, payload.get("next_page_uri"))
+
+
+def _sendgrid_request(
+    connection: Connection, api_key: str, since: datetime, ts: datetime, page: str | None
+) -> UsageRequest:
+    return UsageRequest(
+        path="/v3/stats",
+        params={
+            "start_date": since.date().isoformat(),
+            "end_date": ts.date().isoformat(),
+            "aggregated_by": "day",
+        },
+        headers={"Authorization": f"Bearer {api_key}"},
+        window_params=("start_date", "end_date"),
+    )
+
+
+def _sendgrid_parse(connection: Connection, payload: Any, ts: datetime) -> UsagePage:
+    today = _day_start(ts)
+    samples: list[UsageSample] = []
+    settled_until: datetime | None = None
+    for entry in payload:
+        day = _from_day(entry["date"])
+        if day >= today:
+            continue
+        settled_until = max(settled_until or day, day + timedelta(days=1))
+        totals = {"requests": 0, "delivered": 0, "bounces": 0}
+        for stat in entry.get("stats", []):
+            metrics = stat.get("metrics", {})
+            for key in totals:
+                totals[key] += int(metrics.get(key, 0))
+        if not totals["requests"]:
+            continue
+        metadata = {"deliveries": totals["delivered"], "bounces": totals["bounces"]}
+        samples.append(
+            _sample(
+                connection, "sendgrid:emails_sent", "email", Decimal(totals["requests"]), Decimal("0.0006"), day, metadata
+            )
+        )
+    return UsagePage(samples, settled_until)
+
+
+PROVIDER_ADAPTERS: dict[ProviderType, ProviderAdapter] = {
+    ProviderType.OPENAI: ProviderAdapter(_openai_request, _openai_parse),
+    ProviderType.TWILIO: ProviderAdapter(_twilio_request, _twilio_parse),
+    ProviderType.SENDGRID: ProviderAdapter(_sendgrid_request, _sendgrid_parse),
+}
+
+
+def _base_url(provider: ProviderType) -> str:
+    return (settings.provider_api_base_url or DEFAULT_BASE_URLS[provider]).rstrip("/")
+
+
+def _api_key(connection: Connection) -> str:
+    auth = try_decrypt_auth_payload(connection.encrypted_auth_blob) or {}
+    api_key = auth.get("api_key")
+    if not api_key:
+        raise ProviderAPIError(connection.provider, connection.id, 401, "missing provider credentials")
+    return api_key
+
+
+# Prefork workers call ``fetch_usage`` synchronously; one loop per process keeps the pooled
+# client (and its keep-alive connections) alive across tasks.
+_loop: asyncio.AbstractEventLoop | None = None
+_client: httpx.AsyncClient | None = None
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def _http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.provider_http_max_connections,
+                max_keepalive_connections=settings.provider_http_max_connections,
+            ),
+            timeout=settings.provider_http_timeout_seconds,
+            headers={"User-Agent": "api-compass-poller"},
+        )
+    return _client
+
+
+async def _get(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    connection: Connection,
+    request: UsageRequest,
+    validator: provider_cache.Validator | None = None,
+) -> httpx.Response:
+    provider = connection.provider
+    # Reserve a slot in the shared bucket before taking a concurrency slot so waiting is free.
+    wait = await asyncio.to_thread(rate_limits.reserve, provider, connection.id)
+    if wait is None:
+        raise RateLimitExhaustedError(provider, connection.id, 429, "local rate limit exhausted")
+    if wait:
+        await asyncio.sleep(wait)
+    try:
+        async with semaphore:
+            response = await client.get(
+                f"{_base_url(provider)}{request.path}",
+                params=request.params,
+                headers={**request.headers, **validator.headers()} if validator else request.headers,
+                auth=request.auth,
+            )
+    except httpx.TransportError as exc:
+        raise RetryableProviderError(provider, connection.id, 503, f"transport error: {exc}") from exc
+
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableProviderError(provider, connection.id, response.status_code, "transient provider error")
+    if response.status_code >= 400:
+        raise ProviderAPIError(provider, connection.id, response.status_code, "provider rejected request")
+    return response
+
+
+async def _fetch_connection(
+    client: httpx.AsyncClient, semaphore: asyncio.Semaphore, connection: Connection, ts: datetime
+) -> UsagePage:
+    """Fetch usage since the connection's cursor, following pages up to ``PROVIDER_POLL_MAX_PAGES``.
+
+    If pages remain, the continuation token is returned and ``settled_until`` is left unset, so the
+    next poll resumes from the token without moving the cursor past unread buckets.
+    """
+
+    adapter = PROVIDER_ADAPTERS.get(connection.provider)
+    if adapter is None:
+        return UsagePage()
+    api_key = _api_key(connection)
+    since = usage_window_start(connection, ts)
+    page = connection.usage_cursor
+    # Only a fresh first page is sent conditionally; continuation pages are always read in full.
+    validators = await asyncio.to_thread(provider_cache.load, connection.id) if page is None else {}
+    samples: list[UsageSample] = []
+    settled_until: datetime | None = None
+    fresh: dict[str, provider_cache.Validator] = {}
+    for index in range(settings.provider_poll_max_pages):
+        request = adapter.build_request(connection, api_key, since, ts, page)
+        conditional = index == 0 and page is None
+        query = request.validator_query()
+        validator = validators.get(request.path) if conditional else None
+        if validator is not None and validator.query != query:
+            validator = None
+        response = await _get(client, semaphore, connection, request, validator)
+        if response.status_code == 304:
+            return UsagePage()
+        if conditional:
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+            if etag or last_modified:
+                fresh[request.path] = provider_cache.Validator(query, etag, last_modified)
+        result = adapter.parse(connection, response.json(), ts)
+        samples.extend(result.samples)
+        if result.settled_until is not None:
+            settled_until = max(settled_until or result.settled_until, result.settled_until)
+        page = result.next_page
+        if page is None:
+            break
+    return UsagePage(samples, None if page else settled_until, page, fresh)
+
+
+async def fetch_usage_async(
+    connections: Sequence[Connection],
+    ts: datetime,
+    client: httpx.AsyncClient | None = None,
+) -> list[UsagePage | BaseException]:
+    """Fetch usage for every connection concurrently, capped per provider.
+
+    Results line up with ``connections``; failures are returned in place rather than raised so
+    one provider outage does not discard the samples already fetched for other connections.
+    """
+
+    client = client or _http_client()
+    semaphores = {
+        provider: asyncio.Semaphore(settings.provider_poll_concurrency)
+        for provider in {connection.provider for connection in connections}
+    }
+    return await asyncio.gather(
+        *(_fetch_connection(client, semaphores[connection.provider], connection, ts) for connection in connections),
+        return_exceptions=True,
+    )
+
+
+def fetch_usage(connections: Sequence[Connection], ts: datetime) -> list[UsagePage | BaseException]:
+    return _event_loop().run_until_complete(fetch_usage_async(connections, ts))
+
+
+__all__ = (
+    "PROVIDER_ADAPTERS",
+    "ProviderAPIError",
+    "RateLimitExhaustedError",
+    "RetryableProviderError",
+    "UsagePage",
+    "fetch_usage",
+    "fetch_usage_async",
+    "usage_window_start",
+)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Final
+from uuid import UUID
+
+import redis
+from redis.commands.core import Script
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ProviderType
+from api_compass.services.jobs import redis_client
+
+logger = logging.getLogger(__name__)
+
+_BUCKET_PREFIX: Final[str] = "ratelimit:provider:"
+
+# GCRA reservation over several buckets at once. Each key stores its theoretical arrival time
+# (TAT) in microseconds of Redis server time. ARGV holds max_wait, then (interval, tolerance)
+# per key. Either every bucket is charged and the longest wait is returned, or nothing is
+# charged and -1 signals that waiting would exceed max_wait.
+_RESERVE_SCRIPT: Final[str] = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local max_wait = tonumber(ARGV[1])
+local wait = 0
+local tats = {}
+for index, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[index * 2])
+    local tolerance = tonumber(ARGV[index * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local delay = tat - tolerance - now
+    if delay > wait then
+        wait = delay
+    end
+    tats[index] = tat + interval
+end
+if wait > max_wait then
+    return -1
+end
+for index, key in ipairs(KEYS) do
+    local ttl = math.ceil((tats[index] - now) / 1000) + 1000
+    redis.call('SET', key, string.format('%.0f', tats[index]), 'PX', string.format('%.0f', ttl))
+end
+return wait
+"""
+
+_reserve: Script | None = None
+
+
+def _provider_key(provider: ProviderType) -> str:
+    return f"{_BUCKET_PREFIX}{provider.value}"
+
+
+def _credential_key(provider: ProviderType, connection_id: UUID) -> str:
+    return f"{_BUCKET_PREFIX}{provider.value}:{connection_id}"
+
+
+def _bucket_params(rate_per_second: float) -> tuple[int, int]:
+    interval = int(1_000_000 / rate_per_second)
+    return interval, interval * (settings.provider_rate_limit_burst - 1)
+
+
+def _reserve_script() -> Script:
+    global _reserve
+    if _reserve is None:
+        _reserve = redis_client().register_script(_RESERVE_SCRIPT)
+    return _reserve
+
+
+def reserve(provider: ProviderType, connection_id: UUID | None = None) -> float | None:
+    """Reserve one request against the provider bucket (and the credential's own bucket).
+
+    Returns how many seconds the caller must wait before sending, or ``None`` when the wait would
+    exceed ``PROVIDER_RATE_LIMIT_MAX_WAIT_SECONDS``. Redis errors fail open with no wait.
+    """
+
+    keys: list[str] = []
+    args: list[int] = [int(settings.provider_rate_limit_max_wait_seconds * 1_000_000)]
+    provider_rate = settings.provider_rate_limits.get(provider.value)
+    if provider_rate:
+        keys.append(_provider_key(provider))
+        args.extend(_bucket_params(provider_rate))
+    if connection_id is not None and settings.provider_key_rate_limit_per_second:
+        keys.append(_credential_key(provider, connection_id))
+        args.extend(_bucket_params(settings.provider_key_rate_limit_per_second))
+    if not keys:
+        return 0.0
+
+    try:
+        wait = int(_reserve_script()(keys=keys, args=args))
+    except redis.RedisError as exc:
+        logger.warning("Rate limiter unavailable for %s: %s", provider.value, exc)
+        return 0.0
+    if wait < 0:
+        return None
+    return wait / 1_000_000
+
+
+def fill_levels() -> dict[str, float]:
+    """Return the tokens currently available in each provider bucket, for dashboards and healthz."""
+
+    limits = {
+        provider: rate for provider in ProviderType if (rate := settings.provider_rate_limits.get(provider.value))
+    }
+    if not limits:
+        return {}
+    tats = redis_client().mget([_provider_key(provider) for provider in limits])
+    now = time.time() * 1_000_000
+    burst = settings.provider_rate_limit_burst
+    levels: dict[str, float] = {}
+    for (provider, rate), tat in zip(limits.items(), tats):
+        interval, tolerance = _bucket_params(rate)
+        backlog = max(float(tat) - now, 0.0) if tat is not None else 0.0
+        levels[provider.value] = round(max(min((tolerance + interval - backlog) / interval, burst), 0.0), 2)
+    return levels
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Final, Iterable
+from uuid import UUID
+
+import redis
+from redis.commands.core import Script
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, SessionTransaction
+
+from api_compass.models.enums import EnvironmentType, ProviderType
+from api_compass.models.tables import DailyUsageCost
+from api_compass.services.jobs import redis_client
+
+logger = logging.getLogger(__name__)
+
+_COUNTER_PREFIX: Final[str] = "spend:mtd:"
+_PENDING_KEY: Final[str] = "spend_counters.pending"
+# Counters only need to outlive their month; reconciliation rewrites them well before expiry.
+_COUNTER_TTL_SECONDS: Final[int] = 40 * 86400
+
+# Only counters that already exist are incremented. A missing counter is seeded from Postgres on
+# first read; creating it here would start it at this batch's delta instead of the month's total.
+_INCREMENT_SCRIPT: Final[str] = """
+for index, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('INCRBY', key, ARGV[index])
+    end
+end
+return 0
+"""
+
+_increment: Script | None = None
+
+Scope = tuple[UUID, ProviderType, EnvironmentType, str]
+
+
+def month_of(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def _current_month_start() -> date:
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def _counter_key(org_id: UUID, provider: ProviderType, environment: EnvironmentType, month: str) -> str:
+    return f"{_COUNTER_PREFIX}{month}:{org_id}:{provider.value}:{environment.value}"
+
+
+def _increment_script() -> Script:
+    global _increment
+    if _increment is None:
+        _increment = redis_client().register_script(_INCREMENT_SCRIPT)
+    return _increment
+
+
+def stage(session: Session, deltas: dict[Scope, int]) -> None:
+    """Queue cost deltas (micro-units) to be added to the counters when ``session`` commits.
+
+    Deltas are tagged with the innermost transaction, so rolling back a SAVEPOINT discards only
+    the deltas staged inside it.
+    """
+
+    deltas = {scope: delta for scope, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault(_PENDING_KEY, []).append((transaction, deltas))
+
+
+def _within(transaction: SessionTransaction | None, ancestor: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    # after_commit also fires when a SAVEPOINT is released; only the outermost commit counts.
+    if session.in_nested_transaction():
+        return
+    staged = session.info.pop(_PENDING_KEY, None)
+    if not staged:
+        return
+    pending: dict[Scope, int] = {}
+    for _, deltas in staged:
+        for scope, delta in deltas.items():
+            pending[scope] = pending.get(scope, 0) + delta
+    keys = [_counter_key(*scope) for scope in pending]
+    try:
+        _increment_script()(keys=keys, args=list(pending.values()))
+    except redis.RedisError as exc:
+        logger.warning("Unable to update %s month-to-date spend counters: %s", len(keys), exc)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction: SessionTransaction) -> None:
+    staged = session.info.get(_PENDING_KEY)
+    if staged:
+        staged[:] = [entry for entry in staged if not _within(entry[0], previous_transaction)]
+
+
+def _micro_to_decimal(value: int | str) -> Decimal:
+    return Decimal(int(value)).scaleb(-6)
+
+
+def _postgres_totals(
+    session: Session, org_id: UUID, month_start: date
+) -> dict[tuple[ProviderType, EnvironmentType], Decimal]:
+    stmt = (
+        select(DailyUsageCost.provider, DailyUsageCost.environment, func.sum(DailyUsageCost.cost_sum))
+        .where(DailyUsageCost.org_id == org_id)
+        .where(DailyUsageCost.day >= month_start)
+        .group_by(DailyUsageCost.provider, DailyUsageCost.environment)
+    )
+    return {(provider, env): Decimal(total or 0) for provider, env, total in session.execute(stmt)}
+
+
+def month_to_date_totals(
+    session: Session,
+    org_id: UUID,
+    scopes: Iterable[tuple[ProviderType, EnvironmentType]],
+) -> dict[tuple[ProviderType, EnvironmentType], Decimal]:
+    """Return month-to-date spend per (provider, environment) from the Redis counters.
+
+    Missing counters are computed with one grouped query and seeded with ``SET NX`` so the next
+    read is a single ``MGET``. Redis errors fall back to Postgres for every scope.
+    """
+
+    scopes = list(scopes)
+    month_start = _current_month_start()
+    month = month_of(month_start)
+    keys = [_counter_key(org_id, provider, environment, month) for provider, environment in scopes]
+    try:
+        cached = redis_client().mget(keys) if keys else []
+    except redis.RedisError as exc:
+        logger.warning("Month-to-date spend counters unavailable, reading Postgres: %s", exc)
+        cached = [None] * len(keys)
+
+    totals = {scope: _micro_to_decimal(value) for scope, value in zip(scopes, cached) if value is not None}
+    missing = [(scope, key) for scope, key, value in zip(scopes, keys, cached) if value is None]
+    if not missing:
+        return totals
+
+    computed = _postgres_totals(session, org_id, month_start)
+    try:
+        pipe = redis_client().pipeline(transaction=False)
+        for scope, key in missing:
+            total = computed.get(scope, Decimal("0"))
+            totals[scope] = total
+            pipe.set(key, int(total.scaleb(6)), nx=True, ex=_COUNTER_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to seed month-to-date spend counters: %s", exc)
+        totals.update({scope: computed.get(scope, Decimal("0")) for scope, _ in missing})
+    return totals
+
+
+def month_to_date(
+    session: Session, org_id: UUID, provider: ProviderType, environment: EnvironmentType
+) -> Decimal:
+    return month_to_date_totals(session, org_id, [(provider, environment)])[(provider, environment)]
+
+
+def reconcile(session: Session) -> int:
+    """Overwrite this month's counters with the totals in ``daily_usage_costs``.
+
+    Corrects drift from failed increments, reads that seeded a counter while a write was in
+    flight, and backfills that rewrite daily rows. Returns the number of counters written.
+    """
+
+    month_start = _current_month_start()
+    month = month_of(month_start)
+    stmt = (
+        select(
+            DailyUsageCost.org_id,
+            DailyUsageCost.provider,
+            DailyUsageCost.environment,
+            func.sum(DailyUsageCost.cost_sum),
+        )
+        .where(DailyUsageCost.day >= month_start)
+        .group_by(DailyUsageCost.org_id, DailyUsageCost.provider, DailyUsageCost.environment)
+    )
+    pipe = redis_client().pipeline(transaction=False)
+    written = 0
+    for org_id, provider, environment, total in session.execute(stmt):
+        key = _counter_key(org_id, provider, environment, month)
+        pipe.set(key, int(Decimal(total or 0).scaleb(6)), ex=_COUNTER_TTL_SECONDS)
+        written += 1
+    pipe.execute()
+    return written
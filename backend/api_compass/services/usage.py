@@ -1,24 +1,33 @@
 from __future__ import annotations
 
 from calendar import monthrange
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from hashlib import sha256
+import json
+import sys
 import time
 from typing import Any, Iterable, Sequence
 from uuid import UUID, uuid5
 
-from sqlalchemy import func, select, text
+from sqlalchemy import select, text, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from api_compass.core.config import settings
 from api_compass.db.session import engine
 from api_compass.models.enums import EnvironmentType, ProviderType
 from api_compass.models.tables import Budget, Connection, DailyUsageCost, RawUsageEvent
+from api_compass.services import spend_counters
 
 USAGE_EVENT_NAMESPACE = UUID("f4e8b4a0-9bd3-4f16-9930-49f9f1469ef8")
 MONEY_QUANT = Decimal("0.01")
+MICRO_UNITS = 1_000_000
+_MICRO_QUANT = Decimal("0.000001")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Keeps multi-row statements well below PostgreSQL's 65535 bind parameter limit.
+BULK_INSERT_CHUNK_SIZE = 1000
 PROJECTION_TOOLTIP = (
     "Projection blends the 7-day and 14-day rolling averages with a short-term linear trend. "
     "The confidence range comes from the variance of the recent 14-day window."
@@ -47,94 +56,508 @@ class UsageSample:
         return (self.quantity * self.unit_cost).quantize(Decimal("0.000001"))
 
 
-def _stable_event_id(sample: UsageSample) -> UUID:
-    token = f"{sample.provider.value}:{sample.connection_id or sample.org_id}:{sample.metric}:{sample.ts.isoformat()}"
-    return uuid5(USAGE_EVENT_NAMESPACE, token)
+def _event_id(provider: ProviderType, scope_id: UUID, metric: str, ts: datetime) -> UUID:
+    return uuid5(USAGE_EVENT_NAMESPACE, f"{provider.value}:{scope_id}:{metric}:{ts.isoformat()}")
 
 
-def save_usage_samples(session: Session, samples: Iterable[UsageSample]) -> int:
-    saved = 0
-    for sample in samples:
-        event_id = _stable_event_id(sample)
-        payload = {
-            "id": event_id,
-            "org_id": sample.org_id,
-            "connection_id": sample.connection_id,
-            "provider": sample.provider,
-            "environment": sample.environment,
-            "metric": sample.metric,
-            "unit": sample.unit,
-            "quantity": sample.quantity,
-            "unit_cost": sample.unit_cost,
-            "cost": sample.cost,
-            "currency": sample.currency,
-            "ts": sample.ts,
-            "source": sample.source,
-            "metadata_json": sample.metadata,
-        }
+def stable_event_id(sample: UsageSample) -> UUID:
+    return _event_id(sample.provider, sample.connection_id or sample.org_id, sample.metric, sample.ts)
+
+
+def _micro_parts(value: Decimal | int | str) -> tuple[int, bool]:
+    """Return ``value`` in micro-units and whether the conversion was exact."""
+
+    if isinstance(value, int):
+        return value * MICRO_UNITS, True
+    scaled = Decimal(value).scaleb(6)
+    rounded = scaled.to_integral_value(rounding=ROUND_HALF_UP)
+    return int(rounded), rounded == scaled
+
+
+def to_micro(value: Decimal | int | str) -> int:
+    """Convert a quantity or price to integer micro-units, rounding like ``numeric(20, 6)``."""
+
+    return _micro_parts(value)[0]
+
+
+def _micro_product(quantity: int, unit_cost: int) -> int:
+    # Matches Decimal.quantize's default ROUND_HALF_EVEN on the exact product.
+    whole, remainder = divmod(quantity * unit_cost, MICRO_UNITS)
+    twice = remainder * 2
+    if twice > MICRO_UNITS or (twice == MICRO_UNITS and whole % 2):
+        whole += 1
+    return whole
+
+
+def from_micro(value: int) -> Decimal:
+    return Decimal(value).scaleb(-6)
+
+
+def format_micro(value: int) -> str:
+    sign = "-" if value < 0 else ""
+    whole, fraction = divmod(abs(value), MICRO_UNITS)
+    return f"{sign}{whole}.{fraction:06d}"
+
+
+def _epoch_micros(ts: datetime) -> int:
+    delta = ts - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * MICRO_UNITS + delta.microseconds
+
+
+def _from_epoch_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+@dataclass(slots=True)
+class UsageSampleBatch:
+    """Column-oriented usage samples that feed the database writers directly.
+
+    Quantities, unit costs and costs are integer micro-units, timestamps are epoch microseconds,
+    and repeated metric/unit/currency strings are interned. Event ids and days are derived from
+    the original timestamps when rows are appended so they match ``stable_event_id``.
+    """
+
+    event_ids: list[UUID] = field(default_factory=list)
+    org_ids: list[UUID] = field(default_factory=list)
+    connection_ids: list[UUID | None] = field(default_factory=list)
+    providers: list[ProviderType] = field(default_factory=list)
+    environments: list[EnvironmentType] = field(default_factory=list)
+    metrics: list[str] = field(default_factory=list)
+    units: list[str] = field(default_factory=list)
+    currencies: list[str] = field(default_factory=list)
+    quantities: list[int] = field(default_factory=list)
+    unit_costs: list[int | None] = field(default_factory=list)
+    timestamps: list[int] = field(default_factory=list)
+    days: list[date] = field(default_factory=list)
+    sources: list[str] = field(default_factory=list)
+    metadata: list[dict[str, Any] | None] = field(default_factory=list)
+    costs: list[int | None] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.event_ids)
+
+    def append(
+        self,
+        *,
+        org_id: UUID,
+        connection_id: UUID | None,
+        provider: ProviderType,
+        environment: EnvironmentType,
+        metric: str,
+        unit: str,
+        quantity: Decimal | int | str,
+        unit_cost: Decimal | int | str | None,
+        currency: str,
+        ts: datetime,
+        source: str,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self.event_ids.append(_event_id(provider, connection_id or org_id, metric, ts))
+        self.org_ids.append(org_id)
+        self.connection_ids.append(connection_id)
+        self.providers.append(provider)
+        self.environments.append(environment)
+        self.metrics.append(sys.intern(metric))
+        self.units.append(sys.intern(unit))
+        self.currencies.append(sys.intern(currency))
+        quantity_micro, quantity_exact = _micro_parts(quantity)
+        self.quantities.append(quantity_micro)
+        if unit_cost is None:
+            self.unit_costs.append(None)
+            self.costs.append(None)
+        else:
+            unit_cost_micro, unit_cost_exact = _micro_parts(unit_cost)
+            self.unit_costs.append(unit_cost_micro)
+            if quantity_exact and unit_cost_exact:
+                self.costs.append(_micro_product(quantity_micro, unit_cost_micro))
+            else:
+                # Inputs finer than micro-units are priced from the exact values, like UsageSample.cost.
+                exact = (Decimal(quantity) * Decimal(unit_cost)).quantize(_MICRO_QUANT)
+                self.costs.append(to_micro(exact))
+        # Naive timestamps are taken as UTC, which is how Postgres stores them in timestamptz columns.
+        aware = ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+        self.timestamps.append(_epoch_micros(aware))
+        self.days.append(ts.date())
+        self.sources.append(source)
+        self.metadata.append(metadata)
+
+    def extend(self, other: UsageSampleBatch) -> None:
+        for name in _BATCH_COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def take(self, indices: Iterable[int]) -> UsageSampleBatch:
+        rows = list(indices)
+        subset = UsageSampleBatch()
+        for name in _BATCH_COLUMNS:
+            column = getattr(self, name)
+            setattr(subset, name, [column[index] for index in rows])
+        return subset
+
+    @classmethod
+    def from_samples(cls, samples: Iterable[UsageSample]) -> UsageSampleBatch:
+        batch = cls()
+        for sample in samples:
+            batch.append(
+                org_id=sample.org_id,
+                connection_id=sample.connection_id,
+                provider=sample.provider,
+                environment=sample.environment,
+                metric=sample.metric,
+                unit=sample.unit,
+                quantity=sample.quantity,
+                unit_cost=sample.unit_cost,
+                currency=sample.currency,
+                ts=sample.ts,
+                source=sample.source,
+                metadata=sample.metadata,
+            )
+        return batch
+
+    def ts(self, index: int) -> datetime:
+        return _from_epoch_micros(self.timestamps[index])
+
+    def max_ts(self) -> datetime | None:
+        if not self.timestamps:
+            return None
+        return _from_epoch_micros(max(self.timestamps))
+
+    def unique_indices(self) -> list[int]:
+        first: dict[UUID, int] = {}
+        for index, event_id in enumerate(self.event_ids):
+            first.setdefault(event_id, index)
+        return list(first.values())
+
+
+_BATCH_COLUMNS = tuple(name for name in UsageSampleBatch.__dataclass_fields__ if not name.startswith("_"))
+
+
+def _as_batch(samples: UsageSampleBatch | Iterable[UsageSample]) -> UsageSampleBatch:
+    if isinstance(samples, UsageSampleBatch):
+        return samples
+    return UsageSampleBatch.from_samples(samples)
+
+
+def _raw_event_values(batch: UsageSampleBatch, index: int) -> dict[str, Any]:
+    unit_cost = batch.unit_costs[index]
+    cost = batch.costs[index]
+    return {
+        "id": batch.event_ids[index],
+        "org_id": batch.org_ids[index],
+        "connection_id": batch.connection_ids[index],
+        "provider": batch.providers[index],
+        "environment": batch.environments[index],
+        "metric": batch.metrics[index],
+        "unit": batch.units[index],
+        "quantity": from_micro(batch.quantities[index]),
+        "unit_cost": None if unit_cost is None else from_micro(unit_cost),
+        "cost": None if cost is None else from_micro(cost),
+        "currency": batch.currencies[index],
+        "ts": batch.ts(index),
+        "source": batch.sources[index],
+        "metadata_json": batch.metadata[index],
+    }
+
+
+def save_usage_samples(
+    session: Session, samples: UsageSampleBatch | Iterable[UsageSample], *, revise: bool = False
+) -> int:
+    """Insert new raw events and roll them into daily costs using set-based statements.
+
+    Raw events are written with multi-row ``INSERT ... ON CONFLICT DO NOTHING RETURNING id``
+    statements; only the rows Postgres reports as new contribute to ``daily_usage_costs``.
+
+    With ``revise``, samples whose event is already stored with a different quantity or cost
+    replace it and the difference is applied to ``daily_usage_costs``. Pollers use this for
+    provider buckets that are re-read and corrected after they were first stored. Returns the
+    number of events inserted or revised.
+    """
+
+    batch = _as_batch(samples)
+    rows = batch.unique_indices()
+    if not rows:
+        return 0
+    if revise:
+        revised, fresh = _revise_stored_samples(session, batch, rows)
+        if len(fresh) < len(rows):
+            return revised + save_usage_samples(session, batch.take(fresh))
+    if len(rows) >= settings.ingest_copy_threshold:
+        return copy_usage_samples(session, batch, rows)
+
+    row_by_id = {batch.event_ids[index]: index for index in rows}
+    inserted: list[int] = []
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        chunk = rows[start : start + BULK_INSERT_CHUNK_SIZE]
         stmt = (
             insert(RawUsageEvent)
-            .values(**payload)
+            .values([_raw_event_values(batch, index) for index in chunk])
             .on_conflict_do_nothing(index_elements=["id", "ts"])
+            .returning(RawUsageEvent.id)
         )
-        result = session.execute(stmt)
-        if result.rowcount == 0:
-            continue
+        inserted.extend(row_by_id[event_id] for event_id in session.execute(stmt).scalars())
 
-        saved += 1
-        _upsert_daily_cost(session, sample)
-    return saved
+    _upsert_daily_costs(session, batch, inserted)
+    return len(inserted)
 
 
-def _upsert_daily_cost(session: Session, sample: UsageSample) -> None:
-    day = sample.ts.date()
-    cost_value = sample.cost or Decimal("0")
-    stmt = (
-        insert(DailyUsageCost)
-        .values(
-            org_id=sample.org_id,
-            provider=sample.provider,
-            environment=sample.environment,
-            day=day,
-            quantity_sum=sample.quantity,
-            cost_sum=cost_value,
-            currency=sample.currency,
+# Primary key plus the columns a provider correction can change.
+_REVISED_COLUMNS = ("id", "ts", "quantity", "unit_cost", "cost", "metadata_json")
+
+
+def _revise_stored_samples(
+    session: Session, batch: UsageSampleBatch, rows: list[int]
+) -> tuple[int, list[int]]:
+    """Overwrite stored events whose quantity or cost changed, returning the count and new rows.
+
+    Stored rows are locked while they are compared, so concurrent revisions of the same bucket
+    apply their difference to ``daily_usage_costs`` once each.
+    """
+
+    stored: dict[UUID, tuple[Decimal, Decimal | None]] = {}
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        chunk = rows[start : start + BULK_INSERT_CHUNK_SIZE]
+        timestamps = [batch.ts(index) for index in chunk]
+        stmt = (
+            select(RawUsageEvent.id, RawUsageEvent.quantity, RawUsageEvent.cost)
+            .where(RawUsageEvent.id.in_([batch.event_ids[index] for index in chunk]))
+            .where(RawUsageEvent.ts.between(min(timestamps), max(timestamps)))
+            .with_for_update()
         )
-        .on_conflict_do_update(
+        stored.update((event_id, (quantity, cost)) for event_id, quantity, cost in session.execute(stmt))
+    if not stored:
+        return 0, rows
+
+    fresh: list[int] = []
+    changes: list[dict[str, Any]] = []
+    deltas: dict[tuple[UUID, ProviderType, EnvironmentType, date], list[Any]] = {}
+    for index in rows:
+        previous = stored.get(batch.event_ids[index])
+        if previous is None:
+            fresh.append(index)
+            continue
+        quantity = batch.quantities[index]
+        cost = batch.costs[index]
+        old_quantity = to_micro(previous[0])
+        old_cost = None if previous[1] is None else to_micro(previous[1])
+        if quantity == old_quantity and cost == old_cost:
+            continue
+        values = _raw_event_values(batch, index)
+        changes.append({name: values[name] for name in _REVISED_COLUMNS})
+        key = (batch.org_ids[index], batch.providers[index], batch.environments[index], batch.days[index])
+        delta = deltas.setdefault(key, [0, 0, batch.currencies[index]])
+        delta[0] += quantity - old_quantity
+        delta[1] += (cost or 0) - (old_cost or 0)
+
+    if changes:
+        session.execute(update(RawUsageEvent), changes)
+        _apply_daily_deltas(session, deltas)
+    return len(changes), fresh
+
+
+def _upsert_daily_costs(session: Session, batch: UsageSampleBatch, rows: Sequence[int]) -> None:
+    deltas: dict[tuple[UUID, ProviderType, EnvironmentType, date], list[Any]] = {}
+    costs = batch.costs
+    for index in rows:
+        key = (batch.org_ids[index], batch.providers[index], batch.environments[index], batch.days[index])
+        delta = deltas.get(key)
+        if delta is None:
+            delta = deltas[key] = [0, 0, batch.currencies[index]]
+        delta[0] += batch.quantities[index]
+        delta[1] += costs[index] or 0
+        delta[2] = batch.currencies[index]
+    _apply_daily_deltas(session, deltas)
+
+
+def _apply_daily_deltas(
+    session: Session, deltas: dict[tuple[UUID, ProviderType, EnvironmentType, date], list[Any]]
+) -> None:
+    """Add per-day [quantity, cost, currency] deltas (micro-units) to ``daily_usage_costs``."""
+
+    values = [
+        {
+            "org_id": org_id,
+            "provider": provider,
+            "environment": environment,
+            "day": day,
+            "quantity_sum": from_micro(quantity_sum),
+            "cost_sum": from_micro(cost_sum),
+            "currency": currency,
+        }
+        for (org_id, provider, environment, day), (quantity_sum, cost_sum, currency) in deltas.items()
+    ]
+    monthly: dict[spend_counters.Scope, int] = {}
+    for (org_id, provider, environment, day), (_, cost_sum, _) in deltas.items():
+        scope = (org_id, provider, environment, spend_counters.month_of(day))
+        monthly[scope] = monthly.get(scope, 0) + cost_sum
+    spend_counters.stage(session, monthly)
+    for start in range(0, len(values), BULK_INSERT_CHUNK_SIZE):
+        stmt = insert(DailyUsageCost).values(values[start : start + BULK_INSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
             constraint="uq_daily_usage_scope",
             set_={
-                "quantity_sum": DailyUsageCost.quantity_sum + sample.quantity,
-                "cost_sum": DailyUsageCost.cost_sum + cost_value,
-                "currency": sample.currency,
+                "quantity_sum": DailyUsageCost.quantity_sum + stmt.excluded.quantity_sum,
+                "cost_sum": DailyUsageCost.cost_sum + stmt.excluded.cost_sum,
+                "currency": stmt.excluded.currency,
             },
         )
-    )
-    session.execute(stmt)
+        session.execute(stmt)
+
+
+_STAGING_COLUMNS = (
+    "id",
+    "org_id",
+    "connection_id",
+    "provider",
+    "environment",
+    "metric",
+    "unit",
+    "quantity",
+    "unit_cost",
+    "cost",
+    "currency",
+    "ts_us",
+    "source",
+    "metadata",
+    "day",
+)
 
+_CREATE_STAGING_SQL = text(
+    """
+    CREATE TEMP TABLE usage_samples_staging (
+        id uuid NOT NULL,
+        org_id uuid NOT NULL,
+        connection_id uuid,
+        provider text NOT NULL,
+        environment text NOT NULL,
+        metric text NOT NULL,
+        unit text NOT NULL,
+        quantity numeric(20, 6) NOT NULL,
+        unit_cost numeric(20, 6),
+        cost numeric(20, 6),
+        currency text NOT NULL,
+        ts_us bigint NOT NULL,
+        source text,
+        metadata jsonb,
+        day date NOT NULL
+    ) ON COMMIT DROP
+    """
+)
 
-def month_to_date_spend(
-    session: Session, org_id: UUID, provider: ProviderType, environment: EnvironmentType
-) -> Decimal:
-    today = date.today()
-    start = today.replace(day=1)
-    result = session.execute(
-        select(func.coalesce(func.sum(DailyUsageCost.cost_sum), 0))
-        .where(DailyUsageCost.org_id == org_id)
-        .where(DailyUsageCost.provider == provider)
-        .where(DailyUsageCost.environment == environment)
-        .where(DailyUsageCost.day >= start)
+_MERGE_STAGING_SQL = text(
+    """
+    WITH inserted AS (
+        INSERT INTO raw_usage_events (
+            id, org_id, connection_id, provider, environment, metric, unit,
+            quantity, unit_cost, cost, currency, ts, source, metadata
+        )
+        SELECT
+            id, org_id, connection_id, provider::provider_enum, environment::environment_enum,
+            metric, unit, quantity, unit_cost, cost, currency,
+            TIMESTAMPTZ 'epoch' + ts_us * INTERVAL '1 microsecond', source, metadata
+        FROM usage_samples_staging
+        ON CONFLICT (id, ts) DO NOTHING
+        RETURNING id
+    ),
+    rolled AS (
+        INSERT INTO daily_usage_costs (org_id, provider, environment, day, quantity_sum, cost_sum, currency)
+        SELECT
+            staged.org_id,
+            staged.provider::provider_enum,
+            staged.environment::environment_enum,
+            staged.day,
+            SUM(staged.quantity),
+            COALESCE(SUM(staged.cost), 0),
+            MAX(staged.currency)
+        FROM inserted
+        JOIN usage_samples_staging AS staged ON staged.id = inserted.id
+        GROUP BY staged.org_id, staged.provider, staged.environment, staged.day
+        ON CONFLICT (org_id, provider, environment, day)
+        DO UPDATE SET
+            quantity_sum = daily_usage_costs.quantity_sum + EXCLUDED.quantity_sum,
+            cost_sum = daily_usage_costs.cost_sum + EXCLUDED.cost_sum,
+            currency = EXCLUDED.currency
     )
-    return result.scalar_one()
+    SELECT
+        staged.org_id,
+        staged.provider,
+        staged.environment,
+        to_char(staged.day, 'YYYY-MM') AS month,
+        COUNT(*) AS saved,
+        COALESCE(SUM(staged.cost), 0) AS cost
+    FROM inserted
+    JOIN usage_samples_staging AS staged ON staged.id = inserted.id
+    GROUP BY staged.org_id, staged.provider, staged.environment, month
+    """
+)
+
+
+def copy_usage_samples(session: Session, batch: UsageSampleBatch, rows: Sequence[int]) -> int:
+    """Stream de-duplicated rows through ``COPY FROM STDIN`` and merge them server-side.
+
+    Used by ``save_usage_samples`` once a batch reaches ``settings.ingest_copy_threshold``; the
+    staging table lives in the session's transaction so a rollback discards it with the events.
+    """
+
+    session.execute(_CREATE_STAGING_SQL)
+    driver_connection = session.connection().connection.driver_connection
+    columns = ", ".join(_STAGING_COLUMNS)
+    costs = batch.costs
+    with driver_connection.cursor() as cursor:
+        with cursor.copy(f"COPY usage_samples_staging ({columns}) FROM STDIN") as copy:
+            for index in rows:
+                unit_cost = batch.unit_costs[index]
+                cost = costs[index]
+                metadata = batch.metadata[index]
+                copy.write_row(
+                    (
+                        batch.event_ids[index],
+                        batch.org_ids[index],
+                        batch.connection_ids[index],
+                        batch.providers[index].value,
+                        batch.environments[index].value,
+                        batch.metrics[index],
+                        batch.units[index],
+                        format_micro(batch.quantities[index]),
+                        None if unit_cost is None else format_micro(unit_cost),
+                        None if cost is None else format_micro(cost),
+                        batch.currencies[index],
+                        batch.timestamps[index],
+                        batch.sources[index],
+                        json.dumps(metadata) if metadata is not None else None,
+                        batch.days[index],
+                    )
+                )
+
+    saved = 0
+    monthly: dict[spend_counters.Scope, int] = {}
+    for org_id, provider, environment, month, count, cost in session.execute(_MERGE_STAGING_SQL):
+        scope = (org_id, ProviderType(provider), EnvironmentType(environment), month)
+        monthly[scope] = to_micro(cost)
+        saved += count
+    session.execute(text("DROP TABLE usage_samples_staging"))
+    spend_counters.stage(session, monthly)
+    return saved
+
+
+def get_month_to_date_spend(
+    session: Session,
+    org_id: UUID,
+    environment: EnvironmentType,
+    provider: ProviderType | None = None,
+) -> dict[ProviderType, Decimal]:
+    """Month-to-date spend per provider, served from the Redis counters in ``spend_counters``."""
+
+    providers = [provider] if provider else list(ProviderType)
+    totals = spend_counters.month_to_date_totals(session, org_id, [(prov, environment) for prov in providers])
+    return {prov: _quantize_money(totals[(prov, environment)]) for prov in providers}
 
 
-def describe_samples(samples: Iterable[UsageSample]) -> dict[str, Any]:
+def describe_samples(samples: UsageSampleBatch | Iterable[UsageSample]) -> dict[str, Any]:
+    batch = _as_batch(samples)
     metrics: dict[str, str] = {}
-    total_cost = Decimal("0")
-    for sample in samples:
-        metrics[sample.metric] = f"{sample.quantity} {sample.unit}"
-        if sample.cost is not None:
-            total_cost += sample.cost
-    return {"metrics": metrics, "total_cost": total_cost}
+    for metric, quantity, unit in zip(batch.metrics, batch.quantities, batch.units):
+        metrics[metric] = f"{from_micro(quantity).normalize():f} {unit}"
+    total_cost = sum((cost for cost in batch.costs if cost is not None), start=0)
+    return {"metrics": metrics, "total_cost": from_micro(total_cost)}
 
 
 def _daily_quantity(connection: Connection, metric: str, minimum: int, maximum: int, *, ts: datetime) -> Decimal:
@@ -377,6 +800,7 @@ def get_usage_projections(
 
     budget_index = _load_budget_index(session, org_id)
 
+    # Trends need the per-day series, so this reads daily rows rather than the spend_counters total.
     query = (
         select(
             DailyUsageCost.provider,
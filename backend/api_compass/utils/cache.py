@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe, size-bounded LRU whose entries expire after a fixed TTL.
+
+    Size and TTL are read through callables so settings overrides apply without rebuilding.
+    """
+
+    def __init__(self, max_size: Callable[[], int], ttl_seconds: Callable[[], float]) -> None:
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V, *, keep_expiry: bool = False) -> None:
+        """Store ``value``; with ``keep_expiry`` only refresh an entry that is already cached."""
+
+        max_size = self._max_size()
+        if max_size <= 0:
+            return
+        with self._lock:
+            current = self._entries.get(key)
+            if keep_expiry:
+                if current is None:
+                    return
+                expires_at = current[0]
+            else:
+                expires_at = time.monotonic() + self._ttl_seconds()
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import zlib
+from typing import AsyncIterator, Iterator
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Decoders hand output back in pieces of at most this size, checking the size cap on each one, so
+# a small high-ratio body never expands past the cap in memory.
+_OUTPUT_CHUNK = 64 * 1024
+# Feeding zstd small input slices keeps the output buffered between yields small as well.
+_ZSTD_INPUT_SLICE = 1024
+
+
+class BodyDecodingError(ValueError):
+    """Raised when a request body cannot be decoded."""
+
+
+class UnsupportedEncodingError(BodyDecodingError):
+    def __init__(self, encoding: str) -> None:
+        super().__init__(f"Unsupported Content-Encoding '{encoding}'.")
+        self.encoding = encoding
+
+
+class DecodedSizeExceededError(BodyDecodingError):
+    def __init__(self, limit: int) -> None:
+        super().__init__(f"Decompressed body exceeds {limit} bytes.")
+        self.limit = limit
+
+
+class _Decoder:
+    def __init__(self, max_bytes: int | None) -> None:
+        self._max_bytes = max_bytes
+        self._total = 0
+
+    def _emit(self, piece: bytes) -> bytes:
+        self._total += len(piece)
+        if self._max_bytes is not None and self._total > self._max_bytes:
+            raise DecodedSizeExceededError(self._max_bytes)
+        return piece
+
+    def decode(self, chunk: bytes) -> Iterator[bytes]:
+        yield self._emit(chunk)
+
+    def finish(self) -> Iterator[bytes]:
+        return iter(())
+
+
+class _GzipDecoder(_Decoder):
+    def __init__(self, max_bytes: int | None) -> None:
+        super().__init__(max_bytes)
+        self._inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+
+    def decode(self, chunk: bytes) -> Iterator[bytes]:
+        data = chunk
+        while data:
+            try:
+                piece = self._inflater.decompress(data, _OUTPUT_CHUNK)
+            except zlib.error as exc:
+                raise BodyDecodingError("Invalid gzip body.") from exc
+            data = self._inflater.unconsumed_tail
+            yield self._emit(piece)
+
+    def finish(self) -> Iterator[bytes]:
+        if not self._inflater.eof:
+            raise BodyDecodingError("Truncated gzip body.")
+        yield self._emit(self._inflater.flush())
+
+
+class _ZstdDecoder(_Decoder):
+    def __init__(self, max_bytes: int | None) -> None:
+        super().__init__(max_bytes)
+        self._pending: list[bytes] = []
+        # The writer hands every ``_OUTPUT_CHUNK`` of output to ``write`` below, which raises once
+        # the cap is passed, so decompression itself stops at the limit.
+        self._writer = zstandard.ZstdDecompressor().stream_writer(
+            self, write_size=_OUTPUT_CHUNK, closefd=False
+        )
+
+    def write(self, data: bytes) -> int:
+        self._pending.append(self._emit(bytes(data)))
+        return len(data)
+
+    def decode(self, chunk: bytes) -> Iterator[bytes]:
+        for start in range(0, len(chunk), _ZSTD_INPUT_SLICE):
+            try:
+                self._writer.write(chunk[start : start + _ZSTD_INPUT_SLICE])
+            except zstandard.ZstdError as exc:
+                raise BodyDecodingError("Invalid zstd body.") from exc
+            pieces, self._pending = self._pending, []
+            yield from pieces
+
+
+def _decoder_for(content_encoding: str | None, max_bytes: int | None) -> _Decoder:
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _Decoder(max_bytes)
+    if encoding in {"gzip", "x-gzip"}:
+        return _GzipDecoder(max_bytes)
+    if encoding == "zstd" and zstandard is not None:
+        return _ZstdDecoder(max_bytes)
+    raise UnsupportedEncodingError(encoding)
+
+
+def supported_encodings() -> list[str]:
+    encodings = ["identity", "gzip"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+async def iter_decoded(
+    chunks: AsyncIterator[bytes],
+    content_encoding: str | None,
+    *,
+    max_bytes: int | None = None,
+) -> AsyncIterator[bytes]:
+    """Decompress a request body incrementally, enforcing ``max_bytes`` on the decoded size."""
+
+    decoder = _decoder_for(content_encoding, max_bytes)
+    async for chunk in chunks:
+        for piece in decoder.decode(chunk):
+            if piece:
+                yield piece
+    for piece in decoder.finish():
+        if piece:
+            yield piece
+
+
+async def read_decoded(
+    chunks: AsyncIterator[bytes],
+    content_encoding: str | None,
+    *,
+    max_bytes: int | None = None,
+) -> bytes:
+    body = bytearray()
+    async for piece in iter_decoded(chunks, content_encoding, max_bytes=max_bytes):
+        body.extend(piece)
+    return bytes(body)
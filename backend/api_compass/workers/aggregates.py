@@ -6,6 +6,8 @@ from celery.utils.log import get_task_logger
 
 from api_compass.celery_app import celery_app
 from api_compass.core.config import settings
+from api_compass.db.session import SessionLocal
+from api_compass.services import spend_counters
 from api_compass.services import usage as usage_service
 
 logger = get_task_logger(__name__)
@@ -30,4 +32,14 @@ def refresh_daily_usage_costs(days: int | None = None) -> dict[str, Any]:
         result["windows"],
         result["duration_seconds"],
     )
+    # The backfill rewrites daily rows wholesale, so the hot counters must follow.
+    reconcile_mtd_spend()
     return result
+
+
+@celery_app.task(name="usage.reconcile_mtd_spend")
+def reconcile_mtd_spend() -> int:
+    with SessionLocal() as session:
+        written = spend_counters.reconcile(session)
+    logger.info("Reconciled %s month-to-date spend counters", written)
+    return written
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from celery.utils.log import get_task_logger
+
+from api_compass.celery_app import celery_app
+from api_compass.db.session import SessionLocal
+from api_compass.services import ingest as ingest_service
+
+logger = get_task_logger(__name__)
+
+
+@celery_app.task(name="ingest.drain_queue")
+def drain_ingest_queue_task() -> dict[str, int]:  # type: ignore[override]
+    with SessionLocal() as session:
+        result = ingest_service.drain_queue(session)
+    if result["entries"]:
+        logger.info(
+            "Drained %s queued ingest payloads (%s new samples)", result["entries"], result["ingested"]
+        )
+    if result["dead_lettered"]:
+        logger.warning("Moved %s ingest payloads to the dead-letter stream", result["dead_lettered"])
+    return result
@@ -2,43 +2,37 @@ from __future__ import annotations
 
 import random
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator
 from uuid import UUID
 
 import redis
-from celery import Task
+import sqlalchemy as sa
+from celery import Task, chord
 from celery.utils.log import get_task_logger
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Select, func, literal, or_, select
 from sqlalchemy.orm import Session
 
 from api_compass.celery_app import celery_app
-from api_compass.core.config import settings
+from api_compass.core.config import PollMode, settings
+from api_compass.core.plans import PLAN_DEFINITIONS
 from api_compass.db.session import SessionLocal
-from api_compass.models.enums import ConnectionStatus, ProviderType
-from api_compass.models.tables import Connection
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection, OrgEntitlement
 from api_compass.core import telemetry
+from api_compass.services import circuit_breaker
 from api_compass.services import entitlements as entitlement_service
+from api_compass.services import jobs
+from api_compass.services import provider_cache
+from api_compass.services import providers as provider_service
+from api_compass.services import spend_counters
 from api_compass.services import usage as usage_service
 from api_compass.services.jobs import redis_client
+from api_compass.services.providers import ProviderAPIError, RateLimitExhaustedError, RetryableProviderError
 
 logger = get_task_logger(__name__)
 
 
-class ProviderAPIError(Exception):
-    """Base exception for provider polling failures."""
-
-    def __init__(self, provider: ProviderType, connection_id: UUID, status_code: int, message: str | None = None):
-        self.provider = provider
-        self.connection_id = connection_id
-        self.status_code = status_code
-        self.message = message or "Provider API error"
-        super().__init__(f"{provider.value} poll failed for {connection_id}: {self.message} ({status_code})")
-
-
-class RetryableProviderError(ProviderAPIError):
-    """Raised when providers respond with 429 or transient 5xx errors."""
-
-
 class ProviderPollTask(Task):
     """Base task that configures automatic retries/backoff for transient provider failures."""
 
@@ -54,46 +48,118 @@ def _now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _polling_bucket() -> str:
-    interval = max(settings.worker_poll_interval_seconds, 60)
-    current_epoch = int(_now().timestamp())
-    bucket = current_epoch // interval
-    return str(bucket)
+def _poll_slot(snapshot: entitlement_service.FeatureSnapshot, ts: datetime) -> str:
+    """Return the window of the org's sync interval that contains ``ts``.
+
+    Sweeps and scheduled syncs both lock ``(connection, slot)``, so whichever path claims a
+    connection first in a window is the only one that polls it.
+    """
 
+    interval = max(snapshot.sync_interval_minutes, 1) * 60
+    return str(int(ts.timestamp()) // interval)
 
-def _idempotency_key(provider: ProviderType, connection_id: UUID, bucket: str) -> str:
-    return f"connections:poll:{provider.value}:{connection_id}:{bucket}"
 
+def _idempotency_key(provider: ProviderType, connection_id: UUID, slot: str) -> str:
+    return f"connections:poll:{provider.value}:{connection_id}:{slot}"
 
-def _acquire_idempotency_lock(
+
+def _acquire_idempotency_locks(
     client: redis.Redis,
     provider: ProviderType,
-    connection_id: UUID,
-    bucket: str,
-) -> bool:
-    key = _idempotency_key(provider, connection_id, bucket)
+    claims: list[tuple[UUID, str]],
+) -> list[UUID]:
+    """Claim the poll lock of every (connection, slot) pair in one pipelined round trip.
+
+    Returns the connections whose ``SET NX`` succeeded, in input order. If Redis is unavailable
+    every connection is returned so polling keeps moving.
+    """
+
+    if not claims:
+        return []
     ttl = settings.worker_idempotency_ttl_seconds
+    claimed_at = _now().isoformat()
     try:
-        acquired = client.set(key, _now().isoformat(), nx=True, ex=ttl)
-        if not acquired:
-            logger.debug(
-                "Skipping poll for %s connection %s; already processed within window %s",
-                provider.value,
-                connection_id,
-                bucket,
-            )
-        return bool(acquired)
+        pipe = client.pipeline(transaction=False)
+        for connection_id, slot in claims:
+            pipe.set(_idempotency_key(provider, connection_id, slot), claimed_at, nx=True, ex=ttl)
+        replies = pipe.execute()
     except redis.RedisError as exc:  # pragma: no cover - defensive guard that keeps job moving
-        logger.warning("Unable to enforce idempotency for %s: %s", key, exc)
-        return True
+        logger.warning("Unable to enforce idempotency for %s polls: %s", provider.value, exc)
+        return [connection_id for connection_id, _ in claims]
+
+    acquired = [connection_id for (connection_id, _), reply in zip(claims, replies) if reply]
+    if len(acquired) < len(claims):
+        logger.debug(
+            "Skipping %s %s connections already being processed for their window",
+            len(claims) - len(acquired),
+            provider.value,
+        )
+    return acquired
+
+
+def _release_idempotency_locks(
+    client: redis.Redis, provider: ProviderType, claims: list[tuple[UUID, str]]
+) -> None:
+    # Unsynced connections go back into the schedule, possibly within the same slot; dropping
+    # their locks lets that retry claim them again.
+    if not claims:
+        return
+    try:
+        client.delete(*(_idempotency_key(provider, connection_id, slot) for connection_id, slot in claims))
+    except redis.RedisError as exc:
+        logger.warning("Unable to release %s %s poll locks: %s", len(claims), provider.value, exc)
 
 
-def _active_connections(session: Session, provider: ProviderType) -> list[Connection]:
-    stmt = (
-        select(Connection)
+# Orgs without an entitlement row fall back to plan defaults, so the SQL pre-filter assumes the
+# shortest interval of any plan; ``allow_sync`` still makes the exact decision per connection.
+_MIN_SYNC_INTERVAL_MINUTES = min(plan.sync_interval_minutes for plan in PLAN_DEFINITIONS.values())
+
+
+def _due_clause(horizon: datetime) -> ColumnElement[bool]:
+    interval = literal(timedelta(minutes=1), sa.Interval) * func.coalesce(
+        OrgEntitlement.sync_interval_minutes, _MIN_SYNC_INTERVAL_MINUTES
+    )
+    return or_(Connection.last_synced_at.is_(None), Connection.last_synced_at + interval <= horizon)
+
+
+def _eligible_ids(provider: ProviderType, horizon: datetime) -> Select[tuple[UUID]]:
+    return (
+        select(Connection.id)
+        .outerjoin(OrgEntitlement, OrgEntitlement.org_id == Connection.org_id)
         .where(Connection.provider == provider, Connection.status == ConnectionStatus.ACTIVE)
         .where(Connection.local_connector_enabled.is_(False))
-        .order_by(Connection.created_at.asc())
+        .where(_due_clause(horizon))
+    )
+
+
+def _iter_id_pages(
+    session: Session, provider: ProviderType, horizon: datetime, page_size: int
+) -> Iterator[list[UUID]]:
+    """Stream eligible connection ids in primary-key order, one keyset page at a time."""
+
+    after: UUID | None = None
+    while True:
+        stmt = _eligible_ids(provider, horizon).order_by(Connection.id).limit(page_size)
+        if after is not None:
+            stmt = stmt.where(Connection.id > after)
+        page = list(session.execute(stmt).scalars())
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = page[-1]
+
+
+def _shard_ids(session: Session, provider: ProviderType, first_id: UUID, last_id: UUID) -> list[UUID]:
+    # Re-check eligibility so connections revoked or synced since dispatch are skipped.
+    stmt = _eligible_ids(provider, _now()).where(Connection.id.between(first_id, last_id))
+    return list(session.execute(stmt).scalars())
+
+
+def _shard_connections(session: Session, connection_ids: list[UUID]) -> list[Connection]:
+    # Scheduled syncs are claimed ahead of time, so skip anything revoked since.
+    stmt = select(Connection).where(
+        Connection.id.in_(connection_ids), Connection.status == ConnectionStatus.ACTIVE
     )
     return session.execute(stmt).scalars().all()
 
@@ -115,103 +181,495 @@ def _maybe_raise_simulated_error(connection: Connection) -> None:
         raise ProviderAPIError(connection.provider, connection.id, status_code, "provider rejected request")
 
 
-def _apply_jitter_delay(batch_size: int) -> None:
-    """Distribute work within ±10% of the interval without blocking the entire worker."""
+def _dispatch_offsets(shard_count: int) -> list[float]:
+    """Spread shard start times over the jitter window instead of sleeping inside workers.
 
-    if batch_size <= 1:
-        return
+    Each shard gets its own slot of the window plus a random offset within that slot, so the
+    broker holds the delayed tasks and workers stay free for whatever is already runnable.
+    """
 
     interval = max(settings.worker_poll_interval_seconds, 60)
     total_window = interval * settings.worker_poll_jitter_ratio
-    if total_window <= 0:
-        return
+    if shard_count <= 1 or total_window <= 0:
+        return [0.0] * shard_count
+
+    slot = total_window / shard_count
+    return [index * slot + random.uniform(0, slot) for index in range(shard_count)]
+
+
+def _report_failure(connection: Connection, exc: BaseException) -> None:
+    telemetry.capture_exception(
+        exc,
+        {
+            "org_id": str(connection.org_id),
+            "connection_id": str(connection.id),
+            "provider": connection.provider.value,
+            "environment": connection.environment.value,
+        },
+    )
+    logger.error(
+        "Polling failed for connection %s org %s", connection.id, connection.org_id, exc_info=exc
+    )
 
-    per_connection_window = total_window / batch_size
-    if per_connection_window <= 0:
-        return
 
-    offset = random.uniform(0, per_connection_window)
-    if offset > 0:
-        time.sleep(offset)
+def _store_samples(
+    session: Session, connection: Connection, samples: list[usage_service.UsageSample], ts: datetime
+) -> dict[str, Any] | None:
+    """Write the samples and ``last_synced_at`` in the current transaction; the caller commits."""
 
+    provider = connection.provider
+    if not samples:
+        logger.info("Connection %s has no usage samples for provider %s", connection.id, provider.value)
+        return None
+
+    batch = usage_service.UsageSampleBatch.from_samples(samples)
+    # Overlap re-reads return the same buckets; revising them picks up late provider corrections.
+    created = usage_service.save_usage_samples(session, batch, revise=True)
+    if created == 0:
+        logger.info("Usage already ingested for %s connection %s at %s", provider.value, connection.id, ts.date())
+        return None
+
+    connection.last_synced_at = ts
+    session.add(connection)
+    return usage_service.describe_samples(batch)
+
+
+def _advance_cursor(connection: Connection, page: provider_service.UsagePage) -> None:
+    if page.settled_until is not None and (
+        connection.usage_cursor_at is None or page.settled_until > connection.usage_cursor_at
+    ):
+        connection.usage_cursor_at = page.settled_until
+    connection.usage_cursor = page.next_page
+
+
+class _GroupCommit:
+    """Commit polled connections in groups of ``WORKER_POLL_COMMIT_BATCH_SIZE`` or
+    ``WORKER_POLL_COMMIT_INTERVAL_MS``, whichever fills first.
+
+    Each connection is written inside a SAVEPOINT so a failure only discards its own rows. A
+    connection only counts as synced once its group commits; samples and ``last_synced_at`` land
+    in the same transaction, so a lost group is reported in ``failed``, polled again and
+    deduplicated on conflict. HTTP validators are stored after the commit for the same reason.
+    """
+
+    def __init__(self, session: Session, provider: ProviderType):
+        self.session = session
+        self.provider = provider
+        self.synced: dict[UUID, datetime] = {}
+        self.failed: dict[UUID, BaseException] = {}
+        self._pending: list[
+            tuple[
+                UUID,
+                UUID,
+                EnvironmentType,
+                datetime,
+                dict[str, Any] | None,
+                dict[str, provider_cache.Validator],
+            ]
+        ] = []
+        self._opened_at = time.monotonic()
+
+    def store(
+        self,
+        connection: Connection,
+        samples: list[usage_service.UsageSample],
+        ts: datetime,
+        page: provider_service.UsagePage | None = None,
+    ) -> None:
+        if not self._pending:
+            self._opened_at = time.monotonic()
+        with self.session.begin_nested():
+            summary = _store_samples(self.session, connection, samples, ts)
+            if page is not None:
+                # The cursor moves in the same transaction as the samples it covers. A fetch that
+                # found nothing new (including a 304) still completed the sync.
+                _advance_cursor(connection, page)
+                connection.last_synced_at = ts
+        if summary is not None or page is not None:
+            validators = page.validators if page is not None else {}
+            self._pending.append(
+                (connection.id, connection.org_id, connection.environment, ts, summary, validators)
+            )
+        elapsed_ms = (time.monotonic() - self._opened_at) * 1000
+        if (
+            len(self._pending) >= settings.worker_poll_commit_batch_size
+            or elapsed_ms >= settings.worker_poll_commit_interval_ms
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        try:
+            self.session.commit()
+        except Exception as exc:
+            self.session.rollback()
+            telemetry.capture_exception(exc, {"provider": self.provider.value, "connections": len(pending)})
+            logger.error(
+                "Group commit of %s %s connections failed", len(pending), self.provider.value, exc_info=exc
+            )
+            self.failed.update((entry[0], exc) for entry in pending)
+            return
+
+        for connection_id, org_id, environment, ts, summary, validators in pending:
+            self.synced[connection_id] = ts
+            for path, validator in validators.items():
+                provider_cache.save(connection_id, path, validator)
+            if summary is None:
+                logger.debug("No new %s usage for connection=%s", self.provider.value, connection_id)
+                continue
+            mtd_spend = spend_counters.month_to_date(self.session, org_id, self.provider, environment)
+            logger.info(
+                "Polled %s connection=%s org=%s metrics=%s daily_cost=%s mtd_cost=%s",
+                self.provider.value,
+                connection_id,
+                org_id,
+                summary["metrics"],
+                summary["total_cost"],
+                mtd_spend,
+            )
+
+
+def _is_outage(exc: BaseException) -> bool:
+    # 429s are throttling (handled by the rate limiter); only 5xx and transport errors trip the circuit.
+    return isinstance(exc, RetryableProviderError) and exc.status_code >= 500
+
+
+class _ShardBreaker:
+    """Feed one shard's poll outcomes to the provider's circuit breaker as they happen.
+
+    A success resets the breaker only if no failure in this shard has tripped it; once tripped,
+    the rest of the shard is deferred and the next shard's probe decides when to close again.
+    The reset is skipped while nothing has failed since the last one, so a healthy shard costs a
+    single ``DEL``.
+    """
+
+    def __init__(self, provider: ProviderType, admission: circuit_breaker.Admission):
+        self.provider = provider
+        self.admission = admission
+        # Connections left unsynced while the circuit is open or half-open wait out the open window.
+        self.deferring = admission != circuit_breaker.Admission.CLOSED
+        self.tripped = False
+        self.failures: dict[UUID, BaseException] = {}
+        self._reset_pending = True
+
+    def succeeded(self, connection: Connection) -> None:
+        if self.tripped or not self._reset_pending:
+            return
+        circuit_breaker.record_success(self.provider)
+        self._reset_pending = False
+        self.deferring = False
+
+    def failed(self, connection: Connection, exc: BaseException) -> bool:
+        """Report ``exc`` and return whether the rest of the shard should be deferred."""
+
+        self.failures[connection.id] = exc
+        # Once the circuit opens the rest of the shard is deferred without paging Sentry again.
+        if self.tripped:
+            return True
+        if isinstance(exc, RateLimitExhaustedError):
+            # Our own throttling, not a provider fault: the connection simply waits for its retry slot.
+            logger.debug(
+                "Local %s rate limit exhausted, skipping connection=%s", self.provider.value, connection.id
+            )
+            return self.deferring
+        _report_failure(connection, exc)
+        if _is_outage(exc):
+            self._reset_pending = True
+            if circuit_breaker.record_failure(self.provider):
+                logger.warning("%s circuit open, deferring remaining connections", self.provider.value)
+                self.tripped = True
+                self.deferring = True
+        return self.deferring
+
+
+def _poll_connections_synthetic(
+    group: _GroupCommit,
+    connections: list[Connection],
+    due: Callable[[Connection, datetime], bool],
+    breaker: _ShardBreaker,
+) -> None:
+    for connection in connections:
+        ts = _now()
+        if not due(connection, ts):
+            continue
+        try:
+            _maybe_raise_simulated_error(connection)
+            breaker.succeeded(connection)
+            group.store(connection, usage_service.build_provider_samples(connection, ts), ts)
+        except Exception as exc:
+            if breaker.failed(connection, exc):
+                break
+    group.flush()
+
+
+def _poll_connections_async(
+    group: _GroupCommit,
+    connections: list[Connection],
+    due: Callable[[Connection, datetime], bool],
+    breaker: _ShardBreaker,
+) -> None:
+    """Fetch every due connection concurrently through the pooled HTTP client, then save serially."""
+
+    ts = _now()
+    pending: list[Connection] = []
+    for connection in connections:
+        if not due(connection, ts):
+            continue
+        try:
+            _maybe_raise_simulated_error(connection)
+        except ProviderAPIError as exc:
+            if breaker.failed(connection, exc):
+                return
+            continue
+        pending.append(connection)
+
+    for connection, result in zip(pending, provider_service.fetch_usage(pending, ts)):
+        if isinstance(result, BaseException):
+            breaker.failed(connection, result)
+            continue
+        breaker.succeeded(connection)
+        try:
+            group.store(connection, result.samples, ts, result)
+        except Exception as exc:
+            breaker.failed(connection, exc)
+    group.flush()
+
+
+def _retry_delay(failures: int) -> timedelta:
+    # Doubles with each consecutive failure so broken connections stop hammering the provider.
+    delay = settings.worker_retry_backoff_seconds * 2 ** min(max(failures - 1, 0), 16)
+    return timedelta(seconds=min(delay, settings.worker_sync_retry_max_seconds))
+
+
+def _next_due(
+    snapshot: entitlement_service.FeatureSnapshot,
+    last_synced_at: datetime | None,
+    now: datetime,
+    failures: int = 0,
+) -> datetime:
+    retry_at = now + _retry_delay(failures)
+    if last_synced_at is None:
+        return retry_at
+    return max(last_synced_at + timedelta(minutes=snapshot.sync_interval_minutes), retry_at)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    # Provider rejections such as a 401 will not fix themselves; anything else is worth a retry.
+    return not isinstance(exc, ProviderAPIError) or isinstance(exc, RetryableProviderError)
+
+
+def _poll_claims(
+    session: Session, provider: ProviderType, connection_ids: list[UUID]
+) -> dict[str, int | float]:
+    """Lock, sync and reschedule the claimed connections, returning counts for the callers' logs.
+
+    Every locked connection goes back into ``connections:sync-jobs`` at its next due time, so the
+    deadline scheduler keeps tracking it whichever path ran the sync.
+    """
 
-def _poll_provider(provider: ProviderType) -> int:
-    bucket = _polling_bucket()
-    processed = 0
     start = time.monotonic()
-    redis_conn = redis_client()
-    entitlements_cache: dict[UUID, entitlement_service.FeatureSnapshot] = {}
+    connections = _shard_connections(session, connection_ids)
+    snapshots = entitlement_service.get_entitlements_bulk(
+        session, (connection.org_id for connection in connections)
+    )
+    claimed_at = _now()
+    slots = {
+        connection.id: _poll_slot(snapshots[connection.org_id], claimed_at) for connection in connections
+    }
+    client = redis_client()
+    acquired = set(_acquire_idempotency_locks(client, provider, list(slots.items())))
+    connections = [connection for connection in connections if connection.id in acquired]
+    if not connections:
+        return {"processed": 0, "busy_seconds": time.monotonic() - start}
+
+    last_synced = {
+        connection.id: (connection.org_id, connection.last_synced_at) for connection in connections
+    }
+
+    breaker = _ShardBreaker(provider, circuit_breaker.admit(provider))
+    if breaker.admission == circuit_breaker.Admission.OPEN:
+        runnable: list[Connection] = []
+    elif breaker.admission == circuit_breaker.Admission.PROBE:
+        runnable = connections[:1]
+    else:
+        runnable = connections
+
+    def due(connection: Connection, ts: datetime) -> bool:
+        snapshot = snapshots[connection.org_id]
+        return entitlement_service.allow_sync(snapshot, connection.last_synced_at, ts)
+
+    group = _GroupCommit(session, provider)
+    if runnable and settings.worker_poll_mode == PollMode.ASYNC:
+        _poll_connections_async(group, runnable, due, breaker)
+    elif runnable:
+        _poll_connections_synthetic(group, runnable, due, breaker)
+    synced = group.synced
+    # Connections lost with a failed group commit are retried like any other transient failure.
+    failed = {**breaker.failures, **group.failed}
+
+    now = _now()
+    deferred_until = now + timedelta(seconds=settings.provider_circuit_open_seconds)
+    failures = jobs.record_sync_failures(
+        [connection_id for connection_id, exc in failed.items() if _is_transient(exc)]
+    )
+    jobs.reset_sync_failures(list(synced))
+
+    def next_due(connection_id: UUID, org_id: UUID, last_synced_at: datetime | None) -> datetime:
+        snapshot = snapshots[org_id]
+        if connection_id in synced:
+            return _next_due(snapshot, synced[connection_id], now)
+        if breaker.deferring:
+            return deferred_until
+        exc = failed.get(connection_id)
+        if exc is not None and not _is_transient(exc):
+            # Retrying a rejected credential cannot help; try again at the plan's normal cadence.
+            return now + timedelta(minutes=snapshot.sync_interval_minutes)
+        return _next_due(snapshot, last_synced_at, now, failures.get(connection_id, 0))
+
+    jobs.reschedule_syncs(
+        {
+            connection_id: next_due(connection_id, org_id, last_synced_at)
+            for connection_id, (org_id, last_synced_at) in last_synced.items()
+        }
+    )
+    _release_idempotency_locks(
+        client,
+        provider,
+        [
+            (connection_id, slots[connection_id])
+            for connection_id in last_synced
+            if connection_id not in synced
+        ],
+    )
+    return {"processed": len(synced), "busy_seconds": time.monotonic() - start}
+
 
+def _poll_shard(provider: ProviderType, first_id: UUID, last_id: UUID) -> dict[str, int | float]:
     with SessionLocal() as session:
-        connections = _active_connections(session, provider)
-        if not connections:
-            logger.info("No %s connections found for hourly poll.", provider.value)
-            return 0
-
-        logger.info("Polling %s connections for provider %s", len(connections), provider.value)
-        random.shuffle(connections)
-        for connection in connections:
-            if not _acquire_idempotency_lock(redis_conn, provider, connection.id, bucket):
-                continue
-            snapshot = entitlements_cache.get(connection.org_id)
-            if snapshot is None:
-                snapshot = entitlement_service.get_entitlements(session, connection.org_id)
-                entitlements_cache[connection.org_id] = snapshot
-            ts = _now()
-            if not entitlement_service.allow_sync(snapshot, connection.last_synced_at, ts):
-                continue
+        return _poll_claims(session, provider, _shard_ids(session, provider, first_id, last_id))
 
-            _apply_jitter_delay(len(connections))
-            try:
-                _maybe_raise_simulated_error(connection)
-                samples = usage_service.build_provider_samples(connection, ts)
-                if not samples:
-                    logger.info("Connection %s has no usage samples for provider %s", connection.id, provider.value)
-                    continue
-
-                created = usage_service.save_usage_samples(session, samples)
-                if created == 0:
-                    logger.info("Usage already ingested for %s connection %s at %s", provider.value, connection.id, ts.date())
-                    continue
-
-                session.flush()
-                mtd_spend = usage_service.month_to_date_spend(
-                    session, connection.org_id, connection.provider, connection.environment
-                )
-                summary = usage_service.describe_samples(samples)
 
-                connection.last_synced_at = ts
-                session.add(connection)
-                try:
-                    session.commit()
-                except Exception:
-                    session.rollback()
-                    raise
-
-                processed += 1
-                logger.info(
-                    "Polled %s connection=%s org=%s metrics=%s daily_cost=%s mtd_cost=%s",
-                    provider.value,
-                    connection.id,
-                    connection.org_id,
-                    summary["metrics"],
-                    summary["total_cost"],
-                    mtd_spend,
-                )
-            except Exception as exc:
-                telemetry.capture_exception(
-                    exc,
-                    {
-                        "org_id": str(connection.org_id),
-                        "connection_id": str(connection.id),
-                        "provider": connection.provider.value,
-                        "environment": connection.environment.value,
-                    },
+def _active_among(session: Session, connection_ids: list[UUID]) -> dict[UUID, ProviderType]:
+    stmt = (
+        select(Connection.id, Connection.provider)
+        .where(Connection.id.in_(connection_ids))
+        .where(Connection.status == ConnectionStatus.ACTIVE)
+        .where(Connection.local_connector_enabled.is_(False))
+    )
+    return dict(session.execute(stmt).all())
+
+
+def _dispatch_due_jobs() -> int:
+    """Hand due ``connections:sync-jobs`` entries to ``polling.sync_connections`` by provider.
+
+    Claimed ids for revoked, deleted or local-mode connections are dropped here, which is what
+    keeps the ZSET from accumulating entries nobody will ever sync.
+    """
+
+    dispatched = 0
+    trimmed = 0
+    batch_size = settings.worker_sync_dispatch_batch_size
+    for _ in range(settings.worker_sync_dispatch_max_batches):
+        claimed = jobs.claim_due_syncs(batch_size)
+        if not claimed:
+            break
+        with SessionLocal() as session:
+            providers = _active_among(session, [connection_id for connection_id, _ in claimed])
+
+        by_provider: dict[ProviderType, list[str]] = {}
+        for connection_id, _ in claimed:
+            provider = providers.get(connection_id)
+            if provider is None:
+                trimmed += 1
+                continue
+            by_provider.setdefault(provider, []).append(str(connection_id))
+        shard_size = settings.worker_poll_shard_size
+        for provider, entries in by_provider.items():
+            for index in range(0, len(entries), shard_size):
+                sync_connections.apply_async(
+                    args=(provider.value, entries[index : index + shard_size]), queue="polling"
                 )
-                logger.exception("Polling failed for connection %s org %s", connection.id, connection.org_id)
+            dispatched += len(entries)
+        if len(claimed) < batch_size:
+            break
+    if trimmed:
+        logger.info("Trimmed %s sync jobs for inactive or deleted connections", trimmed)
+    return dispatched
+
 
-    duration = time.monotonic() - start
-    logger.info("Finished %s poll with %s successful syncs in %.2fs", provider.value, processed, duration)
+def _poll_provider(provider: ProviderType) -> int:
+    """Fan the provider's active connections out to ``polling.poll_shard`` tasks.
+
+    Returns the number of connections dispatched; the chord callback logs and returns the
+    aggregated count of successful syncs once every shard has finished.
+    """
+
+    # Shards start up to the jitter window later, so include connections that fall due by then.
+    horizon = _now() + timedelta(seconds=settings.worker_poll_interval_seconds * settings.worker_poll_jitter_ratio)
+    # Only page boundaries are kept, so dispatcher memory is independent of the connection count;
+    # each shard re-reads its own key range when it runs.
+    bounds: list[tuple[str, str]] = []
+    dispatched = 0
+    with SessionLocal() as session:
+        for page in _iter_id_pages(session, provider, horizon, settings.worker_poll_shard_size):
+            bounds.append((str(page[0]), str(page[-1])))
+            dispatched += len(page)
+    if not bounds:
+        logger.info("No %s connections found for hourly poll.", provider.value)
+        return 0
+
+    # Shard key ranges over random UUIDs are already spread across orgs; shuffling the start
+    # order keeps low ids from always polling first.
+    random.shuffle(bounds)
+    shards = [
+        poll_shard.s(provider.value, first_id, last_id).set(queue="polling", countdown=offset)
+        for (first_id, last_id), offset in zip(bounds, _dispatch_offsets(len(bounds)))
+    ]
+    callback = collect_poll_results.s(provider.value, time.time()).set(queue="polling")
+    chord(shards)(callback)
+    logger.info("Dispatched %s %s connections across %s polling shards", dispatched, provider.value, len(shards))
+    return dispatched
+
+
+@celery_app.task(name="polling.poll_shard", bind=True, base=ProviderPollTask)
+def poll_shard(  # type: ignore[override]
+    self, provider: str, first_id: str, last_id: str
+) -> dict[str, int | float]:
+    return _poll_shard(ProviderType(provider), UUID(first_id), UUID(last_id))
+
+
+@celery_app.task(name="polling.sync_connections", bind=True, base=ProviderPollTask)
+def sync_connections(  # type: ignore[override]
+    self, provider: str, connection_ids: list[str]
+) -> dict[str, int | float]:
+    claims = [UUID(connection_id) for connection_id in connection_ids]
+    with SessionLocal() as session:
+        return _poll_claims(session, ProviderType(provider), claims)
+
+
+@celery_app.task(name="polling.dispatch_due")
+def dispatch_due_syncs() -> int:  # type: ignore[override]
+    dispatched = _dispatch_due_jobs()
+    if dispatched:
+        logger.info("Dispatched %s due connection syncs", dispatched)
+    return dispatched
+
+
+@celery_app.task(name="polling.collect_results")
+def collect_poll_results(  # type: ignore[override]
+    results: list[dict[str, int | float]], provider: str, started_at: float
+) -> int:
+    processed = sum(int(result["processed"]) for result in results)
+    busy_seconds = sum(float(result["busy_seconds"]) for result in results)
+    duration = time.time() - started_at
+    logger.info(
+        "Finished %s poll with %s successful syncs in %.2fs (%.2fs of worker time across %s shards)",
+        provider,
+        processed,
+        duration,
+        busy_seconds,
+        len(results),
+    )
     return processed
 
 
@@ -230,4 +688,14 @@ def poll_sendgrid(self) -> int:  # type: ignore[override]
     return _poll_provider(ProviderType.SENDGRID)
 
 
-__all__ = ("poll_openai", "poll_twilio", "poll_sendgrid", "ProviderAPIError", "RetryableProviderError")
+__all__ = (
+    "poll_openai",
+    "poll_twilio",
+    "poll_sendgrid",
+    "poll_shard",
+    "sync_connections",
+    "dispatch_due_syncs",
+    "collect_poll_results",
+    "ProviderAPIError",
+    "RetryableProviderError",
+)
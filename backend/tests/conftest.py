@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import fakeredis
 import pytest
 from pathlib import Path
 
@@ -12,6 +13,7 @@ from sqlalchemy import delete, inspect, text
 from api_compass.db.session import DATABASE_URL, SessionLocal, engine, apply_rls_scope, reset_rls_scope
 from api_compass.main import app
 from api_compass.models.tables import Budget, Connection, DailyUsageCost, Org
+from api_compass.services import jobs, rate_limits, spend_counters
 
 
 def _alembic_config() -> AlembicConfig:
@@ -57,6 +59,19 @@ def client() -> TestClient:
     return TestClient(app)
 
 
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point every ``redis_client()`` caller at an in-memory Redis with Lua support."""
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(jobs, "_CLIENT", client)
+    # Registered scripts are bound to the client that created them.
+    monkeypatch.setattr(jobs, "_claim", None)
+    monkeypatch.setattr(spend_counters, "_increment", None)
+    monkeypatch.setattr(rate_limits, "_reserve", None)
+    return client
+
+
 @pytest.fixture
 def db_session():
     session = SessionLocal()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services import circuit_breaker
+from api_compass.services.jobs import redis_client
+from api_compass.services.providers import RateLimitExhaustedError, RetryableProviderError
+from api_compass.workers import polling
+
+
+def test_circuit_opens_after_threshold_and_half_opens_with_one_probe(monkeypatch):
+    provider = ProviderType.SENDGRID
+    keys = circuit_breaker._keys(provider)
+    redis_client().delete(*keys)
+    monkeypatch.setattr(settings, "provider_circuit_failure_threshold", 2)
+
+    try:
+        assert circuit_breaker.admit(provider) == circuit_breaker.Admission.CLOSED
+        assert circuit_breaker.record_failure(provider) is False
+        assert circuit_breaker.record_failure(provider) is True
+        assert circuit_breaker.admit(provider) == circuit_breaker.Admission.OPEN
+        assert circuit_breaker.states()[provider.value] == "open"
+
+        # Simulate the open window lapsing: only one caller at a time gets to probe.
+        redis_client().delete(keys[1])
+        assert circuit_breaker.admit(provider) == circuit_breaker.Admission.PROBE
+        assert circuit_breaker.admit(provider) == circuit_breaker.Admission.OPEN
+        assert circuit_breaker.states()[provider.value] == "half_open"
+
+        circuit_breaker.record_success(provider)
+        assert circuit_breaker.admit(provider) == circuit_breaker.Admission.CLOSED
+    finally:
+        redis_client().delete(*keys)
+
+
+def test_success_early_in_shard_does_not_close_a_circuit_tripped_later(monkeypatch, fake_redis):
+    provider = ProviderType.OPENAI
+    monkeypatch.setattr(settings, "provider_circuit_failure_threshold", 2)
+    connections = [
+        Connection(
+            id=uuid4(),
+            org_id=uuid4(),
+            provider=provider,
+            environment=EnvironmentType.PROD,
+            status=ConnectionStatus.ACTIVE,
+        )
+        for _ in range(4)
+    ]
+    outage = RetryableProviderError(provider, connections[1].id, 503, "transient provider error")
+
+    breaker = polling._ShardBreaker(provider, circuit_breaker.admit(provider))
+    breaker.succeeded(connections[0])
+    assert breaker.failed(connections[1], outage) is False
+    assert breaker.failed(connections[2], outage) is True
+    # Results arriving after the trip must not reset it.
+    breaker.succeeded(connections[3])
+
+    assert breaker.deferring is True
+    assert circuit_breaker.admit(provider) == circuit_breaker.Admission.OPEN
+
+
+def test_local_rate_limit_exhaustion_is_skipped_without_reporting(monkeypatch, fake_redis):
+    provider = ProviderType.TWILIO
+    monkeypatch.setattr(settings, "provider_circuit_failure_threshold", 1)
+    reported: list[BaseException] = []
+    monkeypatch.setattr(polling, "_report_failure", lambda connection, exc: reported.append(exc))
+    connection = Connection(
+        id=uuid4(),
+        org_id=uuid4(),
+        provider=provider,
+        environment=EnvironmentType.PROD,
+        status=ConnectionStatus.ACTIVE,
+    )
+    exhausted = RateLimitExhaustedError(provider, connection.id, 429, "local rate limit exhausted")
+
+    breaker = polling._ShardBreaker(provider, circuit_breaker.admit(provider))
+    assert breaker.failed(connection, exhausted) is False
+
+    assert reported == []
+    assert circuit_breaker.admit(provider) == circuit_breaker.Admission.CLOSED
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from uuid import UUID
 
+from api_compass.services import local_agents
 from api_compass.services.jobs import cancellation_key, redis_client
 
 
@@ -42,7 +43,11 @@ def test_connections_crud_flow(client, org_headers):
     key = cancellation_key(UUID(connection_id))
     ttl = r.ttl(key)
     assert ttl is not None and ttl > 0 and ttl <= 60
-    r.delete(key)
+    assert r.zscore("connections:sync-jobs", connection_id) is None
+    # Committing the revoke bumps the credential version every API process checks.
+    version_key = local_agents._version_key(UUID(connection_id))
+    assert r.get(version_key) is not None
+    r.delete(key, version_key)
 
 
 def test_local_connector_flow(client, org_headers):
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from api_compass.core.config import settings
+from api_compass.models.enums import EnvironmentType, ProviderType
+from api_compass.services import dedupe
+from api_compass.services.usage import UsageSampleBatch
+
+
+def _batch(connection_id, count: int, metric: str = "openai:tokens") -> UsageSampleBatch:
+    batch = UsageSampleBatch()
+    start = datetime(2024, 5, 24, tzinfo=timezone.utc)
+    for index in range(count):
+        batch.append(
+            org_id=uuid4(),
+            connection_id=connection_id,
+            provider=ProviderType.OPENAI,
+            environment=EnvironmentType.PROD,
+            metric=metric,
+            unit="token",
+            quantity=1,
+            unit_cost="0.000002",
+            currency="usd",
+            ts=start + timedelta(seconds=index),
+            source="test",
+        )
+    return batch
+
+
+class _StoredEvents:
+    """Stands in for the session: every id it is asked about is already stored."""
+
+    def __init__(self):
+        self.lookups: list[int] = []
+
+    def execute(self, stmt):
+        [ids] = [value for value in stmt.compile().params.values() if isinstance(value, list)]
+        self.lookups.append(len(ids))
+        return _Result(ids)
+
+
+class _Result:
+    def __init__(self, ids):
+        self._ids = ids
+
+    def scalars(self):
+        return self._ids
+
+
+def test_filter_grows_past_its_first_slice_and_confirms_in_chunks(monkeypatch, fake_redis):
+    monkeypatch.setattr(settings, "ingest_dedupe_enabled", True)
+    monkeypatch.setattr(settings, "ingest_dedupe_filter_bits", 1024)
+    monkeypatch.setattr(dedupe, "BULK_INSERT_CHUNK_SIZE", 100)
+    connection_id = uuid4()
+    seen = _batch(connection_id, 300)
+
+    dedupe.remember(seen)
+    key = dedupe._filter_key(seen, 0)
+    assert int(fake_redis.get(dedupe._count_key(key))) == 300
+    # 300 samples overflow the first two slices (85 and 170 samples) into the third.
+    assert dedupe._active_slice(300) == 2
+
+    session = _StoredEvents()
+    result = dedupe.filter_known(session, seen)
+    assert result.skipped == 300
+    assert len(result.fresh) == 0
+    # A fully replayed batch is trusted to the filter and costs no lookups.
+    assert session.lookups == []
+
+    # Below the trusted hit rate, hits are confirmed in chunks.
+    mixed = _batch(connection_id, 300)
+    mixed.extend(_batch(connection_id, 20, metric="openai:requests"))
+    session = _StoredEvents()
+    result = dedupe.filter_known(session, mixed)
+    assert session.lookups[:3] == [100, 100, 100]
+    # The stand-in session confirms every id, false positives included.
+    assert result.skipped == sum(session.lookups) >= 300
+
+    unseen = _batch(connection_id, 300, metric="openai:requests")
+    session = _StoredEvents()
+    result = dedupe.filter_known(session, unseen)
+    # Only false positives reach Postgres, and the growing filter keeps them rare.
+    assert sum(session.lookups) < 15
+    assert result.checked == 300
+
+
+def test_filter_is_skipped_when_disabled(monkeypatch, fake_redis):
+    batch = _batch(uuid4(), 5)
+    monkeypatch.setattr(settings, "ingest_dedupe_enabled", False)
+    dedupe.remember(batch)
+    assert fake_redis.keys("ingest:seen:*") == []
+    assert dedupe.filter_known(_StoredEvents(), batch).fresh is batch
+
+
+def test_remember_on_commit_waits_for_the_commit_and_drops_rolled_back_batches(monkeypatch, fake_redis):
+    monkeypatch.setattr(settings, "ingest_dedupe_enabled", True)
+    engine = create_engine("sqlite://")
+    connection_id = uuid4()
+    rolled_back, committed = _batch(connection_id, 3), _batch(connection_id, 2, metric="openai:requests")
+
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        dedupe.remember_on_commit(session, rolled_back)
+        session.rollback()
+        session.execute(text("SELECT 1"))
+        dedupe.remember_on_commit(session, committed)
+        assert fake_redis.keys(f"{dedupe._FILTER_PREFIX}*") == []
+        session.commit()
+
+    [count_key] = fake_redis.keys(f"{dedupe._FILTER_PREFIX}*:n")
+    assert fake_redis.get(count_key) == "2"
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+
+from api_compass.services import ingest as ingest_service
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def _header(connection_id: str) -> dict[str, str]:
+    return {
+        "connection_id": connection_id,
+        "provider": "openai",
+        "environment": "prod",
+        "source": "local-agent",
+        "agent_version": "local-connector/2.0",
+    }
+
+
+def test_columnar_payloads_match_row_payload():
+    connection_id = str(uuid4())
+    org_id = uuid4()
+    row_body = json.dumps(
+        {
+            **_header(connection_id),
+            "samples": [
+                {"metric": "openai:tokens", "unit": "token", "quantity": 1200, "unit_cost": "0.000002",
+                 "ts": "2024-05-24T12:00:00Z"},
+                {"metric": "openai:requests", "unit": "request", "quantity": "2.5", "currency": "eur",
+                 "ts": "2024-05-24T12:01:00Z", "metadata": {"model": "gpt-4o"}},
+            ],
+        }
+    ).encode()
+    columnar = {
+        **_header(connection_id),
+        "version": 1,
+        "strings": ["openai:tokens", "token", "openai:requests", "request", "usd", "eur"],
+        "columns": {
+            "metric": [0, 2],
+            "unit": [1, 3],
+            "currency": [4, 5],
+            "quantity": [1200, "2.5"],
+            "unit_cost": ["0.000002", None],
+            "ts": [1716552000, 1716552060],
+            "metadata": [None, {"model": "gpt-4o"}],
+        },
+    }
+
+    row = ingest_service.parse_payload(row_body, "application/json")
+    expected = ingest_service.build_payload_samples(org_id, row.connection_id, row)
+    for body, media_type in (
+        (json.dumps(columnar).encode(), ingest_service.COLUMNAR_JSON_MEDIA_TYPE),
+        (msgpack.packb(columnar), "application/msgpack"),
+    ):
+        payload = ingest_service.parse_payload(body, media_type)
+        assert payload.sample_count == 2
+        assert ingest_service.build_payload_samples(org_id, payload.connection_id, payload) == expected
+
+
+def test_columnar_payload_rejects_ragged_columns_and_unknown_strings():
+    base = {
+        **_header(str(uuid4())),
+        "strings": ["openai:tokens", "token"],
+        "columns": {"metric": [0, 0], "unit": [1, 1], "quantity": [1, 2], "ts": [1716552000]},
+    }
+    with pytest.raises(ValidationError, match="columns.ts has 1 values"):
+        ingest_service.parse_payload(json.dumps(base), ingest_service.COLUMNAR_JSON_MEDIA_TYPE)
+
+    base["columns"]["ts"] = [1716552000, 1716552060]
+    base["columns"]["unit"] = [1, 7]
+    with pytest.raises(ValidationError, match="unknown string index 7"):
+        ingest_service.parse_payload(msgpack.packb(base), "application/msgpack")
+
+    with pytest.raises(ingest_service.MalformedPayloadError):
+        ingest_service.parse_payload(b"\xc1", "application/msgpack")
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services import ingest as ingest_service
+from api_compass.services import usage as usage_service
+
+
+class _Session:
+    """Just enough of a session for ``drain_queue``: connections by id and savepoints."""
+
+    def __init__(self, *connections: Connection):
+        self.connections = {connection.id: connection for connection in connections}
+        self.commits = 0
+
+    def get(self, model, connection_id):
+        return self.connections.get(connection_id)
+
+    @contextmanager
+    def begin_nested(self):
+        yield
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def _connection() -> Connection:
+    return Connection(
+        id=uuid4(),
+        org_id=uuid4(),
+        provider=ProviderType.OPENAI,
+        environment=EnvironmentType.PROD,
+        status=ConnectionStatus.ACTIVE,
+        local_connector_enabled=True,
+    )
+
+
+def _enqueue(connection: Connection, metric: str) -> str:
+    body = {
+        "connection_id": str(connection.id),
+        "provider": "openai",
+        "environment": "prod",
+        "samples": [{"metric": metric, "unit": "token", "quantity": 10, "ts": "2024-05-24T12:00:00Z"}],
+    }
+    received_at = datetime(2024, 5, 24, 12, 5, tzinfo=timezone.utc)
+    return ingest_service.enqueue_payload(connection.id, json.dumps(body).encode(), received_at)
+
+
+def _fail_on_poison(monkeypatch) -> list[list[str]]:
+    writes: list[list[str]] = []
+
+    def save(session, batch):
+        if "poison" in batch.metrics:
+            raise RuntimeError("value out of range")
+        writes.append(list(batch.metrics))
+        return len(batch)
+
+    monkeypatch.setattr(usage_service, "save_usage_samples", save)
+    return writes
+
+
+def test_drain_writes_and_acks_queued_payloads(monkeypatch, fake_redis):
+    writes = _fail_on_poison(monkeypatch)
+    connection = _connection()
+    _enqueue(connection, "openai:tokens")
+    _enqueue(connection, "openai:requests")
+
+    result = ingest_service.drain_queue(_Session(connection))
+
+    assert result == {"entries": 2, "ingested": 2, "dead_lettered": 0}
+    assert writes == [["openai:tokens", "openai:requests"]]
+    assert connection.last_synced_at == datetime(2024, 5, 24, 12, tzinfo=timezone.utc)
+    assert fake_redis.xlen(ingest_service.INGEST_STREAM) == 0
+
+
+def test_drain_reclaims_entries_abandoned_by_a_crashed_consumer(monkeypatch, fake_redis):
+    _fail_on_poison(monkeypatch)
+    monkeypatch.setattr(ingest_service, "_CLAIM_IDLE_MS", 0)
+    connection = _connection()
+    _enqueue(connection, "openai:tokens")
+    ingest_service._ensure_group(fake_redis)
+    # Another worker read the entry and died before acking it.
+    fake_redis.xreadgroup(ingest_service.INGEST_GROUP, "crashed", {ingest_service.INGEST_STREAM: ">"})
+
+    result = ingest_service.drain_queue(_Session(connection))
+
+    assert result["entries"] == 1
+    assert fake_redis.xpending(ingest_service.INGEST_STREAM, ingest_service.INGEST_GROUP)["pending"] == 0
+
+
+def test_poison_entry_is_isolated_then_dead_lettered(monkeypatch, fake_redis):
+    writes = _fail_on_poison(monkeypatch)
+    monkeypatch.setattr(settings, "ingest_queue_max_deliveries", 3)
+    connection = _connection()
+    _enqueue(connection, "openai:tokens")
+    poison_id = _enqueue(connection, "poison")
+    _enqueue(connection, "openai:requests")
+
+    session = _Session(connection)
+    result = ingest_service.drain_queue(session)
+    # The good entries are written around the poison one, which stays pending.
+    assert result == {"entries": 2, "ingested": 2, "dead_lettered": 0}
+    assert writes == [["openai:tokens"], ["openai:requests"]]
+    pending = fake_redis.xpending(ingest_service.INGEST_STREAM, ingest_service.INGEST_GROUP)
+    assert pending["pending"] == 1
+
+    # Every reclaim counts as a delivery; the third one gives up on the entry.
+    monkeypatch.setattr(ingest_service, "_CLAIM_IDLE_MS", 0)
+    result = ingest_service.drain_queue(session)
+    assert result["dead_lettered"] == 1
+    assert fake_redis.xlen(ingest_service.INGEST_STREAM) == 0
+    [(_, fields)] = fake_redis.xrange(ingest_service.INGEST_DEAD_LETTER_STREAM)
+    assert fields["entry_id"] == poison_id
+    assert "value out of range" in fields["error"]
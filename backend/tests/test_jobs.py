@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from api_compass.services import jobs
+
+
+def test_claim_pops_due_jobs_once_and_skips_cancelled(fake_redis):
+    now = datetime.now(timezone.utc)
+    due, cancelled, later = uuid4(), uuid4(), uuid4()
+    jobs.schedule_sync(due, now - timedelta(minutes=2))
+    jobs.schedule_sync(cancelled, now - timedelta(minutes=1))
+    jobs.schedule_sync(later, now + timedelta(minutes=5))
+    fake_redis.set(jobs.cancellation_key(cancelled), "1")
+
+    claimed = jobs.claim_due_syncs(10, now)
+
+    assert [connection_id for connection_id, _ in claimed] == [due]
+    assert claimed[0][1] == (now - timedelta(minutes=2)).timestamp()
+    # The cancelled entry is popped too; only the future job is left for the next tick.
+    assert fake_redis.zrange(jobs._JOBS_SET, 0, -1) == [str(later)]
+    assert jobs.claim_due_syncs(10, now) == []
+
+
+def test_claim_respects_limit_and_discards_unreadable_entries(fake_redis):
+    now = datetime.now(timezone.utc)
+    legacy = uuid4()
+    fake_redis.zadd(
+        jobs._JOBS_SET,
+        {
+            "not-a-uuid": now.timestamp() - 30,
+            json.dumps({"connection_id": str(legacy)}): now.timestamp() - 20,
+            str(uuid4()): now.timestamp() - 10,
+        },
+    )
+
+    assert jobs.claim_due_syncs(2, now) == [(legacy, now.timestamp() - 20)]
+    assert fake_redis.zcard(jobs._JOBS_SET) == 1
+
+
+def test_cancel_removes_schedule_and_reschedule_moves_due_time(fake_redis):
+    now = datetime.now(timezone.utc)
+    connection_id = uuid4()
+    jobs.schedule_sync(connection_id, now - timedelta(minutes=1))
+
+    jobs.cancel_scheduled_jobs(connection_id, ttl_seconds=30)
+    assert fake_redis.zscore(jobs._JOBS_SET, str(connection_id)) is None
+    assert 0 < fake_redis.ttl(jobs.cancellation_key(connection_id)) <= 30
+
+    # A claim already in flight when the connection was revoked re-queues it; the key still blocks it.
+    jobs.reschedule_syncs({connection_id: now - timedelta(seconds=1)})
+    assert jobs.claim_due_syncs(10, now) == []
+
+    fake_redis.delete(jobs.cancellation_key(connection_id))
+    jobs.reschedule_syncs({connection_id: now + timedelta(minutes=15)})
+    assert fake_redis.zscore(jobs._JOBS_SET, str(connection_id)) == (now + timedelta(minutes=15)).timestamp()
+    assert jobs.claim_due_syncs(10, now) == []
+    assert [claimed for claimed, _ in jobs.claim_due_syncs(10, now + timedelta(minutes=15))] == [connection_id]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services import local_agents
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class _Session:
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.loads = 0
+        self.sync_reads = 0
+
+    def execute(self, statement):
+        self.sync_reads += 1
+        return _Result(self.connection.last_synced_at)
+
+    def get(self, model, connection_id):
+        self.loads += 1
+        return self.connection if connection_id == self.connection.id else None
+
+
+def _local_connection() -> Connection:
+    token = local_agents.generate_agent_token()
+    return Connection(
+        id=uuid4(),
+        org_id=uuid4(),
+        provider=ProviderType.OPENAI,
+        environment=EnvironmentType.PROD,
+        status=ConnectionStatus.ACTIVE,
+        local_connector_enabled=True,
+        encrypted_auth_blob=local_agents.build_auth_blob(token),
+        last_synced_at=datetime(2024, 5, 24, tzinfo=timezone.utc),
+    )
+
+
+def test_cached_credential_reloads_after_another_process_invalidates_it(fake_redis):
+    connection = _local_connection()
+    session = _Session(connection)
+
+    first = local_agents.get_agent_credential(session, connection.id)
+    assert local_agents.get_agent_credential(session, connection.id) is first
+    assert session.loads == 1
+    # Sync state lives in Redis, not in the credential; see get_last_synced_at.
+    assert not hasattr(first, "last_synced_at")
+
+    # Another API process rotates the token: its commit bumps the shared version key.
+    connection.encrypted_auth_blob = local_agents.build_auth_blob(local_agents.generate_agent_token())
+    fake_redis.incr(local_agents._version_key(connection.id))
+
+    reloaded = local_agents.get_agent_credential(session, connection.id)
+    assert session.loads == 2
+    assert reloaded.agent_token != first.agent_token
+    assert local_agents.get_agent_credential(session, connection.id) is reloaded
+
+
+def test_invalidation_drops_local_entry_and_publishes_version(fake_redis):
+    connection = _local_connection()
+    session = _Session(connection)
+    local_agents.get_agent_credential(session, connection.id)
+
+    local_agents.invalidate_agent_credential(connection.id)
+
+    assert fake_redis.get(local_agents._version_key(connection.id)) == "1"
+    local_agents.get_agent_credential(session, connection.id)
+    assert session.loads == 2
+
+
+def test_last_sync_is_read_from_postgres_once_and_then_shared_through_redis(fake_redis):
+    connection = _local_connection()
+    session = _Session(connection)
+
+    assert local_agents.get_last_synced_at(session, connection.id) == connection.last_synced_at
+    assert local_agents.get_last_synced_at(session, connection.id) == connection.last_synced_at
+    assert session.sync_reads == 1
+
+    synced_at = connection.last_synced_at + timedelta(hours=1)
+    local_agents.record_sync(connection.id, synced_at)
+
+    assert local_agents.get_last_synced_at(session, connection.id) == synced_at
+    assert session.sync_reads == 1
+
+
+def test_never_synced_connection_is_cached_too(fake_redis):
+    connection = _local_connection()
+    connection.last_synced_at = None
+    session = _Session(connection)
+
+    assert local_agents.get_last_synced_at(session, connection.id) is None
+    assert local_agents.get_last_synced_at(session, connection.id) is None
+    assert session.sync_reads == 1
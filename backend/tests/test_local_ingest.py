@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import gzip
 import json
+import tracemalloc
 from datetime import datetime, timezone
+from decimal import Decimal
 from uuid import UUID
 
+import pytest
 from sqlalchemy import select
 
+from api_compass.core.config import settings
 from api_compass.db.session import apply_rls_scope, reset_rls_scope
-from api_compass.models.tables import Connection, RawUsageEvent
+from api_compass.models.tables import Connection, DailyUsageCost, RawUsageEvent
 from api_compass.services import local_agents
+from api_compass.services import usage as usage_service
 
 
 def _create_local_connection(client, headers) -> tuple[str, str]:
@@ -75,3 +81,254 @@ def test_local_ingest_persists_usage(client, org_headers, db_session):
         assert connection.local_agent_last_seen_at is not None
     finally:
         reset_rls_scope(db_session)
+
+
+def test_local_ingest_rolls_up_only_new_samples(client, org_headers, db_session):
+    headers, org_id = org_headers
+    connection_id, agent_token = _create_local_connection(client, headers)
+    ts = datetime.now(timezone.utc)
+    sample = {
+        "metric": "openai:tokens",
+        "unit": "token",
+        "quantity": 1000,
+        "unit_cost": "0.000002",
+        "currency": "usd",
+        "ts": ts.isoformat(),
+    }
+    ingest_payload = {
+        "connection_id": connection_id,
+        "provider": "openai",
+        "environment": "prod",
+        "samples": [sample, dict(sample), {**sample, "metric": "openai:requests", "quantity": 10}],
+    }
+    body = json.dumps(ingest_payload).encode("utf-8")
+    signature = local_agents.sign_payload(agent_token, body)
+    resp = client.post(
+        "/ingest/",
+        data=body,
+        headers={"Content-Type": "application/json", "X-Agent-Signature": signature},
+    )
+    assert resp.status_code == 202, resp.text
+    assert resp.json()["ingested"] == 2
+
+    apply_rls_scope(db_session, org_id)
+    try:
+        daily = (
+            db_session.execute(select(DailyUsageCost).where(DailyUsageCost.org_id == org_id))
+            .scalars()
+            .all()
+        )
+        assert len(daily) == 1
+        assert daily[0].day == ts.date()
+        assert daily[0].quantity_sum == Decimal("1010")
+        assert daily[0].cost_sum == Decimal("0.002020")
+    finally:
+        reset_rls_scope(db_session)
+
+
+def test_local_ingest_stream_writes_micro_batches_and_commits_after_signature(
+    client, org_headers, db_session, monkeypatch
+):
+    headers, org_id = org_headers
+    monkeypatch.setattr(settings, "ingest_stream_batch_size", 2)
+    save_usage_samples = usage_service.save_usage_samples
+    writes: list[int] = []
+
+    def record_write(session, samples, **kwargs):
+        writes.append(len(samples))
+        return save_usage_samples(session, samples, **kwargs)
+
+    monkeypatch.setattr(usage_service, "save_usage_samples", record_write)
+    connection_id, agent_token = _create_local_connection(client, headers)
+    ts = datetime.now(timezone.utc)
+    header = {"connection_id": connection_id, "provider": "openai", "environment": "prod"}
+    lines = [json.dumps(header)]
+    for minute in range(3):
+        lines.append(
+            json.dumps(
+                {
+                    "metric": f"openai:tokens:{minute}",
+                    "unit": "token",
+                    "quantity": 100,
+                    "unit_cost": "0.000002",
+                    "ts": ts.isoformat(),
+                }
+            )
+        )
+    body = ("\n".join(lines) + "\n").encode("utf-8")
+
+    resp = client.post(
+        "/ingest/stream",
+        data=body,
+        headers={"Content-Type": "application/x-ndjson", "X-Agent-Signature": "invalid"},
+    )
+    assert resp.status_code == 401, resp.text
+    # Forged streams were written in micro-batches too, but never committed.
+    assert writes == [2, 1]
+    apply_rls_scope(db_session, org_id)
+    try:
+        forged = db_session.execute(
+            select(RawUsageEvent.id).where(RawUsageEvent.connection_id == UUID(connection_id))
+        ).first()
+        assert forged is None
+    finally:
+        reset_rls_scope(db_session)
+
+    signature = local_agents.sign_payload(agent_token, body)
+    resp = client.post(
+        "/ingest/stream",
+        data=body,
+        headers={"Content-Type": "application/x-ndjson", "X-Agent-Signature": signature},
+    )
+    assert resp.status_code == 202, resp.text
+    assert resp.json() == {"ingested": 3, "received": 3}
+    assert writes == [2, 1, 2, 1]
+
+    apply_rls_scope(db_session, org_id)
+    try:
+        events = (
+            db_session.execute(
+                select(RawUsageEvent).where(RawUsageEvent.connection_id == UUID(connection_id))
+            )
+            .scalars()
+            .all()
+        )
+        assert len(events) == 3
+    finally:
+        reset_rls_scope(db_session)
+
+
+def test_local_ingest_accepts_gzip_body_signed_over_decompressed_bytes(client, org_headers):
+    headers, _ = org_headers
+    connection_id, agent_token = _create_local_connection(client, headers)
+    ingest_payload = {
+        "connection_id": connection_id,
+        "provider": "openai",
+        "environment": "prod",
+        "samples": [
+            {
+                "metric": "openai:tokens",
+                "unit": "token",
+                "quantity": 500,
+                "ts": datetime.now(timezone.utc).isoformat(),
+            }
+        ],
+    }
+    body = json.dumps(ingest_payload).encode("utf-8")
+    signature = local_agents.sign_payload(agent_token, body)
+    resp = client.post(
+        "/ingest/",
+        data=gzip.compress(body),
+        headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "X-Agent-Signature": signature,
+        },
+    )
+    assert resp.status_code == 202, resp.text
+    assert resp.json()["ingested"] == 1
+
+    resp = client.post(
+        "/ingest/",
+        data=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "br", "X-Agent-Signature": signature},
+    )
+    assert resp.status_code == 415
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_local_ingest_rejects_decompression_bomb_without_expanding_it(client, org_headers, monkeypatch, encoding):
+    zstandard = pytest.importorskip("zstandard")
+    headers, _ = org_headers
+    _, agent_token = _create_local_connection(client, headers)
+    monkeypatch.setattr(settings, "ingest_max_body_bytes", 1 << 20)
+    expanded = b"\0" * (256 << 20)
+    bomb = gzip.compress(expanded) if encoding == "gzip" else zstandard.ZstdCompressor(level=19).compress(expanded)
+    del expanded
+
+    tracemalloc.start()
+    try:
+        resp = client.post(
+            "/ingest/",
+            data=bomb,
+            headers={
+                "Content-Type": "application/json",
+                "Content-Encoding": encoding,
+                "X-Agent-Signature": local_agents.sign_payload(agent_token, b"{}"),
+            },
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert resp.status_code == 413, resp.text
+    # Decoding stops one output chunk past the cap instead of expanding the whole body.
+    assert peak < 8 << 20
+
+
+def test_local_ingest_replays_receipt_for_retried_request(client, org_headers):
+    headers, _ = org_headers
+    connection_id, agent_token = _create_local_connection(client, headers)
+    ingest_payload = {
+        "connection_id": connection_id,
+        "provider": "openai",
+        "environment": "prod",
+        "samples": [
+            {
+                "metric": "openai:tokens",
+                "unit": "token",
+                "quantity": 10,
+                "ts": datetime.now(timezone.utc).isoformat(),
+            }
+        ],
+    }
+    body = json.dumps(ingest_payload).encode("utf-8")
+    request_headers = {
+        "Content-Type": "application/json",
+        "X-Agent-Signature": local_agents.sign_payload(agent_token, body),
+        "Idempotency-Key": "batch-0001",
+    }
+
+    first = client.post("/ingest/", data=body, headers=request_headers)
+    assert first.status_code == 202, first.text
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.post("/ingest/", data=body, headers=request_headers)
+    assert retry.status_code == 202, retry.text
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+def test_queued_ingest_starts_the_sync_interval(client, org_headers, monkeypatch, fake_redis):
+    monkeypatch.setattr(settings, "ingest_async_enabled", True)
+    headers, _ = org_headers
+    connection_id, agent_token = _create_local_connection(client, headers)
+
+    def post(quantity: int):
+        body = json.dumps(
+            {
+                "connection_id": connection_id,
+                "provider": "openai",
+                "environment": "prod",
+                "samples": [
+                    {
+                        "metric": "openai:tokens",
+                        "unit": "token",
+                        "quantity": quantity,
+                        "ts": datetime.now(timezone.utc).isoformat(),
+                    }
+                ],
+            }
+        ).encode("utf-8")
+        signature = local_agents.sign_payload(agent_token, body)
+        return client.post(
+            "/ingest/", data=body, headers={"Content-Type": "application/json", "X-Agent-Signature": signature}
+        )
+
+    first = post(10)
+    assert first.status_code == 202, first.text
+    assert first.json() == {"queued": 1}
+
+    # Nothing has drained yet, but the queued payload already counts as this interval's sync.
+    second = post(20)
+    assert second.status_code == 429, second.text
@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+
+from api_compass.core.config import PollMode, settings
+from api_compass.db.session import apply_rls_scope, reset_rls_scope
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, PlanType, ProviderType
+from api_compass.models.tables import Connection, DailyUsageCost, RawUsageEvent
+from api_compass.services import entitlements, jobs, providers
+from api_compass.services import usage as usage_service
+from api_compass.utils.crypto import encrypt_auth_payload
+from api_compass.workers import polling
+
+
+def _add_connection(session, org_id, provider=ProviderType.OPENAI, environment=EnvironmentType.PROD):
+    connection = Connection(
+        org_id=org_id,
+        provider=provider,
+        environment=environment,
+        status=ConnectionStatus.ACTIVE,
+        display_name=f"{provider.value} poller",
+        encrypted_auth_blob=encrypt_auth_payload({"api_key": "sk-test"}),
+        metadata_json={},
+    )
+    session.add(connection)
+    session.commit()
+    return connection
+
+
+def test_group_commit_persists_cursor_and_revises_corrected_buckets(org_headers, db_session):
+    _, org_id = org_headers
+    connection = _add_connection(db_session, org_id)
+    bucket = datetime(2024, 5, 24, 10, tzinfo=timezone.utc)
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+
+    def page(tokens: int, settled_until: datetime | None, next_page: str | None) -> providers.UsagePage:
+        sample = providers._sample(
+            connection, "openai:tokens", "token", Decimal(tokens), Decimal("0.000002"), bucket, {}
+        )
+        return providers.UsagePage([sample], settled_until, next_page)
+
+    group = polling._GroupCommit(db_session, ProviderType.OPENAI)
+    first = page(1000, None, "p2")
+    group.store(connection, first.samples, ts, first)
+    group.flush()
+    db_session.expire_all()
+    stored = db_session.get(Connection, connection.id)
+    # An unfinished page run keeps its token and leaves the cursor time alone.
+    assert stored.usage_cursor == "p2"
+    assert stored.usage_cursor_at is None
+
+    # The overlap re-read returns the same bucket, corrected upwards by the provider.
+    corrected = page(1500, bucket + timedelta(hours=1), None)
+    group.store(stored, corrected.samples, ts, corrected)
+    group.flush()
+    db_session.expire_all()
+    stored = db_session.get(Connection, connection.id)
+    assert stored.usage_cursor is None
+    assert stored.usage_cursor_at == bucket + timedelta(hours=1)
+    assert group.synced[connection.id] == ts
+
+    apply_rls_scope(db_session, org_id)
+    try:
+        events = db_session.execute(
+            select(RawUsageEvent.quantity, RawUsageEvent.cost).where(RawUsageEvent.connection_id == connection.id)
+        ).all()
+        assert events == [(Decimal("1500"), Decimal("0.003000"))]
+        daily = db_session.execute(select(DailyUsageCost).where(DailyUsageCost.org_id == org_id)).scalars().all()
+        assert [(row.quantity_sum, row.cost_sum) for row in daily] == [(Decimal("1500"), Decimal("0.003000"))]
+    finally:
+        reset_rls_scope(db_session)
+
+
+def _detached_connection(provider: ProviderType = ProviderType.OPENAI) -> Connection:
+    return Connection(
+        id=uuid4(),
+        org_id=uuid4(),
+        provider=provider,
+        environment=EnvironmentType.PROD,
+        status=ConnectionStatus.ACTIVE,
+        metadata_json={},
+    )
+
+
+def test_sweep_and_scheduled_sync_share_one_poll_lock(monkeypatch, fake_redis):
+    healthy, failing = _detached_connection(), _detached_connection()
+    connections = {connection.id: connection for connection in (healthy, failing)}
+    snapshot = entitlements._default_snapshot(PlanType.ENTERPRISE)
+    polled: list[list[UUID]] = []
+
+    def run(group, runnable, due, breaker):
+        polled.append([connection.id for connection in runnable])
+        group.synced.update((connection.id, polling._now()) for connection in runnable if connection is not failing)
+
+    monkeypatch.setattr(settings, "worker_poll_mode", PollMode.SYNTHETIC)
+    monkeypatch.setattr(
+        polling, "_shard_connections", lambda session, ids: [connections[id_] for id_ in ids]
+    )
+    monkeypatch.setattr(
+        entitlements, "get_entitlements_bulk", lambda session, org_ids: {org_id: snapshot for org_id in org_ids}
+    )
+    monkeypatch.setattr(polling, "_poll_connections_synthetic", run)
+
+    # A scheduled sync polls both; the sweep in the same slot only retries the one that failed.
+    assert polling._poll_claims(None, ProviderType.OPENAI, [healthy.id, failing.id])["processed"] == 1
+    assert polling._poll_claims(None, ProviderType.OPENAI, [healthy.id, failing.id])["processed"] == 0
+    assert polled == [[healthy.id, failing.id], [failing.id]]
+
+    now = polling._now().timestamp()
+    scheduled = dict(fake_redis.zrange(jobs._JOBS_SET, 0, -1, withscores=True))
+    assert scheduled[str(healthy.id)] >= now + snapshot.sync_interval_minutes * 60 - 5
+    assert scheduled[str(failing.id)] <= now + settings.worker_retry_backoff_seconds
+
+
+def test_failing_connections_back_off_and_rejected_ones_wait_for_their_interval(monkeypatch, fake_redis):
+    flaky, rejected = _detached_connection(), _detached_connection()
+    connections = {connection.id: connection for connection in (flaky, rejected)}
+    snapshot = entitlements._default_snapshot(PlanType.ENTERPRISE)
+    errors = {
+        flaky.id: providers.RetryableProviderError(ProviderType.OPENAI, flaky.id, 503, "transient provider error"),
+        rejected.id: providers.ProviderAPIError(ProviderType.OPENAI, rejected.id, 401, "provider rejected request"),
+    }
+
+    def run(group, runnable, due, breaker):
+        for connection in runnable:
+            breaker.failed(connection, errors[connection.id])
+
+    monkeypatch.setattr(settings, "worker_poll_mode", PollMode.SYNTHETIC)
+    monkeypatch.setattr(settings, "provider_circuit_failure_threshold", 0)
+    monkeypatch.setattr(settings, "worker_retry_backoff_seconds", 30)
+    monkeypatch.setattr(settings, "worker_sync_retry_max_seconds", 100)
+    monkeypatch.setattr(polling, "_report_failure", lambda connection, exc: None)
+    monkeypatch.setattr(
+        polling, "_shard_connections", lambda session, ids: [connections[id_] for id_ in ids]
+    )
+    monkeypatch.setattr(
+        entitlements, "get_entitlements_bulk", lambda session, org_ids: {org_id: snapshot for org_id in org_ids}
+    )
+    monkeypatch.setattr(polling, "_poll_connections_synthetic", run)
+
+    delays = []
+    for _ in range(3):
+        polling._poll_claims(None, ProviderType.OPENAI, [flaky.id, rejected.id])
+        now = polling._now().timestamp()
+        scheduled = dict(fake_redis.zrange(jobs._JOBS_SET, 0, -1, withscores=True))
+        delays.append((round(scheduled[str(flaky.id)] - now), round(scheduled[str(rejected.id)] - now)))
+
+    interval = snapshot.sync_interval_minutes * 60
+    assert delays == [(30, interval), (60, interval), (100, interval)]
+
+
+def test_dispatch_due_groups_claims_by_provider_and_trims_inactive(monkeypatch, fake_redis):
+    now = datetime.now(timezone.utc)
+    openai = [uuid4(), uuid4()]
+    twilio, revoked, later = uuid4(), uuid4(), uuid4()
+    for connection_id in (*openai, twilio, revoked):
+        jobs.schedule_sync(connection_id, now - timedelta(minutes=1))
+    jobs.schedule_sync(later, now + timedelta(hours=1))
+    active = {openai[0]: ProviderType.OPENAI, openai[1]: ProviderType.OPENAI, twilio: ProviderType.TWILIO}
+
+    sent: list[tuple[str, list[str]]] = []
+    monkeypatch.setattr(settings, "worker_poll_shard_size", 1)
+    monkeypatch.setattr(polling, "SessionLocal", nullcontext)
+    monkeypatch.setattr(
+        polling, "_active_among", lambda session, ids: {id_: active[id_] for id_ in ids if id_ in active}
+    )
+    monkeypatch.setattr(
+        polling.sync_connections,
+        "apply_async",
+        lambda args, queue: sent.extend((args[0], connection_id) for connection_id in args[1]),
+    )
+
+    assert polling._dispatch_due_jobs() == 3
+    assert sorted(sent) == sorted(
+        [("openai", str(openai[0])), ("openai", str(openai[1])), ("twilio", str(twilio))]
+    )
+    # Claimed entries leave the set, including the revoked one; future jobs stay put.
+    assert fake_redis.zrange(jobs._JOBS_SET, 0, -1) == [str(later)]
+
+
+def test_failed_connection_rolls_back_only_its_own_savepoint(monkeypatch, fake_redis, org_headers, db_session):
+    _, org_id = org_headers
+    broken = _add_connection(db_session, org_id, environment=EnvironmentType.STAGING)
+    healthy = _add_connection(db_session, org_id)
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+    store_samples = polling._store_samples
+
+    def fail_after_writing(session, connection, samples, ts):
+        summary = store_samples(session, connection, samples, ts)
+        if connection.id == broken.id:
+            raise RuntimeError("constraint violated after insert")
+        return summary
+
+    monkeypatch.setattr(polling, "_store_samples", fail_after_writing)
+    group = polling._GroupCommit(db_session, ProviderType.OPENAI)
+    for connection in (broken, healthy):
+        samples = usage_service.build_provider_samples(connection, ts)
+        try:
+            group.store(connection, samples, ts)
+        except RuntimeError:
+            pass
+    group.flush()
+
+    assert list(group.synced) == [healthy.id]
+    apply_rls_scope(db_session, org_id)
+    try:
+        stored = set(db_session.execute(select(RawUsageEvent.connection_id).distinct()).scalars())
+        assert healthy.id in stored
+        assert broken.id not in stored
+    finally:
+        reset_rls_scope(db_session)
+
+
+def test_failed_group_commit_requeues_every_connection_once(monkeypatch, fake_redis, org_headers, db_session):
+    _, org_id = org_headers
+    connections = [
+        _add_connection(db_session, org_id, environment=environment)
+        for environment in (EnvironmentType.PROD, EnvironmentType.STAGING)
+    ]
+    monkeypatch.setattr(settings, "worker_poll_mode", PollMode.SYNTHETIC)
+    monkeypatch.setattr(settings, "worker_poll_commit_batch_size", 100)
+    monkeypatch.setattr(settings, "worker_poll_commit_interval_ms", 60_000)
+    commit = db_session.commit
+    attempts: list[int] = []
+
+    def lose_first_commit():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("connection reset during commit")
+        commit()
+
+    monkeypatch.setattr(db_session, "commit", lose_first_commit)
+    rescheduled: list[dict] = []
+    reschedule_syncs = jobs.reschedule_syncs
+    monkeypatch.setattr(jobs, "reschedule_syncs", lambda due: rescheduled.append(due) or reschedule_syncs(due))
+
+    result = polling._poll_claims(db_session, ProviderType.OPENAI, [connection.id for connection in connections])
+
+    assert result["processed"] == 0
+    # One reschedule for the whole shard, at the first retry delay of a fresh failure streak.
+    [due] = rescheduled
+    retry_at = polling._now() + timedelta(seconds=settings.worker_retry_backoff_seconds)
+    assert sorted(due) == sorted(connection.id for connection in connections)
+    assert all(retry_at - timedelta(seconds=60) <= at <= retry_at for at in due.values())
+    apply_rls_scope(db_session, org_id)
+    try:
+        assert db_session.execute(select(RawUsageEvent.id).where(RawUsageEvent.org_id == org_id)).first() is None
+    finally:
+        reset_rls_scope(db_session)
+
+
+def test_poll_provider_fans_pages_out_as_a_chord_of_shards(monkeypatch):
+    pages = [[uuid4(), uuid4()], [uuid4()]]
+    dispatched = {}
+
+    def fake_chord(shards):
+        def run(callback):
+            dispatched["shards"], dispatched["callback"] = shards, callback
+
+        return run
+
+    monkeypatch.setattr(polling, "SessionLocal", nullcontext)
+    monkeypatch.setattr(polling, "_iter_id_pages", lambda session, provider, horizon, page_size: iter(pages))
+    monkeypatch.setattr(polling, "chord", fake_chord)
+
+    assert polling._poll_provider(ProviderType.TWILIO) == 3
+    shards = dispatched["shards"]
+    assert sorted(tuple(shard.args[1:]) for shard in shards) == sorted(
+        (str(page[0]), str(page[-1])) for page in pages
+    )
+    assert {shard.task for shard in shards} == {"polling.poll_shard"}
+    assert {shard.options["queue"] for shard in shards} == {"polling"}
+    assert dispatched["callback"].task == "polling.collect_results"
+    results = [{"processed": 2, "busy_seconds": 1.5}, {"processed": 1, "busy_seconds": 0.5}]
+    assert polling.collect_poll_results(results, "twilio", 0.0) == 3
+
+
+def test_dispatch_offsets_give_each_shard_its_own_slot_of_the_window(monkeypatch):
+    monkeypatch.setattr(settings, "worker_poll_interval_seconds", 3600)
+    monkeypatch.setattr(settings, "worker_poll_jitter_ratio", 0.5)
+
+    offsets = polling._dispatch_offsets(4)
+
+    slot = 3600 * 0.5 / 4
+    assert len(offsets) == 4
+    assert all(index * slot <= offset <= (index + 1) * slot for index, offset in enumerate(offsets))
+    assert polling._dispatch_offsets(1) == [0.0]
+    monkeypatch.setattr(settings, "worker_poll_jitter_ratio", 0)
+    assert polling._dispatch_offsets(3) == [0.0, 0.0, 0.0]
+
+
+def test_poll_provider_staggers_shards_with_countdowns(monkeypatch):
+    pages = [[uuid4()] for _ in range(3)]
+    offsets = [0.0, 400.0, 900.0]
+    shards = []
+    monkeypatch.setattr(polling, "SessionLocal", nullcontext)
+    monkeypatch.setattr(polling, "_iter_id_pages", lambda session, provider, horizon, page_size: iter(pages))
+    monkeypatch.setattr(polling, "_dispatch_offsets", lambda count: offsets[:count])
+    monkeypatch.setattr(polling, "chord", lambda signatures: lambda callback: shards.extend(signatures))
+
+    polling._poll_provider(ProviderType.SENDGRID)
+
+    # Shard order is shuffled, but every shard is delayed by the broker rather than by sleeping.
+    assert sorted(shard.options["countdown"] for shard in shards) == offsets
+
+
+def test_idempotency_locks_are_claimed_per_shard_and_return_the_acquired_subset(monkeypatch, fake_redis):
+    monkeypatch.setattr(settings, "worker_idempotency_ttl_seconds", 600)
+    held, free = uuid4(), uuid4()
+    fake_redis.set(polling._idempotency_key(ProviderType.OPENAI, held, "42"), "earlier")
+    claims = [(held, "42"), (free, "42"), (held, "43")]
+
+    acquired = polling._acquire_idempotency_locks(fake_redis, ProviderType.OPENAI, claims)
+
+    assert acquired == [free, held]
+    key = f"connections:poll:openai:{free}:42"
+    assert 0 < fake_redis.ttl(key) <= 600
+    assert fake_redis.get(polling._idempotency_key(ProviderType.OPENAI, held, "42")) == "earlier"
+    assert polling._acquire_idempotency_locks(fake_redis, ProviderType.OPENAI, claims) == []
+    assert polling._acquire_idempotency_locks(fake_redis, ProviderType.OPENAI, []) == []
+
+
+def test_shards_prefetch_entitlements_and_skip_connections_not_due_in_sql(org_headers, db_session):
+    _, org_id = org_headers
+    now = polling._now()
+    synced_at = {
+        EnvironmentType.PROD: now - timedelta(hours=2),
+        EnvironmentType.STAGING: None,
+        EnvironmentType.DEV: now - timedelta(days=2),
+    }
+    connections = {}
+    for environment, last_synced_at in synced_at.items():
+        connection = _add_connection(db_session, org_id, ProviderType.SENDGRID, environment)
+        connection.last_synced_at = last_synced_at
+        connections[environment] = connection.id
+    db_session.commit()
+    entitlements._SNAPSHOTS.pop(org_id)
+
+    snapshots = entitlements.get_entitlements_bulk(db_session, [org_id, org_id])
+    # No entitlement row yet: the org's plan defaults apply (free, daily syncs).
+    assert snapshots[org_id].plan == PlanType.FREE
+    assert snapshots[org_id].sync_interval_minutes == 24 * 60
+
+    shard = polling._shard_ids(db_session, ProviderType.SENDGRID, UUID(int=0), UUID(int=(1 << 128) - 1))
+    assert set(shard) & set(connections.values()) == {
+        connections[EnvironmentType.STAGING],
+        connections[EnvironmentType.DEV],
+    }
+
+
+def test_keyset_pages_cover_every_due_connection_once_in_id_order(org_headers, db_session):
+    _, org_id = org_headers
+    mine = {
+        _add_connection(db_session, org_id, ProviderType.TWILIO, environment).id for environment in EnvironmentType
+    }
+
+    pages = list(polling._iter_id_pages(db_session, ProviderType.TWILIO, polling._now(), page_size=2))
+
+    ids = [connection_id for page in pages for connection_id in page]
+    assert all(len(page) <= 2 for page in pages)
+    assert ids == sorted(ids) and len(ids) == len(set(ids))
+    assert mine <= set(ids)
+    # Each page's bounds, as dispatched, select exactly that page again when the shard runs.
+    for page in pages:
+        assert sorted(polling._shard_ids(db_session, ProviderType.TWILIO, page[0], page[-1])) == page
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import httpx
+
+from api_compass.core.config import settings
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection
+from api_compass.services import provider_cache, providers, rate_limits
+from api_compass.utils.crypto import encrypt_auth_payload
+
+
+def _connection(provider: ProviderType, api_key: str) -> Connection:
+    return Connection(
+        id=uuid4(),
+        org_id=uuid4(),
+        provider=provider,
+        environment=EnvironmentType.PROD,
+        status=ConnectionStatus.ACTIVE,
+        encrypted_auth_blob=encrypt_auth_payload({"api_key": api_key}),
+        metadata_json={},
+    )
+
+
+def test_fetch_usage_parses_providers_and_returns_failures_in_place():
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+    hour = int(datetime(2024, 5, 24, 10, tzinfo=timezone.utc).timestamp())
+
+    def bucket(start: int, tokens: int) -> dict:
+        results = [{"input_tokens": tokens, "output_tokens": 0, "num_model_requests": 4}]
+        return {"start_time": start, "end_time": start + 3600, "results": results}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/v1/organization/usage/completions":
+            if request.headers["authorization"] == "Bearer sk-throttled":
+                return httpx.Response(429)
+            # No cursor yet: start of the previous UTC day, minus the overlap window.
+            since = datetime(2024, 5, 23, tzinfo=timezone.utc).timestamp() - settings.provider_poll_overlap_seconds
+            assert request.url.params["start_time"] == str(int(since))
+            if request.url.params.get("page") == "p2":
+                # The current hour is still open and must not be emitted yet.
+                return httpx.Response(200, json={"data": [bucket(hour + 3600, 300), bucket(hour + 7200, 50)]})
+            return httpx.Response(200, json={"data": [bucket(hour, 700)], "has_more": True, "next_page": "p2"})
+        if request.url.path.endswith("/Usage/Records/Daily.json"):
+            assert "/Accounts/AC123/" in request.url.path
+            records = [
+                {"category": "sms", "start_date": "2024-05-23", "usage": "25", "count": "20"},
+                {"category": "mms", "start_date": "2024-05-23", "usage": "3"},
+                {"category": "calls", "start_date": "2024-05-23", "usage": "12.5", "count": "3"},
+                {"category": "sms", "start_date": "2024-05-24", "usage": "9", "count": "9"},
+            ]
+            return httpx.Response(200, json={"usage_records": records, "next_page_uri": None})
+        return httpx.Response(404)
+
+    connections = [
+        _connection(ProviderType.OPENAI, "sk-ok"),
+        _connection(ProviderType.OPENAI, "sk-throttled"),
+        _connection(ProviderType.TWILIO, "AC123:secret"),
+    ]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await providers.fetch_usage_async(connections, ts, client=client)
+
+    openai, throttled, twilio = asyncio.run(run())
+
+    assert [(sample.ts.hour, sample.quantity) for sample in openai.samples] == [
+        (10, Decimal(700)),
+        (11, Decimal(300)),
+    ]
+    assert openai.samples[0].metadata["requests"] == 4
+    assert openai.settled_until == datetime(2024, 5, 24, 12, tzinfo=timezone.utc)
+    assert openai.next_page is None
+    assert isinstance(throttled, providers.RetryableProviderError)
+    assert throttled.status_code == 429
+    assert [(sample.metric, sample.quantity) for sample in twilio.samples] == [
+        ("twilio:sms_segments", Decimal("25")),
+        ("twilio:voice_minutes", Decimal("12.5")),
+    ]
+    assert twilio.settled_until == datetime(2024, 5, 24, tzinfo=timezone.utc)
+
+
+def test_fetch_usage_sends_validators_and_skips_unchanged_responses(monkeypatch):
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+    connection = _connection(ProviderType.SENDGRID, "SG.key")
+    request = providers.PROVIDER_ADAPTERS[ProviderType.SENDGRID].build_request(
+        connection, "SG.key", providers.usage_window_start(connection, ts), ts, None
+    )
+    stored = provider_cache.Validator(request.validator_query(), etag='"v1"')
+    monkeypatch.setattr(provider_cache, "load", lambda connection_id: {"/v3/stats": stored})
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["if-none-match"] == '"v1"'
+        return httpx.Response(304)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await providers.fetch_usage_async([connection], ts, client=client)
+
+    [page] = asyncio.run(run())
+    assert page == providers.UsagePage()
+
+
+def test_fetch_usage_returns_validators_without_storing_them(monkeypatch):
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+    connection = _connection(ProviderType.SENDGRID, "SG.key")
+    monkeypatch.setattr(provider_cache, "load", lambda connection_id: {})
+
+    def fail_save(*args):
+        raise AssertionError("validators must wait for the group commit")
+
+    monkeypatch.setattr(provider_cache, "save", fail_save)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[], headers={"ETag": '"v2"'})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await providers.fetch_usage_async([connection], ts, client=client)
+
+    [page] = asyncio.run(run())
+    assert page.samples == []
+    assert page.validators["/v3/stats"].etag == '"v2"'
+
+
+def test_consecutive_openai_polls_send_validators_although_the_window_moved(monkeypatch, fake_redis):
+    monkeypatch.setattr(rate_limits, "reserve", lambda provider, connection_id=None: 0.0)
+    connection = _connection(ProviderType.OPENAI, "sk-ok")
+    connection.usage_cursor_at = datetime(2024, 5, 24, 10, tzinfo=timezone.utc)
+    hour = int(connection.usage_cursor_at.timestamp())
+    seen: list[tuple[str, str | None]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.params["start_time"], request.headers.get("if-none-match")))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        results = [{"input_tokens": 100, "output_tokens": 0, "num_model_requests": 1}]
+        data = [{"start_time": hour, "end_time": hour + 3600, "results": results}]
+        return httpx.Response(200, json={"data": data}, headers={"ETag": '"v1"'})
+
+    async def poll(ts: datetime) -> providers.UsagePage:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            [page] = await providers.fetch_usage_async([connection], ts, client=client)
+        return page
+
+    first = asyncio.run(poll(datetime(2024, 5, 24, 11, 5, tzinfo=timezone.utc)))
+    # What the poller does once the samples are committed.
+    connection.usage_cursor_at = first.settled_until
+    for path, validator in first.validators.items():
+        provider_cache.save(connection.id, path, validator)
+
+    second = asyncio.run(poll(datetime(2024, 5, 24, 11, 20, tzinfo=timezone.utc)))
+
+    assert seen[0][1] is None
+    assert seen[1] == (str(hour + 3600 - settings.provider_poll_overlap_seconds), '"v1"')
+    assert seen[0][0] != seen[1][0]
+    assert second == providers.UsagePage()
+
+
+def test_fetch_usage_raises_rate_limit_exhausted_without_calling_provider(monkeypatch):
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+    connection = _connection(ProviderType.OPENAI, "sk-ok")
+    monkeypatch.setattr(provider_cache, "load", lambda connection_id: {})
+    monkeypatch.setattr(rate_limits, "reserve", lambda provider, connection_id=None: None)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("no request may go out once the local bucket is empty")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await providers.fetch_usage_async([connection], ts, client=client)
+
+    [result] = asyncio.run(run())
+    assert isinstance(result, providers.RateLimitExhaustedError)
+
+
+def test_fetch_usage_caps_concurrent_requests_per_provider(monkeypatch):
+    ts = datetime(2024, 5, 24, 12, 30, tzinfo=timezone.utc)
+    monkeypatch.setattr(settings, "provider_poll_concurrency", 2)
+    monkeypatch.setattr(provider_cache, "load", lambda connection_id: {})
+    monkeypatch.setattr(rate_limits, "reserve", lambda provider, connection_id=None: 0.0)
+    connections = [_connection(ProviderType.SENDGRID, f"SG.{index}") for index in range(6)]
+    connections.append(_connection(ProviderType.OPENAI, "sk-ok"))
+    in_flight = {provider: 0 for provider in ProviderType}
+    peaks = {provider: 0 for provider in ProviderType}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        provider = ProviderType.OPENAI if "openai" in request.url.host else ProviderType.SENDGRID
+        in_flight[provider] += 1
+        peaks[provider] = max(peaks[provider], in_flight[provider])
+        await asyncio.sleep(0.01)
+        in_flight[provider] -= 1
+        return httpx.Response(200, json={"data": []} if provider == ProviderType.OPENAI else [])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await providers.fetch_usage_async(connections, ts, client=client)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, providers.UsagePage) for result in results)
+    assert peaks[ProviderType.SENDGRID] == 2
+    assert peaks[ProviderType.OPENAI] == 1
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from api_compass.core.config import settings
+from api_compass.db.session import apply_rls_scope, reset_rls_scope
+from api_compass.models.enums import ConnectionStatus, EnvironmentType, ProviderType
+from api_compass.models.tables import Connection, DailyUsageCost, RawUsageEvent
+from api_compass.services import usage as usage_service
+from api_compass.utils.crypto import encrypt_auth_payload
+
+
+def _sample(quantity: str, unit_cost: str | None, ts: datetime, metric: str = "openai:tokens"):
+    return usage_service.UsageSample(
+        org_id=uuid4(),
+        connection_id=uuid4(),
+        provider=ProviderType.OPENAI,
+        environment=EnvironmentType.PROD,
+        metric=metric,
+        unit="token",
+        quantity=Decimal(quantity),
+        unit_cost=Decimal(unit_cost) if unit_cost is not None else None,
+        currency="usd",
+        ts=ts,
+        source="test",
+    )
+
+
+def test_batch_matches_sample_costs_ids_and_days():
+    offset = timezone(timedelta(hours=-5))
+    samples = [
+        _sample("12345", "0.000002", datetime(2024, 5, 24, 23, 30, tzinfo=offset)),
+        _sample("0.5", "0.000001", datetime(2024, 5, 24, 12, 0, tzinfo=timezone.utc)),
+        _sample("1.5", "0.000001", datetime(2024, 5, 24, 12, 0, 0, 123456, tzinfo=timezone.utc)),
+        _sample("2500.25", "0.0075", datetime(2024, 5, 25, 1, 0, tzinfo=timezone.utc)),
+        # Finer than micro-units: priced from the exact product, not the rounded quantity.
+        _sample("0.0000015", "3", datetime(2024, 5, 25, 1, 30, tzinfo=timezone.utc)),
+        _sample("10", None, datetime(2024, 5, 25, 2, 0, tzinfo=timezone.utc)),
+    ]
+
+    batch = usage_service.UsageSampleBatch.from_samples(samples)
+
+    assert len(batch) == len(samples)
+    for index, sample in enumerate(samples):
+        expected_cost = sample.cost
+        cost = batch.costs[index]
+        assert (None if cost is None else usage_service.from_micro(cost)) == expected_cost
+        assert batch.event_ids[index] == usage_service.stable_event_id(sample)
+        assert batch.days[index] == sample.ts.date()
+        assert batch.ts(index) == sample.ts
+        # Quantities are stored like numeric(20, 6).
+        stored = sample.quantity.quantize(Decimal("0.000001"), rounding=ROUND_HALF_UP)
+        assert usage_service.from_micro(batch.quantities[index]) == stored
+
+
+def test_batch_dedupes_and_describes():
+    ts = datetime(2024, 5, 24, 12, 0, tzinfo=timezone.utc)
+    sample = _sample("100", "0.01", ts)
+    batch = usage_service.UsageSampleBatch.from_samples([sample, sample, _sample("5", "0.01", ts, "other")])
+
+    assert batch.unique_indices() == [0, 2]
+    assert batch.metrics[0] is batch.metrics[1]
+    summary = usage_service.describe_samples(batch.take(batch.unique_indices()))
+    assert summary["total_cost"] == Decimal("1.05")
+    assert summary["metrics"]["openai:tokens"] == "100 token"
+    assert usage_service.format_micro(-1_500_000) == "-1.500000"
+
+
+def test_batch_treats_naive_timestamps_as_utc():
+    naive = datetime(2025, 1, 1, 0, 0)
+    batch = usage_service.UsageSampleBatch.from_samples([_sample("1", "0.5", naive)])
+
+    assert batch.ts(0) == naive.replace(tzinfo=timezone.utc)
+    assert batch.days[0] == naive.date()
+    assert batch.max_ts() == naive.replace(tzinfo=timezone.utc)
+
+
+def test_copy_path_matches_insert_path(monkeypatch, fake_redis, org_headers, db_session):
+    _, org_id = org_headers
+    start = datetime(2024, 5, 24, 9, tzinfo=timezone.utc)
+
+    def samples(connection: Connection, hours: range) -> list[usage_service.UsageSample]:
+        return [
+            usage_service.UsageSample(
+                org_id=org_id,
+                connection_id=connection.id,
+                provider=connection.provider,
+                environment=connection.environment,
+                metric="openai:tokens",
+                unit="token",
+                quantity=Decimal(1000 + hour),
+                unit_cost=Decimal("0.0000025"),
+                currency="usd",
+                ts=start + timedelta(hours=hour),
+                source="test",
+                metadata={"hour": hour},
+            )
+            for hour in hours
+        ]
+
+    def save(connection: Connection, copy: bool) -> list[int]:
+        monkeypatch.setattr(settings, "ingest_copy_threshold", 1 if copy else 1_000_000)
+        saved = []
+        # The second batch repeats two stored hours (one of them twice) next to three new ones.
+        for hours in (range(0, 20), [*range(18, 23), 18]):
+            saved.append(usage_service.save_usage_samples(db_session, samples(connection, hours)))
+            db_session.commit()
+        return saved
+
+    def stored(connection: Connection):
+        events = db_session.execute(
+            select(RawUsageEvent.ts, RawUsageEvent.quantity, RawUsageEvent.cost, RawUsageEvent.metadata_json)
+            .where(RawUsageEvent.connection_id == connection.id)
+            .order_by(RawUsageEvent.ts)
+        ).all()
+        daily = db_session.execute(
+            select(DailyUsageCost.day, DailyUsageCost.quantity_sum, DailyUsageCost.cost_sum)
+            .where(DailyUsageCost.org_id == org_id, DailyUsageCost.environment == connection.environment)
+            .order_by(DailyUsageCost.day)
+        ).all()
+        return events, daily
+
+    apply_rls_scope(db_session, org_id)
+    try:
+        inserted, copied = (
+            Connection(
+                org_id=org_id,
+                provider=ProviderType.OPENAI,
+                environment=environment,
+                status=ConnectionStatus.ACTIVE,
+                display_name=f"{environment.value} copy check",
+                encrypted_auth_blob=encrypt_auth_payload({"api_key": "sk-test"}),
+                metadata_json={},
+            )
+            for environment in (EnvironmentType.PROD, EnvironmentType.STAGING)
+        )
+        db_session.add_all([inserted, copied])
+        db_session.commit()
+
+        assert save(inserted, copy=False) == [20, 3]
+        assert save(copied, copy=True) == [20, 3]
+        insert_events, insert_daily = stored(inserted)
+        copy_events, copy_daily = stored(copied)
+        assert len(copy_events) == 23
+        assert copy_events == insert_events
+        assert copy_daily == insert_daily
+        assert [day for day, _, _ in copy_daily] == [start.date(), (start + timedelta(days=1)).date()]
+    finally:
+        reset_rls_scope(db_session)
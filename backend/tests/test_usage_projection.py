@@ -132,3 +132,33 @@ def test_usage_projection_endpoint(client, db_session, org_headers):
         db_session.execute(delete(DailyUsageCost).where(DailyUsageCost.org_id == org_id))
         db_session.execute(delete(Budget).where(Budget.org_id == org_id))
         db_session.commit()
+
+
+@pytest.mark.usefixtures("apply_migrations")
+def test_month_to_date_endpoint_seeds_counter(client, db_session, org_headers):
+    headers, org_id = org_headers
+    month_start = date.today().replace(day=1)
+    _seed_daily_costs(
+        db_session,
+        org_id=org_id,
+        provider=ProviderType.SENDGRID,
+        environment=EnvironmentType.PROD,
+        start_day=month_start,
+        values=["12.50", "7.25"],
+    )
+
+    for _ in range(2):  # first read seeds the Redis counter, second is served from it
+        response = client.get("/usage/mtd", headers=headers, params={"provider": "sendgrid"})
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "provider": "sendgrid",
+                "environment": "prod",
+                "currency": "usd",
+                "month_to_date_spend": "19.75",
+            }
+        ]
+
+    with _scoped(db_session, org_id):
+        db_session.execute(delete(DailyUsageCost).where(DailyUsageCost.org_id == org_id))
+        db_session.commit()